@@ -0,0 +1,106 @@
+# benchmarks/bench_backtest.py
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.backtest import run_backtest
+from src.bot.strategy import GridTradingStrategy
+
+def generate_prices(n, seed=0, volatility=0.0005):
+    """
+    Генерирует минутный ценовой ряд геометрического случайного блуждания.
+    """
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+
+def scalar_trades(prices, params):
+    """
+    Прогоняет цены через GridTradingStrategy.execute_trade и собирает сделки.
+    """
+    strategy = GridTradingStrategy(**params)
+    trades = []
+    for index, price in enumerate(prices.tolist()):
+        action = strategy.execute_trade(price)
+        if action.startswith("Покупка"):
+            trades.append({'index': index, 'operation_type': 'buy', 'price': price})
+        elif action.startswith("Продажа"):
+            trades.append({'index': index, 'operation_type': 'sell', 'price': price})
+    return trades, strategy
+
+def check_parity(seeds=20, n=20000):
+    """
+    Проверяет, что векторный движок совершает те же сделки, что и execute_trade.
+    """
+    for seed in range(seeds):
+        prices = generate_prices(n, seed=seed, volatility=0.002)
+        params = {
+            'initial_capital': 1000,
+            'grid_step': 100,
+            # Отрицательный процент падения включает покупку без открытых позиций
+            'price_drop_percent': -0.05 if seed % 2 else 0.2,
+            'price_increase_percent': 0.3
+        }
+        expected, strategy = scalar_trades(prices, params)
+        result = run_backtest(prices, **params)
+        assert result.trades == expected, f"Расхождение сделок при seed={seed}"
+        assert result.remaining_capital == strategy.remaining_capital
+        assert result.positions.prices() == strategy.purchase_prices
+    print(f"Паритет с execute_trade подтверждён на {seeds} рядах по {n} цен.")
+
+def check_equity():
+    """
+    Проверяет кривую капитала: прибыльный цикл покупки и продажи увеличивает итоговый капитал
+    на реализованную прибыль, а итог совпадает с капиталом и позициями execute_trade.
+    """
+    prices = np.array([100.0, 110.0])
+    params = {'initial_capital': 1000, 'grid_step': 100, 'price_drop_percent': 0.0, 'price_increase_percent': 5}
+    result = run_backtest(prices, **params)
+    assert [trade['operation_type'] for trade in result.trades] == ['buy', 'sell']
+    assert result.realized_pnl > 0
+    assert result.final_equity > params['initial_capital'], result.final_equity
+    # Прибыль лота: 100 USD по 100 проданы по 110
+    assert abs(result.equity[1] - result.equity[0] - 10.0) < 1e-9
+
+    for seed in range(10):
+        prices = generate_prices(20000, seed=seed, volatility=0.002)
+        params = {'initial_capital': 1000, 'grid_step': 100, 'price_drop_percent': -0.05, 'price_increase_percent': 0.3}
+        _, strategy = scalar_trades(prices, params)
+        result = run_backtest(prices, **params)
+        expected = strategy.remaining_capital + result.realized_pnl + strategy.positions.quantity * prices[-1]
+        assert abs(result.final_equity - expected) < 1e-6, f"Расхождение капитала при seed={seed}"
+    print("Кривая капитала учитывает реализованную прибыль.")
+
+def main():
+    logging.disable(logging.CRITICAL)
+    check_parity()
+    check_equity()
+
+    params = {
+        'initial_capital': 10000,
+        'grid_step': 100,
+        'price_drop_percent': -0.01,
+        'price_increase_percent': 0.5
+    }
+    # Три месяца минутных свечей
+    prices = generate_prices(60 * 24 * 90)
+
+    start = time.perf_counter()
+    scalar_trades(prices, params)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = run_backtest(prices, **params)
+    vector_time = time.perf_counter() - start
+
+    print(f"Цен: {len(prices)}, сделок: {len(result.trades)}")
+    print(f"execute_trade в цикле: {scalar_time:.3f} с")
+    print(f"Векторный движок:      {vector_time:.3f} с (ускорение x{scalar_time / vector_time:.1f})")
+    print(result.summary())
+
+if __name__ == '__main__':
+    main()
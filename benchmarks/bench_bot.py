@@ -0,0 +1,142 @@
+# benchmarks/bench_bot.py
+
+import asyncio
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sim.bybit_server import BybitStub
+from report import main_for, percentiles, result
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT', 'DOGEUSDT', 'DOTUSDT', 'LINKUSDT']
+
+# Каждый PORTFOLIO_EVERY-й чат ведёт портфель из трёх активов вместо одного
+PORTFOLIO_EVERY = 10
+
+class FakeTelegram:
+    """
+    Заглушка Telegram: считает сообщения и имитирует задержку ответа API.
+    """
+
+    def __init__(self, latency=0.005):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+
+def import_bot(directory, exchange_url):
+    """
+    Импортирует модуль бота с настройками для замера: заглушка биржи,
+    временные файлы состояния и снятые лимиты скорости.
+    """
+    os.environ.update({
+        'API_KEY': os.environ.get('API_KEY', 'bench'),
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'bench'),
+        'TELEGRAM_API_TOKEN': os.environ.get('TELEGRAM_API_TOKEN', '0:bench'),
+        'EXCHANGE_URL': exchange_url,
+        'EXCHANGE_RATE_LIMIT': '1000000',
+        'TELEGRAM_RATE_LIMIT': '1000000',
+        'TELEGRAM_CHAT_INTERVAL': '0',
+        'TRADING_HISTORY_PATH': os.path.join(directory, 'trading_history.jsonl'),
+        'STATE_PATH': os.path.join(directory, 'state'),
+        'KLINE_CACHE_PATH': os.path.join(directory, 'kline_cache.sqlite3')
+    })
+    from src.bot import main as bot
+    return bot
+
+async def simulate(chats, rounds, seed=0):
+    """
+    N чатов с запущенным мониторингом; каждый раунд — один интервал опроса в виртуальном времени:
+    планировщик проверяет все активы и портфели, цены заглушки меняются случайным блужданием.
+    """
+    rng = random.Random(seed)
+    prices = {symbol: 100.0 * (i + 1) for i, symbol in enumerate(SYMBOLS)}
+    stub = await BybitStub(prices=prices).start()
+    directory = tempfile.mkdtemp(prefix='bench_bot_')
+    bot = import_bot(directory, stub.url)
+    from src.bot.outbox import Outbox
+    from src.bot.scheduler import TickScheduler
+
+    now = [0.0]
+    interval = bot.PRICE_POLL_INTERVAL
+    bot.tick_scheduler = TickScheduler(interval, bot.process_shard, clock=lambda: now[0])
+    bot.price_service.clock = lambda: now[0]
+    bot.outbox = Outbox(global_rate=1e6, chat_interval=0, concurrency=64)
+    telegram = FakeTelegram()
+    bot.outbox.start(telegram)
+    bot.open_storage()
+    bot.persistence.load()
+
+    # Отрицательный процент падения включает покупку без открытых позиций
+    params = {'initial_capital': 1e6, 'grid_step': 100, 'price_drop_percent': -0.05, 'price_increase_percent': 0.1}
+    for chat_id in range(1, chats + 1):
+        user_data = {'strategy_params': params}
+        if chat_id % PORTFOLIO_EVERY == 0:
+            allocations = {symbol: 1 / 3 for symbol in rng.sample(SYMBOLS, 3)}
+            bot.begin_portfolio(chat_id, user_data, allocations)
+        else:
+            user_data['chosen_asset'] = SYMBOLS[chat_id % len(SYMBOLS)]
+            bot.begin_monitoring(chat_id, user_data)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        stub.set_prices({symbol: price * (1 + rng.gauss(0, 0.002)) for symbol, price in stub.prices.items()})
+        now[0] += interval
+        round_start = time.perf_counter()
+        await bot.tick_scheduler.run_due(now[0])
+        await bot.flush_trading_history(None)
+        latencies.append(time.perf_counter() - round_start)
+    processing = time.perf_counter() - started
+
+    await bot.outbox.stop(timeout=60)
+    total = time.perf_counter() - started
+    requests = sum(stub.requests.values())
+    trades = len(bot.data_handler.get_trading_history())
+
+    await bot.price_service.api.close()
+    await stub.stop()
+    bot.kline_history.cache.close()
+    bot.data_handler.close()
+    bot.persistence.close()
+    shutil.rmtree(directory, ignore_errors=True)
+    return dict(
+        chat_evaluations_per_sec=chats * rounds / processing,
+        messages_per_sec=telegram.sent / total,
+        exchange_requests=requests,
+        trades=trades,
+        messages=telegram.sent,
+        **percentiles(latencies)
+    )
+
+def run(quick=False):
+    logging.disable(logging.CRITICAL)
+    rounds = 5 if quick else 20
+    sizes = (100, 1000) if quick else (100, 1000, 10000)
+    results = []
+    for chats in sizes:
+        # Каждый размер — в отдельном процессе: модуль бота хранит состояние на уровне модуля
+        metrics = _run_isolated(chats, rounds)
+        results.append(result('bot.end_to_end', {'chats': chats, 'rounds': rounds}, **metrics))
+    return results
+
+def _run_isolated(chats, rounds):
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_simulate_sync, (chats, rounds))
+
+def _simulate_sync(chats, rounds):
+    logging.disable(logging.CRITICAL)
+    return asyncio.run(simulate(chats, rounds))
+
+if __name__ == '__main__':
+    main_for(run, "Сквозной прогон бота: N чатов, заглушки биржи и Telegram, виртуальное время опроса")
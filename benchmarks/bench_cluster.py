@@ -0,0 +1,100 @@
+# benchmarks/bench_cluster.py
+
+import logging
+import os
+import queue
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.cluster import Cluster, TickRing, partition
+
+def _reader(ring_name, capacity, expected, commands, results):
+    """
+    Процесс-читатель, как воркер кластера: команды своей очереди и все тики кольцевого буфера.
+    """
+    ring = TickRing(capacity, name=ring_name)
+    results.put('ready')
+    cursor = 0
+    ticks = dropped = 0
+    checksum = 0.0
+    chats = []
+    deadline = time.monotonic() + 60
+    while ticks + dropped < expected and time.monotonic() < deadline:
+        while True:
+            try:
+                chats.append(commands.get_nowait()[1])
+            except queue.Empty:
+                break
+        records, cursor, lost = ring.read(cursor)
+        ticks += len(records)
+        dropped += lost
+        checksum += float(records['price'].sum()) if len(records) else 0.0
+        if not len(records):
+            time.sleep(0.001)
+    while True:
+        try:
+            chats.append(commands.get(timeout=0.5)[1])
+        except queue.Empty:
+            break
+    ring.close()
+    results.put((chats, ticks, dropped, checksum))
+
+def check_cluster(workers=3, ticks=200000, chats=300, capacity=65536):
+    """
+    Передача тиков через кольцевой буфер в разделяемой памяти нескольким процессам
+    и пересылка команд чатов воркерам-владельцам через Cluster.send.
+    """
+    cluster = Cluster(workers=workers, ring_size=capacity)
+    ring = TickRing(capacity)
+    results = cluster.context.Queue()
+    cluster.queues = [cluster.context.Queue() for _ in range(workers)]
+    readers = [
+        cluster.context.Process(target=_reader, args=(ring.name, capacity, ticks, commands, results))
+        for commands in cluster.queues
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        for _ in readers:
+            assert results.get(timeout=60) == 'ready'
+        for chat_id in range(1, chats + 1):
+            cluster.send(chat_id, 'status')
+        started = time.perf_counter()
+        expected_checksum = 0.0
+        for i in range(ticks):
+            price = 100.0 + i % 1000
+            ring.write(i % 8, price)
+            expected_checksum += price
+            # Писатель не должен обгонять читателей больше чем на ёмкость буфера
+            if i % (capacity // 2) == 0:
+                time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        reports = [results.get(timeout=120) for _ in readers]
+    finally:
+        for reader in readers:
+            reader.join(10)
+            if reader.is_alive():
+                reader.terminate()
+        ring.close()
+
+    owners = {}
+    for chat_ids, received, dropped, checksum in reports:
+        assert not dropped, f"Читатель пропустил {dropped} тиков"
+        assert received == ticks, f"Читатель получил {received} тиков из {ticks}"
+        assert abs(checksum - expected_checksum) < 1e-6 * expected_checksum, "Цены тиков искажены"
+        owned = {partition(chat_id, workers) for chat_id in chat_ids}
+        assert len(owned) == 1, f"Чаты разных воркеров в одной очереди: {sorted(owned)}"
+        owners[owned.pop()] = len(chat_ids)
+    assert sorted(owners) == list(range(workers)), f"Команды получили не все воркеры: {owners}"
+    assert sum(owners.values()) == chats
+    print(f"Кластер: {workers} читателей получили {ticks} тиков "
+          f"(запись {ticks / elapsed:,.0f} тиков/с), команды {chats} чатов разошлись по владельцам.")
+
+def main():
+    logging.disable(logging.CRITICAL)
+    check_cluster()
+
+if __name__ == '__main__':
+    main()
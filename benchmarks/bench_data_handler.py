@@ -0,0 +1,102 @@
+# benchmarks/bench_data_handler.py
+
+import csv
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.data_handler import DataHandler
+from report import main_for, result, timed
+
+SYMBOLS = ('BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT')
+
+def generate_trades(count, start=1700000000.0):
+    """
+    Сделки в формате журнала бота: чередование покупок и продаж по нескольким активам и чатам.
+    """
+    trades = []
+    for i in range(count):
+        price = 100 + (i * 37) % 50
+        trade = {
+            'timestamp': start + i,
+            'chat_id': 1000 + i % 64,
+            'symbol': SYMBOLS[i % len(SYMBOLS)],
+            'operation_type': 'buy' if i % 2 == 0 else 'sell',
+            'price': price,
+            'quantity': 10 / price
+        }
+        if i % 2:
+            trade['pnl'] = 0.5
+        trades.append(trade)
+    return trades
+
+def write_legacy(path, file_format, trades):
+    """
+    Записывает историю в прежнем формате json или csv, который DataHandler импортирует при загрузке.
+    """
+    with open(path, 'w', newline='') as file:
+        if file_format == 'json':
+            json.dump(trades, file)
+        else:
+            writer = csv.DictWriter(file, fieldnames=list(trades[1].keys()))
+            writer.writeheader()
+            writer.writerows(trades)
+
+def bench_legacy(directory, file_format, trades):
+    """
+    Импорт истории json/csv, повторная загрузка журнала и статистика.
+    """
+    path = os.path.join(directory, f'history.{file_format}')
+    write_legacy(path, file_format, trades)
+    handler, import_time = timed(DataHandler, file_path=path, file_format=file_format, fsync_policy='never')
+    handler.close()
+    handler, load_time = timed(DataHandler, file_path=path, file_format=file_format, fsync_policy='never')
+    _, stats_time = timed(handler.get_statistics, period='day')
+    handler.close()
+    return {'import_s': import_time, 'load_s': load_time, 'statistics_s': stats_time}
+
+def bench_journal(directory, file_format, trades):
+    """
+    Дозапись сделок пакетами, повторное открытие и статистика для jsonl и колоночного хранилища.
+    """
+    name = 'history' if file_format == 'columnar' else 'history.jsonl'
+    path = os.path.join(directory, name)
+    handler = DataHandler(file_path=path, file_format=file_format, fsync_policy='batch', batch_size=1000)
+
+    def save():
+        for trade in trades:
+            handler.save_trading_history(trade)
+        handler.flush()
+
+    _, save_time = timed(save)
+    handler.close()
+    handler, load_time = timed(DataHandler, file_path=path, file_format=file_format, fsync_policy='never')
+    _, stats_time = timed(handler.get_statistics, period='day')
+    handler.close()
+    return {'save_s': save_time, 'save_per_sec': len(trades) / save_time, 'load_s': load_time, 'statistics_s': stats_time}
+
+def run(quick=False):
+    logging.disable(logging.CRITICAL)
+    sizes = (1000, 10000) if quick else (1000, 10000, 100000, 1000000)
+    results = []
+    for count in sizes:
+        trades = generate_trades(count)
+        for file_format in ('json', 'csv', 'jsonl', 'columnar'):
+            directory = tempfile.mkdtemp(prefix='bench_history_')
+            try:
+                if file_format in ('json', 'csv'):
+                    metrics = bench_legacy(directory, file_format, trades)
+                else:
+                    metrics = bench_journal(directory, file_format, trades)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            results.append(result('data_handler', {'format': file_format, 'trades': count}, **metrics))
+    return results
+
+if __name__ == '__main__':
+    main_for(run, "Сохранение, загрузка и статистика истории сделок DataHandler")
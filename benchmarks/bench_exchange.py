@@ -0,0 +1,146 @@
+# benchmarks/bench_exchange.py
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.exchange_api import ExchangeAPI, AsyncExchangeAPI
+from src.bot.request_scheduler import RequestScheduler
+from src.sim.bybit_server import BybitStub
+from report import main_for, percentiles, result
+
+# Активов больше, чем параллельных запросов: одновременные запросы не объединяются планировщиком
+SYMBOLS = [f'SYM{i}USDT' for i in range(1000)]
+
+class StubThread:
+    """
+    Заглушка биржи в отдельном потоке со своим циклом событий,
+    чтобы синхронный клиент и замеряемый цикл не делили поток с сервером.
+    """
+
+    def __init__(self, prices):
+        self.stub = BybitStub(prices=prices)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.stub.start(), self.loop).result()
+        return self.stub
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.stub.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+def bench_sync(url, requests_count):
+    api = ExchangeAPI('key', 'secret', base_url=url)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests_count):
+        sent = time.perf_counter()
+        api.get_current_price(SYMBOLS[i % len(SYMBOLS)])
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    api.close()
+    return dict(requests_per_sec=requests_count / elapsed, **percentiles(latencies))
+
+async def bench_async(url, requests_count, concurrency):
+    # Лимиты планировщика сняты: замеряется сам клиент, а не настроенная скорость запросов
+    scheduler = RequestScheduler(ip_limit=(1e9, 1e9), class_limits={'default': (1e9, 1e9)})
+    api = AsyncExchangeAPI('key', 'secret', base_url=url, pool_size=concurrency, scheduler=scheduler)
+    latencies = []
+    counter = iter(range(requests_count))
+
+    async def client():
+        for i in counter:
+            sent = time.perf_counter()
+            await api.get_current_price(SYMBOLS[i % len(SYMBOLS)])
+            latencies.append(time.perf_counter() - sent)
+
+    await api.get_all_prices()
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await api.close()
+    return dict(requests_per_sec=requests_count / elapsed, **percentiles(latencies))
+
+async def _check_scheduler():
+    stub = await BybitStub(prices={'BTCUSDT': 30000.0}).start()
+    tickers = '/v5/market/tickers'
+
+    def client(max_retries=3):
+        scheduler = RequestScheduler(
+            ip_limit=(1e9, 1e9), class_limits={'default': (1e9, 1e9)}, max_retries=max_retries, base_delay=0.01
+        )
+        return AsyncExchangeAPI('key', 'secret', base_url=stub.url, scheduler=scheduler)
+
+    async def calls(api, request):
+        before = stub.requests[tickers]
+        started = time.perf_counter()
+        value = await request(api)
+        return value, stub.requests[tickers] - before, time.perf_counter() - started
+
+    price = lambda api: api.get_current_price('BTCUSDT')
+    api = client()
+    try:
+        # Две ошибки 503 и успех: три запроса, цена получена
+        stub.fail_next(2, status=503)
+        value, count, _ = await calls(api, price)
+        assert (value, count) == (30000.0, 3), f"503: цена {value}, запросов {count}"
+
+        # 429 с Retry-After: повтор не раньше указанного времени
+        stub.fail_next(1, status=429, headers={'Retry-After': '0.3'})
+        value, count, elapsed = await calls(api, price)
+        assert (value, count) == (30000.0, 2) and elapsed >= 0.3, f"Retry-After: {count} запросов за {elapsed:.2f} с"
+
+        # retCode 10006 при HTTP 200 — лимит биржи, запрос повторяется
+        stub.fail_next(1, status=200, ret_code=10006)
+        value, count, _ = await calls(api, price)
+        assert (value, count) == (30000.0, 2), f"10006: цена {value}, запросов {count}"
+
+        # 20 одновременных одинаковых запросов — один запрос к бирже
+        value, count, _ = await calls(api, lambda api: asyncio.gather(*(price(api) for _ in range(20))))
+        assert value == [30000.0] * 20 and count == 1, f"Объединение: запросов {count}"
+    finally:
+        await api.close()
+
+    api = client(max_retries=2)
+    try:
+        # Повторы исчерпаны: 1 + max_retries запросов, результат None
+        stub.fail_next(3, status=503)
+        value, count, _ = await calls(api, price)
+        assert (value, count) == (None, 3), f"Исчерпание повторов: цена {value}, запросов {count}"
+    finally:
+        await api.close()
+        await stub.stop()
+
+def check_scheduler():
+    """
+    Повторы и лимиты планировщика запросов на заглушке биржи с внедрёнными ошибками:
+    число запросов при 503, ожидание Retry-After, retCode 10006 и объединение одинаковых GET.
+    """
+    asyncio.run(_check_scheduler())
+    print("Планировщик запросов: повторы, Retry-After, retCode 10006 и объединение запросов проверены.")
+
+def run(quick=False):
+    logging.disable(logging.CRITICAL)
+    check_scheduler()
+    requests_count = 300 if quick else 3000
+    results = []
+    with StubThread({symbol: 100.0 + i for i, symbol in enumerate(SYMBOLS)}) as stub:
+        results.append(result('exchange.sync', {'requests': requests_count}, **bench_sync(stub.url, requests_count)))
+        for concurrency in (1, 10, 50):
+            metrics = asyncio.run(bench_async(stub.url, requests_count, concurrency))
+            results.append(result(
+                'exchange.async', {'requests': requests_count, 'concurrency': concurrency}, **metrics
+            ))
+    return results
+
+if __name__ == '__main__':
+    main_for(run, "Пропускная способность и задержки клиентов API биржи на локальной заглушке")
@@ -0,0 +1,83 @@
+# benchmarks/bench_kline_cache.py
+
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.exchange_api import AsyncExchangeAPI
+from src.bot.kline_cache import KlineCache, KlineHistory
+from src.bot.request_scheduler import RequestScheduler
+from src.sim.bybit_server import BybitStub
+
+KLINE_PATH = '/v5/market/kline'
+MINUTE = 60000
+# Начало истории (по границе минуты): закрытые свечи, не зависящие от текущего времени
+ORIGIN = 28166666 * MINUTE
+
+async def _run(directory, candles):
+    stub = await BybitStub().start()
+    # Лимиты планировщика сняты: проверяется число запросов, а не настроенная скорость
+    scheduler = RequestScheduler(ip_limit=(1e9, 1e9), class_limits={'default': (1e9, 1e9)})
+    api = AsyncExchangeAPI('key', 'secret', base_url=stub.url, scheduler=scheduler)
+    history = KlineHistory(api, KlineCache(os.path.join(directory, 'klines.sqlite3')), concurrency=4)
+    end = ORIGIN + candles * MINUTE
+    steps = []
+
+    async def step(name, start, stop):
+        before = stub.requests[KLINE_PATH]
+        started = time.perf_counter()
+        klines = await history.fetch('BTCUSDT', '1', start, stop)
+        steps.append((name, stub.requests[KLINE_PATH] - before, len(klines), time.perf_counter() - started))
+
+    try:
+        # Холодный кэш: весь диапазон страницами по 1000 свечей
+        await step('cold', ORIGIN, end)
+        # Тёплый кэш: тот же диапазон без запросов к бирже
+        await step('warm', ORIGIN, end)
+        # Расширение диапазона: запрашивается только новый хвост
+        await step('extend', ORIGIN, end + 1500 * MINUTE)
+        # Пропуск внутри диапазона: отдельно загруженный участок после него и общий запрос
+        gap_start = end + 3000 * MINUTE
+        await step('island', gap_start + 500 * MINUTE, gap_start + 1000 * MINUTE)
+        await step('gap', ORIGIN, gap_start + 1000 * MINUTE)
+    finally:
+        await api.close()
+        history.cache.close()
+        await stub.stop()
+    return steps
+
+def check_requests(candles=5000):
+    """
+    KlineCache против заглушки биржи: число запросов свечей на холодном и тёплом кэше,
+    при расширении диапазона и при заполнении пропуска внутри него.
+    """
+    directory = tempfile.mkdtemp(prefix='bench_kline_')
+    try:
+        steps = asyncio.run(_run(directory, candles))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    results = {name: (requests, count) for name, requests, count, _ in steps}
+    pages = -(-candles // 1000)
+    assert results['cold'] == (pages, candles), f"Холодный кэш: {results['cold']}"
+    assert results['warm'] == (0, candles), f"Тёплый кэш: {results['warm']}"
+    # Хвост 1500 свечей — две страницы
+    assert results['extend'] == (2, candles + 1500), f"Расширение: {results['extend']}"
+    assert results['island'] == (1, 500), f"Отдельный участок: {results['island']}"
+    # Не загружены 2000 свечей перед участком — две страницы; сам участок берётся из кэша
+    assert results['gap'] == (2, candles + 4000), f"Пропуск: {results['gap']}"
+    for name, requests, count, elapsed in steps:
+        print(f"{name}: запросов {requests}, свечей {count}, {elapsed * 1000:.1f} мс")
+    return steps
+
+def main():
+    logging.disable(logging.CRITICAL)
+    check_requests()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# benchmarks/bench_optimizer.py
+
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_backtest import generate_prices
+from src.bot.optimizer import ParameterSweep, format_results
+
+def check_sweep(workers=2):
+    """
+    Проверяет, что перебор по сетке по умолчанию даёт сделки и различающиеся результаты,
+    а лучшее сочетание стоит первым.
+    """
+    prices = generate_prices(5000, seed=1, volatility=0.002)
+    rows = ParameterSweep({'BTCUSDT': prices}, 1000, workers=workers).run()
+    trades = [row['total_buys'] + row['total_sells'] for row in rows]
+    returns = {round(row['return_percent'], 6) for row in rows}
+    assert all(trades), "Есть сочетания без единой сделки"
+    assert len(returns) > 1, "Все сочетания дали одинаковую доходность"
+    assert rows[0]['return_percent'] != 0
+    assert rows[0]['final_equity'] == max(row['final_equity'] for row in rows)
+    print(f"Перебор: {len(rows)} сочетаний, {len(returns)} различных результатов.")
+    print(format_results(rows, limit=3))
+
+def main():
+    logging.disable(logging.CRITICAL)
+    check_sweep()
+
+    prices = generate_prices(60 * 24 * 30)
+    for workers in (1, os.cpu_count() or 1):
+        start = time.perf_counter()
+        rows = ParameterSweep({'BTCUSDT': prices}, 10000, workers=workers).run()
+        elapsed = time.perf_counter() - start
+        print(f"Процессов: {workers}, прогонов: {len(rows)}, {elapsed:.2f} с ({len(rows) / elapsed:.1f} прогонов/с)")
+
+if __name__ == '__main__':
+    main()
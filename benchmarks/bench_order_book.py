@@ -0,0 +1,210 @@
+# benchmarks/bench_order_book.py
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.order_book import OrderBooks, replay
+from src.bot.price_stream import PriceStream
+from src.sim.ws_server import ReplayServer
+from src.bot.strategy import GridTradingStrategy
+
+def generate_messages(count, symbol='BTCUSDT', levels=200, seed=0):
+    """
+    Сообщения стакана в формате биржи: снимок и count изменений объёмов уровней вокруг средней цены.
+    """
+    rng = random.Random(seed)
+    tick = 0.01
+    mid = 30000.0
+    bids = {round(mid - (i + 1) * tick, 2): rng.uniform(0.01, 2) for i in range(levels)}
+    asks = {round(mid + (i + 1) * tick, 2): rng.uniform(0.01, 2) for i in range(levels)}
+    messages = [{'type': 'snapshot', 'data': {
+        's': symbol, 'u': 1,
+        'b': [[str(p), str(s)] for p, s in bids.items()],
+        'a': [[str(p), str(s)] for p, s in asks.items()]
+    }}]
+    for update_id in range(2, count + 2):
+        bid_changes, ask_changes = [], []
+        for _ in range(rng.randint(1, 6)):
+            offset = rng.randint(1, 60) * tick
+            size = 0.0 if rng.random() < 0.3 else rng.uniform(0.01, 2)
+            if rng.random() < 0.5:
+                price = round(mid - offset, 2)
+                bids[price] = size
+                bid_changes.append([str(price), str(size)])
+            else:
+                price = round(mid + offset, 2)
+                asks[price] = size
+                ask_changes.append([str(price), str(size)])
+        messages.append({'type': 'delta', 'data': {'s': symbol, 'u': update_id, 'b': bid_changes, 'a': ask_changes}})
+    return messages
+
+def reference_book(messages):
+    """
+    Эталон: словари уровней, сортировка на каждый запрос.
+    """
+    bids, asks = {}, {}
+    for message in messages:
+        data = message['data']
+        if message['type'] == 'snapshot':
+            bids, asks = {}, {}
+        for side, changes in ((bids, data['b']), (asks, data['a'])):
+            for price, size in changes:
+                if float(size):
+                    side[float(price)] = float(size)
+                else:
+                    side.pop(float(price), None)
+    return sorted(bids.items(), reverse=True), sorted(asks.items())
+
+def reference_buy(asks, notional):
+    remaining, quantity = notional, 0.0
+    for price, size in asks:
+        taken = min(remaining, price * size)
+        quantity += taken / price
+        remaining -= taken
+        if remaining <= 0:
+            break
+    return (notional - remaining) / quantity
+
+def reference_sell(bids, quantity):
+    remaining, notional = quantity, 0.0
+    for price, size in bids:
+        taken = min(remaining, size)
+        notional += taken * price
+        remaining -= taken
+        if remaining <= 0:
+            break
+    return notional / (quantity - remaining)
+
+def check_parity(seeds=10, count=20000):
+    """
+    Сверяет уровни и цены исполнения стакана с эталоном после воспроизведения изменений.
+    """
+    for seed in range(seeds):
+        messages = generate_messages(count, seed=seed)
+        book = replay(messages, depth=None).books['BTCUSDT']
+        bids, asks = reference_book(messages)
+        assert book.bids.levels() == bids, f"Расхождение покупок при seed={seed}"
+        assert book.asks.levels() == asks, f"Расхождение продаж при seed={seed}"
+        for notional in (10, 1000, 50000):
+            assert abs(book.buy(notional).price - reference_buy(asks, notional)) < 1e-6
+            quantity = notional / bids[0][0]
+            assert abs(book.sell(quantity).price - reference_sell(bids, quantity)) < 1e-6
+    print(f"Паритет стакана с эталоном подтверждён на {seeds} последовательностях по {count} изменений.")
+
+async def _resync_round(count):
+    messages = generate_messages(count, levels=50, seed=3)
+    ticks = [{'ts': i, 'symbol': 'BTCUSDT', 'book': message} for i, message in enumerate(messages)]
+    # Тики с интервалом 1 мс: после повторной подписки клиент продолжает получать изменения
+    server = await ReplayServer(ticks, speed=1.0).start()
+    # Первое изменение после снимка не дойдёт до клиента
+    server.drop_next_book_updates(1)
+    books = OrderBooks(depth=None)
+    gaps = []
+
+    def on_book(message):
+        synced = books.apply_message(message)
+        if not synced:
+            gaps.append(message['data']['u'])
+        return synced
+
+    async def on_tick(symbol, price):
+        pass
+
+    stream = PriceStream(server.url, ['BTCUSDT'], on_tick, book_depth=50, on_book=on_book)
+    stream.start()
+    try:
+        for _ in range(1000):
+            await asyncio.sleep(0.01)
+            book = books.books.get('BTCUSDT')
+            if (server.position == len(ticks) and book is not None and book.synced
+                    and book.update_id == server.books.get('BTCUSDT').update_id):
+                break
+    finally:
+        await stream.stop()
+        await server.stop()
+    return books.books.get('BTCUSDT'), server.books.get('BTCUSDT'), gaps, server
+
+def check_resync(count=2000):
+    """
+    Пропуск изменения стакана → одна повторная подписка → стакан восстановлен по новому снимку
+    и совпадает с эталоном сервера после воспроизведения.
+    """
+    book, expected, gaps, server = asyncio.run(_resync_round(count))
+    assert len(gaps) == 1, f"Ожидался один пропуск, обнаружено {len(gaps)}"
+    assert server.unsubscribe_requests == 1, f"Повторных подписок: {server.unsubscribe_requests}"
+    assert book is not None and book.synced, "Стакан не восстановлен"
+    assert book.update_id == expected.update_id
+    assert book.bids.levels() == expected.bids.levels() and book.asks.levels() == expected.asks.levels()
+    print(f"Пропуск изменения стакана: одна повторная подписка, стакан восстановлен "
+          f"(последнее изменение {book.update_id}).")
+
+def load_recorded(path):
+    """
+    Сообщения стаканов из файла, записанного src/sim/record_ticks.py --orderbook.
+    """
+    messages = []
+    with open(path, 'r') as file:
+        for line in file:
+            record = json.loads(line)
+            if 'book' in record:
+                messages.append(record['book'])
+    return messages
+
+def bench_replay(messages, depth):
+    books = OrderBooks(depth)
+    start = time.perf_counter()
+    replay(messages, books)
+    elapsed = time.perf_counter() - start
+    return len(messages) / elapsed, books
+
+def bench_fills(book, notional, count=20000):
+    start = time.perf_counter()
+    for _ in range(count):
+        book.buy(notional)
+    elapsed = time.perf_counter() - start
+    fill = book.buy(notional)
+    slippage = (fill.price / book.best_ask() - 1) * 100
+    return elapsed / count, fill, slippage
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость локального стакана и симуляции исполнения по глубине")
+    parser.add_argument('--replay', help='файл, записанный src/sim/record_ticks.py --orderbook')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if args.replay:
+        messages = load_recorded(args.replay)
+    else:
+        check_parity()
+        check_resync()
+        messages = generate_messages(200000)
+
+    rate, books = bench_replay(messages, depth=200)
+    print(f"Сообщений: {len(messages)}, применение: {rate:,.0f} сообщений/с")
+    for symbol, book in books.books.items():
+        print(f"{symbol}: лучшая покупка {book.best_bid()}, лучшая продажа {book.best_ask()}, уровней {len(book.bids)}/{len(book.asks)}")
+        for notional in (100, 10000, 100000):
+            seconds, fill, slippage = bench_fills(book, notional)
+            print(
+                f"  покупка на {notional} USD: {seconds * 1e6:.2f} мкс, средняя цена {fill.price:.2f}, "
+                f"уровней {fill.levels}, проскальзывание {slippage:.4f}%, исполнено полностью: {fill.complete}"
+            )
+
+        strategy = GridTradingStrategy(10 ** 9, 10000, -0.01, 0.01)
+        ticks = 50000
+        start = time.perf_counter()
+        for i in range(ticks):
+            strategy.execute_trade(book.mid(), book)
+        elapsed = time.perf_counter() - start
+        print(f"  execute_trade со стаканом: {elapsed / ticks * 1e6:.2f} мкс на тик")
+
+if __name__ == '__main__':
+    main()
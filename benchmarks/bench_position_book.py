@@ -0,0 +1,63 @@
+# benchmarks/bench_position_book.py
+
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bot.strategy import GridTradingStrategy
+
+def build_strategy(open_lots):
+    """
+    Создаёт стратегию с заданным числом открытых лотов в диапазоне цен 100..200.
+    """
+    strategy = GridTradingStrategy(
+        initial_capital=(open_lots + 1) * 10,
+        grid_step=10,
+        price_drop_percent=50,
+        price_increase_percent=50
+    )
+    for i in range(open_lots):
+        strategy.positions.add(100 + (i * 37) % 100, 10)
+        strategy.remaining_capital -= 10
+    return strategy
+
+def bench_ticks(open_lots, ticks=20000):
+    """
+    Измеряет среднее время одного тика execute_trade без срабатывания сделок.
+    """
+    strategy = build_strategy(open_lots)
+    prices = [120 + (i % 50) * 0.1 for i in range(ticks)]
+    start = time.perf_counter()
+    for price in prices:
+        strategy.execute_trade(price)
+    elapsed = time.perf_counter() - start
+    return elapsed / ticks
+
+def bench_churn(open_lots, operations=20000):
+    """
+    Измеряет среднее время пары «закрыть самый старый лот / открыть новый».
+    """
+    strategy = build_strategy(open_lots)
+    book = strategy.positions
+    start = time.perf_counter()
+    for i in range(operations):
+        book.pop_oldest()
+        book.add(100 + (i * 37) % 100, 10)
+        book.min_price()
+        book.max_price()
+    elapsed = time.perf_counter() - start
+    return elapsed / operations
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'лотов':>10} {'тик, мкс':>12} {'ротация, мкс':>14}")
+    for open_lots in (10, 100, 1000, 10000, 100000):
+        tick = bench_ticks(open_lots) * 1e6
+        churn = bench_churn(open_lots) * 1e6
+        print(f"{open_lots:>10} {tick:>12.2f} {churn:>14.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_strategy.py
+
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+
+from bench_position_book import build_strategy
+from src.bot.indicators import IndicatorRegistry
+from src.bot.strategy import GridTradingStrategy
+from report import main_for, result, timed
+
+def idle_ticks(strategy, ticks):
+    """
+    Тики внутри сетки: ни покупки, ни продажи не срабатывают.
+    """
+    for i in range(ticks):
+        strategy.execute_trade(120 + (i % 50) * 0.1)
+
+def trading_ticks(strategy, ticks):
+    """
+    Пилообразная цена: каждый тик — покупка или продажа, число лотов колеблется около исходного.
+    """
+    for i in range(ticks):
+        strategy.execute_trade(40.0 if i % 2 == 0 else 400.0)
+
+def adaptive_ticks(strategy, ticks):
+    """
+    Тики внутри сетки в адаптивном режиме: обновление индикаторов актива и шаг по волатильности.
+    """
+    indicators = IndicatorRegistry(bar_seconds=1)
+    for i in range(ticks):
+        price = 120 + (i % 50) * 0.1
+        indicators.update('BTCUSDT', price, timestamp=i * 0.1)
+        strategy.execute_trade(price, None, indicators.get('BTCUSDT'))
+
+def count_buys(indicators, ticks=20000, seed=0):
+    """
+    Случайное блуждание цены со стратегией без открытых лотов; возвращает число покупок.
+    """
+    rng = random.Random(seed)
+    strategy = GridTradingStrategy(1e6, 100, -0.05, 0.1)
+    price = 100.0
+    buys = 0
+    for i in range(ticks):
+        price *= 1 + rng.gauss(0, 0.002)
+        symbol_indicators = None
+        if indicators is not None:
+            indicators.update('BTCUSDT', price, timestamp=i)
+            symbol_indicators = indicators.get('BTCUSDT')
+        if strategy.execute_trade(price, None, symbol_indicators).startswith("Покупка"):
+            buys += 1
+    return buys
+
+def check_adaptive_entry():
+    """
+    Адаптивный режим со стратегией без лотов покупает, как и фиксированный:
+    первая покупка не должна блокироваться масштабированным процентом падения.
+    """
+    fixed = count_buys(None)
+    indicators = IndicatorRegistry(bar_seconds=10)
+    adaptive = count_buys(indicators)
+    assert indicators.get('BTCUSDT').volatility_percent() is not None, "Индикаторы не накоплены"
+    assert 2 * adaptive >= fixed, f"Адаптивный режим почти не покупает: {adaptive} покупок против {fixed}"
+    print(f"Покупки на случайном блуждании: фиксированный шаг {fixed}, адаптивный {adaptive}.")
+
+def run(quick=False):
+    logging.disable(logging.CRITICAL)
+    check_adaptive_entry()
+    ticks = 5000 if quick else 50000
+    sizes = (10, 1000, 10000) if quick else (10, 100, 1000, 10000, 100000)
+    results = []
+    for open_lots in sizes:
+        for mode, drive in (('idle', idle_ticks), ('trading', trading_ticks), ('adaptive', adaptive_ticks)):
+            strategy = build_strategy(open_lots)
+            strategy.remaining_capital += strategy.grid_step
+            _, elapsed = timed(drive, strategy, ticks)
+            results.append(result(
+                'strategy.execute_trade', {'open_lots': open_lots, 'mode': mode},
+                ticks_per_sec=ticks / elapsed
+            ))
+    return results
+
+if __name__ == '__main__':
+    main_for(run, "Скорость GridTradingStrategy.execute_trade в зависимости от числа открытых лотов")
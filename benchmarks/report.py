@@ -0,0 +1,135 @@
+# benchmarks/report.py
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Метрики, у которых больше — лучше; у остальных (время, задержки) лучше меньше
+HIGHER_IS_BETTER = ('_per_sec',)
+
+def timed(function, *args, **kwargs):
+    """
+    Выполняет function и возвращает (результат, затраченное время в секундах).
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def percentiles(samples, points=(50, 95, 99)):
+    """
+    Перцентили выборки задержек в миллисекундах.
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {}
+    for point in points:
+        index = min(len(ordered) - 1, int(round(point / 100 * (len(ordered) - 1))))
+        result[f'p{point}_ms'] = ordered[index] * 1000
+    result['mean_ms'] = statistics.fmean(ordered) * 1000
+    return result
+
+def result(name, params, **metrics):
+    """
+    Одна строка результатов: имя замера, его параметры и измеренные метрики.
+    """
+    return {'name': name, 'params': params, 'metrics': metrics}
+
+def environment():
+    """
+    Сведения об окружении замера: версия Python, платформа, ядра и коммит.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def write_report(results, path):
+    """
+    Сохраняет результаты с описанием окружения в JSON.
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'environment': environment(), 'results': results}, file, ensure_ascii=False, indent=2)
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def _key(row):
+    return row['name'], json.dumps(row['params'], sort_keys=True)
+
+def compare_reports(baseline, current, threshold=0.1):
+    """
+    Сравнивает общие метрики двух отчётов. Возвращает строки
+    (имя, параметры, метрика, было, стало, изменение) и число регрессий хуже threshold.
+    """
+    previous = {_key(row): row['metrics'] for row in baseline['results']}
+    rows = []
+    regressions = 0
+    for row in current['results']:
+        old_metrics = previous.get(_key(row))
+        if old_metrics is None:
+            continue
+        for metric, value in row['metrics'].items():
+            old = old_metrics.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / abs(old)
+            # Ухудшение: падение пропускной способности или рост времени
+            worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+            regressed = worse > threshold
+            regressions += regressed
+            rows.append((row['name'], row['params'], metric, old, value, change, regressed))
+    return rows, regressions
+
+def print_results(results):
+    for row in results:
+        params = ', '.join(f"{key}={value}" for key, value in row['params'].items())
+        metrics = ', '.join(
+            f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in row['metrics'].items()
+        )
+        print(f"{row['name']} [{params}]: {metrics}")
+
+def print_comparison(rows, regressions, threshold):
+    for name, params, metric, old, new, change, regressed in rows:
+        params = ', '.join(f"{key}={value}" for key, value in params.items())
+        mark = '  РЕГРЕССИЯ' if regressed else ''
+        print(f"{name} [{params}] {metric}: {old:.4g} -> {new:.4g} ({change * 100:+.1f}%){mark}")
+    print(f"Регрессий хуже {threshold * 100:.0f}%: {regressions}")
+
+def main_for(run, description):
+    """
+    Точка входа отдельного набора замеров: печать, сохранение и сравнение с прошлым отчётом.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--quick', action='store_true', help='сокращённые размеры для быстрой проверки')
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    parser.add_argument('--compare', help='сравнить с сохранённым отчётом')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение (доля)')
+    args = parser.parse_args()
+
+    results = run(quick=args.quick)
+    print_results(results)
+    if args.output:
+        write_report(results, args.output)
+    if args.compare:
+        rows, regressions = compare_reports(load_report(args.compare), {'results': results}, args.threshold)
+        print_comparison(rows, regressions, args.threshold)
+        sys.exit(1 if regressions else 0)
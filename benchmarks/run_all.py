@@ -0,0 +1,49 @@
+# benchmarks/run_all.py
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bench_bot
+import bench_data_handler
+import bench_exchange
+import bench_strategy
+from report import compare_reports, load_report, print_comparison, print_results, write_report
+
+SUITES = {
+    'strategy': bench_strategy.run,
+    'data_handler': bench_data_handler.run,
+    'exchange': bench_exchange.run,
+    'bot': bench_bot.run
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Набор замеров производительности бота")
+    parser.add_argument('suites', nargs='*', help=f"наборы замеров: {', '.join(SUITES)} (по умолчанию все)")
+    parser.add_argument('--quick', action='store_true', help='сокращённые размеры для быстрой проверки')
+    parser.add_argument('--output', default='benchmark_results.json', help='файл отчёта JSON')
+    parser.add_argument('--compare', help='сравнить с сохранённым отчётом, например прошлого коммита')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение (доля)')
+    args = parser.parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"неизвестные наборы: {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in args.suites or SUITES:
+        print(f"== {name}")
+        suite_results = SUITES[name](quick=args.quick)
+        print_results(suite_results)
+        results.extend(suite_results)
+
+    write_report(results, args.output)
+    print(f"Отчёт сохранён: {args.output}")
+    if args.compare:
+        rows, regressions = compare_reports(load_report(args.compare), load_report(args.output), args.threshold)
+        print_comparison(rows, regressions, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
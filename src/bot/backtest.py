@@ -0,0 +1,127 @@
+# src/bot/backtest.py
+
+import numpy as np
+from src.bot.position_book import PositionBook
+
+class BacktestResult:
+    """
+    Результат прогона стратегии на истории цен.
+    """
+
+    def __init__(self, prices, equity, trades, initial_capital, remaining_capital, positions, realized_pnl=0.0):
+        self.prices = prices
+        self.equity = equity
+        self.trades = trades
+        self.initial_capital = initial_capital
+        self.remaining_capital = remaining_capital
+        self.positions = positions
+        self.realized_pnl = realized_pnl
+
+        running_max = np.maximum.accumulate(equity) if len(equity) else equity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.drawdown = np.where(running_max > 0, (running_max - equity) / running_max, 0.0)
+        self.max_drawdown = float(self.drawdown.max()) if len(self.drawdown) else 0.0
+
+    @property
+    def final_equity(self):
+        return float(self.equity[-1]) if len(self.equity) else float(self.initial_capital)
+
+    def summary(self):
+        """
+        Возвращает основные показатели прогона.
+        """
+        total_buys = sum(1 for trade in self.trades if trade['operation_type'] == 'buy')
+        return {
+            'final_equity': self.final_equity,
+            'return_percent': (self.final_equity / self.initial_capital - 1) * 100 if self.initial_capital else 0.0,
+            'max_drawdown_percent': self.max_drawdown * 100,
+            'total_buys': total_buys,
+            'total_sells': len(self.trades) - total_buys,
+            'realized_pnl': self.realized_pnl,
+            'open_positions': len(self.positions)
+        }
+
+def run_backtest(prices, initial_capital, grid_step, price_drop_percent, price_increase_percent,
+                 timestamps=None, min_window=256, max_window=65536):
+    """
+    Прогоняет правила GridTradingStrategy по массиву цен.
+
+    Между сделками пороги покупки и продажи постоянны, поэтому следующая сделка
+    ищется векторно по окну цен, а окно удваивается, пока срабатывание не найдено.
+    Правила и порядок проверок совпадают с GridTradingStrategy.execute_trade.
+    remaining_capital, как и у стратегии, — бюджет покупок (продажа возвращает grid_step),
+    а в кривую капитала идут деньги с учётом реализованной прибыли: выручка продажи по её цене.
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    n = len(prices)
+    drop_factor = 1 - price_drop_percent / 100
+    rise_factor = 1 + price_increase_percent / 100
+
+    book = PositionBook()
+    remaining_capital = initial_capital
+    realized_pnl = 0.0
+    trades = []
+    # Состояние капитала и количества после каждого события, для кривой капитала
+    event_indices = []
+    cash_states = [initial_capital]
+    quantity_states = [0.0]
+
+    i = 0
+    window = min_window
+    while i < n:
+        can_buy = remaining_capital >= grid_step
+        if not book and not can_buy:
+            break
+
+        chunk = prices[i:i + window]
+        if book:
+            buy_hit = chunk <= book.min_price() * drop_factor
+            sell_hit = chunk >= book.max_price() * rise_factor
+        else:
+            # Без позиций опорная цена равна текущей, продавать нечего
+            buy_hit = chunk <= chunk * drop_factor
+            sell_hit = None
+
+        if can_buy:
+            hits = buy_hit if sell_hit is None else buy_hit | sell_hit
+        else:
+            # При нехватке капитала тик с сигналом покупки не доходит до проверки продажи
+            hits = sell_hit & ~buy_hit
+
+        found = np.flatnonzero(hits)
+        if not len(found):
+            i += len(chunk)
+            window = min(window * 2, max_window)
+            continue
+
+        offset = int(found[0])
+        index = i + offset
+        price = float(prices[index])
+        if can_buy and buy_hit[offset]:
+            book.add(price, grid_step)
+            remaining_capital -= grid_step
+            operation_type = 'buy'
+        else:
+            purchase_price, amount = book.pop_oldest()
+            remaining_capital += grid_step
+            realized_pnl += (price - purchase_price) * amount / purchase_price
+            operation_type = 'sell'
+
+        trade = {'index': index, 'operation_type': operation_type, 'price': price}
+        if timestamps is not None:
+            trade['timestamp'] = timestamps[index]
+        trades.append(trade)
+        event_indices.append(index)
+        cash_states.append(remaining_capital + realized_pnl)
+        quantity_states.append(book.quantity)
+
+        i = index + 1
+        window = min_window
+
+    bounds = np.array([0] + event_indices + [n], dtype=np.int64)
+    lengths = np.diff(bounds)
+    cash = np.repeat(np.array(cash_states, dtype=np.float64), lengths)
+    quantity = np.repeat(np.array(quantity_states, dtype=np.float64), lengths)
+    equity = cash + quantity * prices
+
+    return BacktestResult(prices, equity, trades, initial_capital, remaining_capital, book, realized_pnl)
@@ -0,0 +1,434 @@
+# src/bot/cluster.py
+
+import os
+import sys
+import time
+import queue
+import signal
+import asyncio
+import logging
+import argparse
+import importlib
+import multiprocessing
+import numpy as np
+from collections import defaultdict
+from multiprocessing import shared_memory
+
+# Добавляем путь к корневой директории проекта
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+# Запись тика в кольцевом буфере. seq — номер записи, 0 — запись в процессе изменения
+TICK_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('symbol_id', '<u2'),
+    ('timestamp', '<f8'),
+    ('price', '<f8')
+], align=True)
+
+# Заголовок буфера: номер последней записанной записи (выровнен по строке кэша)
+RING_HEADER_SIZE = 64
+
+def partition(chat_id, workers):
+    """
+    Номер воркера, которому принадлежит чат.
+    """
+    return int(chat_id) % workers
+
+class TickRing:
+    """
+    Кольцевой буфер тиков в разделяемой памяти: один писатель, много читателей.
+
+    Писатель обнуляет seq записи, заполняет поля и только затем записывает новый seq
+    и номер последней записи в заголовке. Читатель копирует записи и проверяет seq
+    повторно: запись, перезаписанная во время чтения, отбрасывается. Каждый читатель
+    хранит свою позицию; отставший больше чем на ёмкость буфера пропускает старые тики.
+    """
+
+    def __init__(self, capacity=65536, name=None):
+        self.capacity = capacity
+        size = RING_HEADER_SIZE + capacity * TICK_DTYPE.itemsize
+        if name is None:
+            self.block = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            # Блоком владеет и удаляет его процесс, создавший буфер
+            self.block = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.block.name
+        self._head = np.ndarray((1,), dtype='<u8', buffer=self.block.buf)
+        self._slots = np.ndarray((capacity,), dtype=TICK_DTYPE, buffer=self.block.buf, offset=RING_HEADER_SIZE)
+        if self.owner:
+            self._head[0] = 0
+            self._slots['seq'] = 0
+
+    def head(self):
+        return int(self._head[0])
+
+    def write(self, symbol_id, price, timestamp=None):
+        seq = int(self._head[0]) + 1
+        slot = self._slots[(seq - 1) % self.capacity]
+        slot['seq'] = 0
+        slot['symbol_id'] = symbol_id
+        slot['timestamp'] = time.time() if timestamp is None else timestamp
+        slot['price'] = price
+        slot['seq'] = seq
+        self._head[0] = seq
+
+    def read(self, cursor):
+        """
+        Возвращает тики после позиции cursor: (массив записей, новая позиция, число пропущенных).
+        """
+        head = int(self._head[0])
+        if head <= cursor:
+            return self._slots[:0], cursor, 0
+        dropped = 0
+        if head - cursor > self.capacity:
+            dropped = head - self.capacity - cursor
+            cursor = head - self.capacity
+
+        start = cursor % self.capacity
+        end = head % self.capacity or self.capacity
+        if start < end:
+            records = self._slots[start:end].copy()
+            current = self._slots['seq'][start:end]
+        else:
+            records = np.concatenate([self._slots[start:], self._slots[:end]])
+            current = np.concatenate([self._slots['seq'][start:], self._slots['seq'][:end]])
+        expected = np.arange(cursor + 1, head + 1, dtype=np.uint64)
+        valid = (records['seq'] == expected) & (current == expected)
+        if not valid.all():
+            dropped += int((~valid).sum())
+            records = records[valid]
+        return records, head, dropped
+
+    def close(self):
+        self._head = None
+        self._slots = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+def _override_settings(**values):
+    """
+    Задаёт настройки процесса через переменные окружения и перечитывает модуль настроек.
+    Вызывается до импорта модулей, которые берут значения из настроек при импорте.
+    """
+    from src.config import settings
+    os.environ.update({name: str(value) for name, value in values.items()})
+    importlib.reload(settings)
+
+def _ignore_interrupts():
+    # Дочерние процессы останавливает главный процесс, а не Ctrl+C в терминале
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _log_path(suffix):
+    from src.config import settings
+    base, extension = os.path.splitext(settings.LOG_FILE_PATH)
+    return f'{base}.{suffix}{extension}'
+
+def _configure_logging():
+    from src.bot.log_pipeline import configure_logging
+    from src.config import settings
+    configure_logging(settings.LOGGING)
+
+def run_feed(ring_name, capacity, stop_event):
+    """
+    Процесс цен: единственный владелец соединения с биржей, пишет тики в кольцевой буфер.
+    """
+    _ignore_interrupts()
+    # У каждого процесса свой файл журнала: ротация одного файла из нескольких процессов небезопасна
+    _override_settings(LOG_FILE_PATH=_log_path('feed'))
+    _configure_logging()
+    asyncio.run(_feed(ring_name, capacity, stop_event))
+
+async def _feed(ring_name, capacity, stop_event):
+    from src.bot.exchange_api import AsyncExchangeAPI
+    from src.bot.price_stream import PriceStream
+    from src.bot.scheduler import TickScheduler
+    from src.config import settings
+
+    logger = logging.getLogger(__name__)
+    ring = TickRing(capacity, name=ring_name)
+    symbol_ids = {symbol: i for i, symbol in enumerate(settings.available_assets)}
+    api = AsyncExchangeAPI(
+        api_key=settings.API_KEY,
+        secret_key=settings.SECRET_KEY,
+        base_url=settings.EXCHANGE_URL,
+        pool_size=settings.EXCHANGE_POOL_SIZE,
+        timeout=settings.EXCHANGE_TIMEOUT
+    )
+
+    async def on_tick(symbol, price):
+        symbol_id = symbol_ids.get(symbol)
+        if symbol_id is not None:
+            ring.write(symbol_id, price)
+
+    # Один запрос всех тикеров за интервал: цены всех активов записываются в кольцо разом
+    async def poll_prices(shard):
+        prices = await api.get_all_prices()
+        if prices is not None:
+            for symbol, symbol_id in symbol_ids.items():
+                price = prices.get(symbol)
+                if price is not None:
+                    ring.write(symbol_id, price)
+        return True
+
+    if settings.PRICE_FEED_MODE == 'stream':
+        source = PriceStream(settings.EXCHANGE_WS_URL, settings.available_assets, on_tick,
+                             topic=settings.PRICE_STREAM_TOPIC)
+    else:
+        source = TickScheduler(settings.PRICE_POLL_INTERVAL, poll_prices)
+        source.add('*')
+    source.start()
+    logger.info(f"Процесс цен запущен ({settings.PRICE_FEED_MODE}).")
+    try:
+        while not stop_event.is_set():
+            await asyncio.sleep(0.2)
+    finally:
+        await source.stop()
+        await api.close()
+        ring.close()
+
+def run_worker(index, workers, ring_name, capacity, commands, stop_event, poll_interval=0.01):
+    """
+    Процесс-воркер: стратегии чатов своей доли, сделки, журналы и сообщения этих чатов.
+    """
+    _ignore_interrupts()
+    # Журналы, состояние и доля лимита Telegram у каждого воркера свои;
+    # настройки читаются при импорте, поэтому переменные окружения задаются до него
+    from src.config import settings
+    base, extension = os.path.splitext(settings.TRADING_HISTORY_PATH)
+    _override_settings(
+        TRADING_HISTORY_PATH=f'{base}.w{index}{extension}',
+        STATE_PATH=os.path.join(settings.STATE_PATH, f'w{index}'),
+        TELEGRAM_RATE_LIMIT=settings.TELEGRAM_RATE_LIMIT / workers,
+        LOG_FILE_PATH=_log_path(f'w{index}')
+    )
+    _configure_logging()
+    asyncio.run(_worker(index, ring_name, capacity, commands, stop_event, poll_interval))
+
+async def _worker(index, ring_name, capacity, commands, stop_event, poll_interval):
+    from src.bot import main as bot
+    from src.bot.outbox import Outbox
+
+    logger = logging.getLogger(__name__)
+    ring = TickRing(capacity, name=ring_name)
+    symbols = bot.available_assets
+    sessions = defaultdict(dict)
+    # В режиме опроса каждая цена — плановая проверка, о ней сообщается и без сделки
+    notify_idle = bot.PRICE_FEED_MODE == 'polling'
+
+    bot.open_storage()
+    bot.persistence.load()
+    for chat_id, symbol in bot.persistence.monitored():
+        bot.price_service.subscribe(chat_id, symbol, sessions[chat_id])
+    for chat_id, portfolio_symbols in bot.persistence.monitored_portfolios():
+        bot.price_service.subscribe_portfolio(chat_id, portfolio_symbols, sessions[chat_id])
+    await bot.bot.initialize()
+    bot.outbox.start(bot.bot)
+    logger.info(f"Воркер {index} запущен: {len(bot.price_service.chat_symbols)} чатов.")
+
+    cursor = ring.head()
+    last_flush = time.monotonic()
+    last_checkpoint = last_flush
+    try:
+        while not stop_event.is_set():
+            while True:
+                try:
+                    command = commands.get_nowait()
+                except queue.Empty:
+                    break
+                _handle_command(bot, Outbox, sessions, command)
+
+            records, cursor, dropped = ring.read(cursor)
+            if dropped:
+                logger.warning("Воркер %d пропустил %d тиков.", index, dropped, extra={'sample': True})
+            for record in records:
+                await bot.process_tick(symbols[record['symbol_id']], float(record['price']), notify_idle)
+
+            now = time.monotonic()
+            if now - last_flush >= 1:
+                await bot.flush_trading_history(None)
+                last_flush = now
+            if now - last_checkpoint >= bot.STATE_CHECKPOINT_INTERVAL:
+                await bot.checkpoint_state(None)
+                last_checkpoint = now
+            if not len(records):
+                await asyncio.sleep(poll_interval)
+    finally:
+        await bot.outbox.stop()
+        await bot.bot.shutdown()
+        await bot.price_service.api.close()
+        bot.kline_history.cache.close()
+        await bot.close_storage()
+        ring.close()
+
+def _handle_command(bot, Outbox, sessions, command):
+    """
+    Выполняет команду чата, пересланную процессом Telegram.
+    """
+    kind, chat_id = command[0], command[1]
+    user_data = sessions[chat_id]
+    bot.persistence.restore(chat_id, user_data)
+    if kind == 'start':
+        symbol, params = command[2], command[3]
+        user_data['chosen_asset'] = symbol
+        bot.persistence.log_asset(chat_id, user_data, symbol)
+        if params:
+            user_data['strategy_params'] = params
+            bot.persistence.log_params(chat_id, user_data, params)
+        bot.begin_monitoring(chat_id, user_data)
+    elif kind == 'portfolio':
+        allocations, params = command[2], command[3]
+        if params:
+            user_data['strategy_params'] = params
+            bot.persistence.log_params(chat_id, user_data, params)
+        bot.begin_portfolio(chat_id, user_data, allocations)
+    elif kind == 'stop':
+        bot.outbox.discard(chat_id)
+        if bot.stop_chat(chat_id):
+            bot.outbox.post(chat_id, "Мониторинг цен остановлен.", priority=Outbox.NOTICE)
+        else:
+            bot.outbox.post(chat_id, "Мониторинг не запущен.", priority=Outbox.NOTICE)
+    elif kind == 'status':
+        bot.outbox.post(chat_id, bot.status_message(chat_id, user_data), priority=Outbox.NOTICE)
+
+class Cluster:
+    """
+    Многопроцессный режим: процесс цен, N воркеров и процесс Telegram.
+
+    Процесс цен пишет тики в кольцевой буфер в разделяемой памяти, воркеры читают его
+    и обрабатывают стратегии своих чатов (чат принадлежит воркеру chat_id % N).
+    Процесс Telegram (главный) принимает команды и пересылает команды мониторинга
+    воркеру-владельцу чата через его очередь; ответы воркер отправляет сам.
+    Число воркеров должно оставаться прежним между запусками: состояние чатов хранится по воркерам.
+    """
+
+    def __init__(self, workers=None, ring_size=65536):
+        self.workers = workers or os.cpu_count() or 1
+        self.ring_size = ring_size
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = None
+        self.stop_event = None
+        self.queues = []
+        self.processes = []
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        self.ring = TickRing(self.ring_size)
+        self.stop_event = self.context.Event()
+        self.queues = [self.context.Queue() for _ in range(self.workers)]
+        self.processes = [self.context.Process(
+            target=run_feed, args=(self.ring.name, self.ring_size, self.stop_event), name='feed'
+        )]
+        for index, commands in enumerate(self.queues):
+            self.processes.append(self.context.Process(
+                target=run_worker,
+                args=(index, self.workers, self.ring.name, self.ring_size, commands, self.stop_event),
+                name=f'worker-{index}'
+            ))
+        for process in self.processes:
+            process.start()
+        self.logger.info(f"Кластер запущен: {self.workers} воркеров.")
+
+    def send(self, chat_id, *command):
+        """
+        Пересылает команду чата воркеру-владельцу.
+        """
+        self.queues[partition(chat_id, self.workers)].put((command[0], chat_id) + command[1:])
+
+    def stop(self, timeout=10):
+        if self.stop_event is None:
+            return
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                self.logger.warning(f"Процесс {process.name} не завершился, останавливаем принудительно.")
+                process.terminate()
+        self.ring.close()
+        self.stop_event = None
+
+    def run_front(self):
+        """
+        Запускает процесс Telegram в текущем процессе. Возвращает управление после остановки бота.
+        """
+        from src.bot import main as bot
+        from src.bot.portfolio import parse_allocations
+
+        async def start_monitoring(update, context):
+            if 'chosen_asset' not in context.user_data:
+                await update.message.reply_text("Сначала выберите актив с помощью команды /trade.")
+                return
+            self.send(
+                update.effective_chat.id, 'start',
+                context.user_data['chosen_asset'], context.user_data.get('strategy_params')
+            )
+            await update.message.reply_text(bot.monitoring_started_message())
+
+        async def portfolio(update, context):
+            try:
+                allocations = parse_allocations(context.args, bot.available_assets)
+            except ValueError as e:
+                await update.message.reply_text(f"Ошибка: {e}")
+                return
+            self.send(update.effective_chat.id, 'portfolio', allocations, context.user_data.get('strategy_params'))
+            await update.message.reply_text(bot.portfolio_started_message(allocations))
+
+        async def stop_monitoring(update, context):
+            self.send(update.effective_chat.id, 'stop')
+
+        async def status(update, context):
+            self.send(update.effective_chat.id, 'status')
+
+        # Выбранный актив и параметры чатов хранятся в состоянии процесса Telegram:
+        # они загружаются при запуске, сбрасываются на диск периодически и при остановке
+        async def start_front(application):
+            bot.persistence.load()
+
+        async def close_front(application):
+            await bot.price_service.api.close()
+            bot.kline_history.cache.close()
+            await bot.close_storage()
+
+        application = bot.build_application(
+            post_init=start_front,
+            post_shutdown=close_front,
+            commands={
+                'start_monitoring': start_monitoring,
+                'stop_monitoring': stop_monitoring,
+                'portfolio': portfolio,
+                'status': status
+            }
+        )
+        application.job_queue.run_repeating(bot.flush_trading_history, interval=1, name='history_flush')
+        application.job_queue.run_repeating(
+            bot.checkpoint_state,
+            interval=bot.STATE_CHECKPOINT_INTERVAL,
+            first=bot.STATE_CHECKPOINT_INTERVAL,
+            name='state_checkpoint'
+        )
+        application.run_polling()
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск бота в многопроцессном режиме.")
+    parser.add_argument('--workers', type=int, default=None, help="Число воркеров (по умолчанию CLUSTER_WORKERS)")
+    args = parser.parse_args()
+
+    from src.config import settings
+    _configure_logging()
+    cluster = Cluster(workers=args.workers or settings.CLUSTER_WORKERS, ring_size=settings.CLUSTER_RING_SIZE)
+    cluster.start()
+    try:
+        # У процесса Telegram нет своих сделок, его состояние — выбранные активы и параметры чатов.
+        # Переопределяется после запуска воркеров, чтобы они не унаследовали эти значения окружения
+        _override_settings(
+            TRADING_HISTORY_PATH=settings.TRADING_HISTORY_PATH + '.front',
+            STATE_PATH=os.path.join(settings.STATE_PATH, 'front')
+        )
+        cluster.run_front()
+    finally:
+        cluster.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+# src/bot/columnar_store.py
+
+import os
+import struct
+import logging
+import numpy as np
+from src.bot.trade_statistics import parse_timestamp
+
+# Запись сделки фиксированной ширины (43 байта)
+TRADE_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('symbol_id', '<u2'),
+    ('chat_id', '<i8'),
+    ('side', 'i1'),
+    ('price', '<f8'),
+    ('quantity', '<f8'),
+    ('pnl', '<f8')
+])
+
+SIDES = {'buy': 1, 'sell': -1}
+SIDE_NAMES = {1: 'buy', -1: 'sell'}
+# Значение chat_id для сделок без чата
+NO_CHAT = -1
+
+class TradeRecords:
+    """
+    Ленивое представление сделок хранилища в виде последовательности словарей.
+    Словарь создаётся только при обращении к конкретной сделке.
+    """
+
+    def __init__(self, rows, symbols):
+        self.rows = rows
+        self.symbols = symbols
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TradeRecords(self.rows[index], self.symbols)
+        return self._to_dict(self.rows[index])
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self._to_dict(row)
+
+    def _to_dict(self, row):
+        record = {
+            'timestamp': float(row['timestamp']),
+            'symbol': self.symbols[int(row['symbol_id'])],
+            'operation_type': SIDE_NAMES[int(row['side'])],
+            'price': float(row['price']),
+            'quantity': float(row['quantity'])
+        }
+        if int(row['chat_id']) != NO_CHAT:
+            record['chat_id'] = int(row['chat_id'])
+        if not np.isnan(row['pnl']):
+            record['pnl'] = float(row['pnl'])
+        return record
+
+class ColumnarTradeStore:
+    """
+    Колоночное хранилище сделок в отображаемом в память файле структурированного массива NumPy.
+
+    Файл trades.bin состоит из заголовка (сигнатура, число записей, флаги) и записей TRADE_DTYPE.
+    Загрузка не читает данные: массив отображается в память и доступен без копирования.
+    Справочник активов хранится в symbols.txt, номер строки — идентификатор актива.
+    """
+
+    MAGIC = b'TRDCOL01'
+    HEADER = struct.Struct('<8sQQ')
+    INITIAL_CAPACITY = 1024
+    # Флаг: записи добавлялись не в порядке времени, бинарный поиск по времени неприменим
+    FLAG_UNORDERED = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.data_path = os.path.join(directory, 'trades.bin')
+        self.symbols_path = os.path.join(directory, 'symbols.txt')
+        self.symbols = []
+        self.symbol_ids = {}
+        self.count = 0
+        self.flags = 0
+        self.capacity = 0
+        self._array = None
+        self._header = None
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        """
+        Отображает файлы хранилища в память, создавая их при необходимости.
+        """
+        if os.path.exists(self.symbols_path):
+            with open(self.symbols_path, 'r') as file:
+                self.symbols = [line.rstrip('\n') for line in file if line.rstrip('\n')]
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        if not os.path.exists(self.data_path):
+            with open(self.data_path, 'wb') as file:
+                file.write(self.HEADER.pack(self.MAGIC, 0, 0))
+                file.truncate(self.HEADER.size + self.INITIAL_CAPACITY * TRADE_DTYPE.itemsize)
+
+        self._map()
+        magic, count, self.flags = self.HEADER.unpack(bytes(self._header[:self.HEADER.size]))
+        if magic != self.MAGIC:
+            raise ValueError(f"Файл {self.data_path} не является колоночным хранилищем сделок.")
+        # Записи после count могли быть записаны частично до сбоя — они игнорируются
+        self.count = min(count, self.capacity)
+
+    def _map(self):
+        """
+        Отображает заголовок и область записей в память.
+        """
+        size = os.path.getsize(self.data_path)
+        self.capacity = (size - self.HEADER.size) // TRADE_DTYPE.itemsize
+        self._header = np.memmap(self.data_path, dtype=np.uint8, mode='r+', shape=(self.HEADER.size,))
+        self._array = np.memmap(
+            self.data_path, dtype=TRADE_DTYPE, mode='r+', offset=self.HEADER.size, shape=(self.capacity,)
+        )
+
+    def _grow(self, required):
+        """
+        Увеличивает файл вдвое, пока в нём не поместится required записей.
+        """
+        capacity = max(self.capacity, self.INITIAL_CAPACITY)
+        while capacity < required:
+            capacity *= 2
+        self.flush()
+        self._array = None
+        self._header = None
+        with open(self.data_path, 'r+b') as file:
+            file.truncate(self.HEADER.size + capacity * TRADE_DTYPE.itemsize)
+        self._map()
+
+    def symbol_id(self, symbol):
+        """
+        Возвращает идентификатор актива, добавляя его в справочник при первом появлении.
+        """
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            with open(self.symbols_path, 'a') as file:
+                file.write(symbol + '\n')
+            self.symbols.append(symbol)
+            self.symbol_ids[symbol] = symbol_id
+        return symbol_id
+
+    def append(self, trade):
+        """
+        Дописывает сделку. Счётчик записей в заголовке обновляется после самой записи,
+        поэтому прерванная запись не становится видимой.
+        """
+        if self.count >= self.capacity:
+            self._grow(self.count + 1)
+        chat_id = trade.get('chat_id')
+        timestamp = parse_timestamp(trade.get('timestamp'))
+        if self.count and timestamp < self._array[self.count - 1]['timestamp']:
+            self.flags |= self.FLAG_UNORDERED
+        row = self._array[self.count]
+        row['timestamp'] = timestamp
+        row['symbol_id'] = self.symbol_id(trade.get('symbol') or '')
+        row['chat_id'] = NO_CHAT if chat_id is None else int(chat_id)
+        row['side'] = SIDES[trade['operation_type']]
+        row['price'] = float(trade['price'])
+        row['quantity'] = float(trade.get('quantity', 1.0))
+        row['pnl'] = float(trade['pnl']) if 'pnl' in trade else np.nan
+        self.count += 1
+        self._header[8:24] = np.frombuffer(struct.pack('<QQ', self.count, self.flags), dtype=np.uint8)
+
+    def flush(self):
+        """
+        Сбрасывает изменённые страницы отображения на диск.
+        """
+        if self._array is not None:
+            self._array.flush()
+            self._header.flush()
+
+    def close(self):
+        self.flush()
+        self._array = None
+        self._header = None
+
+    def rows(self):
+        """
+        Возвращает все записи как представление отображённого массива без копирования.
+        """
+        return self._array[:self.count]
+
+    def column(self, name):
+        """
+        Возвращает колонку (например, 'price') как представление без копирования.
+        """
+        return self.rows()[name]
+
+    def range(self, start=None, end=None):
+        """
+        Записи с меткой времени в полуинтервале [start, end).
+        При упорядоченных по времени записях используется бинарный поиск.
+        """
+        rows = self.rows()
+        timestamps = rows['timestamp']
+        if self.flags & self.FLAG_UNORDERED:
+            mask = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps < end
+            return rows[mask]
+        left = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        right = len(rows) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return rows[left:right]
+
+    def records(self, start=None, end=None):
+        """
+        Ленивая последовательность словарей сделок за период.
+        """
+        if start is None and end is None:
+            return TradeRecords(self.rows(), self.symbols)
+        return TradeRecords(self.range(start, end), self.symbols)
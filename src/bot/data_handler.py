@@ -3,86 +3,352 @@
 import os
 import json
 import csv
+import time
 import logging
+import threading
+from collections import deque
+from src.bot.trade_statistics import TradeStatistics, parse_timestamp
+from src.bot.columnar_store import ColumnarTradeStore, NO_CHAT
 
 class DataHandler:
     """
     Класс для работы с историей сделок.
+
+    История хранится в журнале JSON Lines: каждая сделка дописывается в конец файла
+    одной строкой, без перезаписи всего файла. Записи группируются в пакеты
+    (batch_size, flush_interval), а fsync выполняется согласно fsync_policy:
+    'always' — после каждой сделки, 'batch' — после каждого пакета, 'never' — на усмотрение ОС.
+    Файлы в прежних форматах json и csv импортируются в журнал при первой загрузке.
+    Статистика поддерживается инкрементально при каждой сохранённой сделке.
+
+    Формат 'columnar' хранит сделки в колоночном хранилище, отображаемом в память
+    (file_path — каталог): история не загружается в список словарей, а статистика
+    строится векторно при первом запросе.
+
+    flush() состоит из prepare_flush(), которая в потоке цикла событий забирает пакет,
+    и write_pending(), которая записывает пакеты по порядку и может выполняться в другом потоке.
     """
 
-    def __init__(self, file_path='trading_history.json', file_format='json'):
-        self.file_path = file_path
+    FSYNC_POLICIES = ('always', 'batch', 'never')
+
+    def __init__(self, file_path='trading_history.jsonl', file_format='jsonl', fsync_policy='batch',
+                 batch_size=100, flush_interval=1.0, compact_every=None, stats_bucket_seconds=60):
         self.file_format = file_format.lower()
+        if self.file_format in ('json', 'csv'):
+            # Прежний формат: файл импортируется в журнал рядом с ним
+            self.legacy_path = file_path
+            self.file_path = os.path.splitext(file_path)[0] + '.jsonl'
+        elif self.file_format in ('jsonl', 'columnar'):
+            self.legacy_path = None
+            self.file_path = file_path
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"Неподдерживаемая политика fsync: {fsync_policy}")
+        self.fsync_policy = fsync_policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Сжатие журнала после указанного числа новых записей (None — только вручную)
+        self.compact_every = compact_every
         self.trading_history = []
+        self.stats_bucket_seconds = stats_bucket_seconds
+        self.statistics = TradeStatistics(stats_bucket_seconds)
+        self.store = None
+        self._stats_loaded = True
+        self._buffer = []
+        self._unflushed = 0
+        self._file = None
+        # Подготовленные к записи пакеты: ('journal', байты), ('store', отображения хранилища)
+        # или ('compact', сделки для перезаписи журнала)
+        self._batches = deque()
+        self._io_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._since_compaction = 0
         self.logger = logging.getLogger(__name__)
         self.load_trading_history()
 
     def load_trading_history(self):
         """
-        Загружает историю сделок из файла.
+        Загружает историю сделок из журнала, отбрасывая недописанную последнюю запись.
         """
+        self.trading_history = []
+        self.statistics = TradeStatistics(self.stats_bucket_seconds)
+        if self.file_format == 'columnar':
+            self.store = ColumnarTradeStore(self.file_path)
+            self._stats_loaded = False
+            self.logger.info(f"Колоночное хранилище сделок открыто: {self.store.count} записей.")
+            return
         if os.path.exists(self.file_path):
             try:
-                with open(self.file_path, 'r') as file:
-                    if self.file_format == 'json':
-                        self.trading_history = json.load(file)
-                    elif self.file_format == 'csv':
-                        reader = csv.DictReader(file)
-                        self.trading_history = list(reader)
-                    else:
-                        self.logger.error("Неподдерживаемый формат файла.")
+                damaged = self._recover_journal()
                 self.logger.info("История сделок загружена.")
+                if damaged:
+                    self.compact()
             except Exception as e:
                 self.logger.error(f"Ошибка при загрузке истории сделок: {e}")
                 self.trading_history = []
+                self.statistics = TradeStatistics(self.stats_bucket_seconds)
+        elif self.legacy_path and os.path.exists(self.legacy_path):
+            self.import_history(self.legacy_path, self.file_format)
         else:
             self.logger.info("Файл истории сделок не найден. Начинаем с пустой истории.")
 
-    def save_trading_history(self, trade_data):
+    def _recover_journal(self):
         """
-        Сохраняет данные о сделке в файл.
+        Читает журнал построчно. Хвост без перевода строки — запись, прерванная сбоем:
+        файл обрезается до последней целой записи. Возвращает число повреждённых строк внутри файла.
+        """
+        with open(self.file_path, 'rb') as file:
+            data = file.read()
+
+        valid_end = data.rfind(b'\n') + 1
+        if valid_end < len(data):
+            self.logger.warning(
+                f"Обнаружена недописанная запись журнала ({len(data) - valid_end} байт), она будет отброшена."
+            )
+            with open(self.file_path, 'r+b') as file:
+                file.truncate(valid_end)
+                file.flush()
+                os.fsync(file.fileno())
+
+        damaged = 0
+        for line in data[:valid_end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                trade = json.loads(line)
+            except ValueError:
+                damaged += 1
+                continue
+            self.trading_history.append(trade)
+            self._index(trade)
+        if damaged:
+            self.logger.warning(f"Пропущено повреждённых записей журнала: {damaged}.")
+        return damaged
+
+    def import_history(self, path, file_format):
+        """
+        Импортирует историю из файла json или csv и дописывает её в журнал.
         """
-        self.trading_history.append(trade_data)
         try:
-            with open(self.file_path, 'w') as file:
-                if self.file_format == 'json':
-                    json.dump(self.trading_history, file, indent=4)
-                elif self.file_format == 'csv':
-                    writer = csv.DictWriter(file, fieldnames=trade_data.keys())
-                    writer.writeheader()
-                    writer.writerows(self.trading_history)
+            with open(path, 'r') as file:
+                if file_format == 'json':
+                    records = json.load(file)
+                elif file_format == 'csv':
+                    records = [self._csv_record(row) for row in csv.DictReader(file)]
                 else:
                     self.logger.error("Неподдерживаемый формат файла.")
-            self.logger.info("История сделок сохранена.")
+                    return 0
+        except Exception as e:
+            self.logger.error(f"Ошибка при импорте истории сделок: {e}")
+            return 0
+
+        for record in records:
+            self._append(record)
+        self.flush()
+        self.logger.info(f"Импортировано сделок из {path}: {len(records)}.")
+        return len(records)
+
+    def _csv_record(self, row):
+        """
+        Строка csv: все значения — строки, chat_id приводится к числу, как в журнале и json.
+        Пустой chat_id означает сделку без чата.
+        """
+        chat_id = row.pop('chat_id', None)
+        if chat_id not in (None, ''):
+            row['chat_id'] = int(chat_id)
+        return row
+
+    def save_trading_history(self, trade_data):
+        """
+        Дописывает сделку в журнал.
+        """
+        try:
+            self._append(trade_data)
+            if (self.fsync_policy == 'always'
+                    or self._unflushed >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+            if self.compact_every and self._since_compaction >= self.compact_every:
+                # Переписывается журнал при следующей записи пакетов, а не в потоке цикла событий
+                self.prepare_compact()
         except Exception as e:
             self.logger.error(f"Ошибка при сохранении истории сделок: {e}")
 
-    def get_trading_history(self):
+    def _append(self, trade_data):
         """
-        Возвращает всю историю сделок.
+        Добавляет сделку в память и в буфер записи.
         """
-        return self.trading_history
+        self._unflushed += 1
+        if self.store is not None:
+            self.store.append(trade_data)
+            if self._stats_loaded:
+                self._index(trade_data)
+            return
+        self.trading_history.append(trade_data)
+        self._index(trade_data)
+        self._buffer.append(self._encode(trade_data))
+        self._since_compaction += 1
 
-    def get_statistics(self):
+    def _index(self, trade_data):
         """
-        Вычисляет и возвращает статистику по сделкам.
+        Учитывает сделку в инкрементальной статистике.
         """
-        total_buys = sum(1 for trade in self.trading_history if trade.get('operation_type') == 'buy')
-        total_sells = sum(1 for trade in self.trading_history if trade.get('operation_type') == 'sell')
-        average_buy_price = (
-            sum(float(trade['price']) for trade in self.trading_history if trade.get('operation_type') == 'buy') / total_buys
-            if total_buys > 0 else 0
-        )
-        average_sell_price = (
-            sum(float(trade['price']) for trade in self.trading_history if trade.get('operation_type') == 'sell') / total_sells
-            if total_sells > 0 else 0
-        )
+        try:
+            self.statistics.add(trade_data)
+        except (ValueError, TypeError, KeyError) as e:
+            self.logger.error(f"Сделка не учтена в статистике: {e}")
 
-        self.logger.info("Статистика по сделкам вычислена.")
+    def _encode(self, trade_data):
+        return json.dumps(trade_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
 
-        return {
-            'total_buys': total_buys,
-            'total_sells': total_sells,
-            'average_buy_price': average_buy_price,
-            'average_sell_price': average_sell_price
-        }
+    def flush(self):
+        """
+        Записывает накопленный пакет сделок одним вызовом write (групповая фиксация).
+        """
+        self.prepare_flush()
+        self.write_pending()
+
+    def prepare_flush(self):
+        """
+        Забирает накопленный пакет сделок для write_pending(). Вызывается в потоке цикла событий.
+        """
+        if self.store is not None:
+            if self._unflushed and self.fsync_policy != 'never':
+                # Текущие отображения: после _grow хранилище переоткрывает файл, а эти остаются действительными
+                self._batches.append(('store', (self.store._array, self.store._header)))
+            self._unflushed = 0
+            self._last_flush = time.monotonic()
+            return
+        if not self._buffer:
+            return
+        self._batches.append(('journal', b''.join(self._buffer)))
+        self._buffer = []
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def write_pending(self):
+        """
+        Записывает подготовленные пакеты в порядке подготовки. Можно вызывать из другого потока.
+        """
+        with self._io_lock:
+            while self._batches:
+                kind, data = self._batches.popleft()
+                if kind == 'store':
+                    for mapping in data:
+                        mapping.flush()
+                    continue
+                if kind == 'compact':
+                    self._rewrite_journal(data)
+                    continue
+                if self._file is None:
+                    self._file = open(self.file_path, 'ab')
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync_policy != 'never':
+                    os.fsync(self._file.fileno())
+
+    def compact(self):
+        """
+        Переписывает журнал начисто во временный файл и атомарно заменяет им исходный.
+        Удаляет повреждённые записи и фрагменты, оставшиеся после сбоев.
+        Колоночному хранилищу сжатие не требуется: записи фиксированной ширины,
+        а недописанная запись не учитывается в счётчике.
+        """
+        self.prepare_compact()
+        self.write_pending()
+
+    def prepare_compact(self):
+        """
+        Готовит сжатие журнала для write_pending(): сделки, уже записанные в буфер, входят в новый журнал.
+        Вызывается в потоке цикла событий.
+        """
+        if self.store is not None:
+            return
+        self.prepare_flush()
+        self._batches.append(('compact', list(self.trading_history)))
+        self._since_compaction = 0
+
+    def _rewrite_journal(self, trades):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        tmp_path = self.file_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(b''.join(self._encode(trade) for trade in trades))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.file_path)
+            self._fsync_directory()
+            self.logger.info("Журнал истории сделок сжат.")
+        except Exception as e:
+            self.logger.error(f"Ошибка при сжатии журнала истории сделок: {e}")
+
+    def _fsync_directory(self):
+        """
+        Фиксирует переименование файла на диске (на системах, где это поддерживается).
+        """
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """
+        Сбрасывает буфер и закрывает файл журнала.
+        """
+        self.flush()
+        if self.store is not None:
+            self.store.close()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def get_trading_history(self, start=None, end=None):
+        """
+        Возвращает историю сделок, при указании start/end — только за полуинтервал [start, end).
+        Для колоночного хранилища возвращается ленивая последовательность без копирования данных.
+        """
+        if self.store is not None:
+            return self.store.records(start, end)
+        if start is None and end is None:
+            return self.trading_history
+        return [
+            trade for trade in self.trading_history
+            if (start is None or parse_timestamp(trade.get('timestamp')) >= start)
+            and (end is None or parse_timestamp(trade.get('timestamp')) < end)
+        ]
+
+    def get_statistics(self, period=None, symbol=None, chat_id=None):
+        """
+        Возвращает статистику по сделкам за период ('hour', 'day', 'week' или число секунд;
+        None — за всё время), по всем сделкам либо по одному активу или чату.
+        """
+        if not self._stats_loaded:
+            self._load_columnar_statistics()
+        return self.statistics.get(period=period, symbol=symbol, chat_id=chat_id)
+
+    def _load_columnar_statistics(self):
+        """
+        Строит статистику по колонкам хранилища векторно, без создания словарей сделок.
+        """
+        rows = self.store.rows()
+        symbols = self.store.symbols
+        self.statistics = TradeStatistics(self.stats_bucket_seconds)
+        self.statistics.add_columns(
+            rows['timestamp'], rows['side'], rows['price'], rows['quantity'], rows['pnl'],
+            {
+                'symbol': (rows['symbol_id'], lambda symbol_id: symbols[symbol_id], None),
+                'chat_id': (rows['chat_id'], lambda chat_id: chat_id, NO_CHAT)
+            }
+        )
+        self._stats_loaded = True
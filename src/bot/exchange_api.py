@@ -1,33 +1,59 @@
 # src/bot/exchange_api.py
 
+import asyncio
 import requests
+import aiohttp
 import logging
 import hashlib
 import hmac
 import time
+from src.bot.request_scheduler import RequestScheduler, RetryableError
+from src.bot.metrics import metrics
 
-class ExchangeAPI:
+class BaseExchangeAPI:
     """
-    Класс для взаимодействия с API биржи.
+    Общая часть клиентов API биржи: подпись запросов и разбор ответов.
     """
 
+    TICKERS_ENDPOINT = '/v5/market/tickers'
+    KLINE_ENDPOINT = '/v5/market/kline'
+
     def __init__(self, api_key, secret_key, base_url="https://api-testnet.bybit.com"):
         self.api_key = api_key
         self.secret_key = secret_key
         self.base_url = base_url
         self.logger = logging.getLogger(__name__)
 
-    def get_current_price(self, symbol):
+    def _prepare_params(self, params=None):
         """
-        Получает текущую цену указанного актива.
+        Добавляет к параметрам ключ, метку времени и подпись.
         """
-        endpoint = '/v5/market/tickers'
-        params = {
-            'symbol': symbol,
-            'category': 'spot'
-        }
-        response = self._send_request('GET', endpoint, params)
+        timestamp = str(int(time.time() * 1000))
+        params = dict(params or {})
+        params['api_key'] = self.api_key
+        params['timestamp'] = timestamp
+
+        # Генерируем подпись
+        sign = self._generate_signature(params)
+        params['sign'] = sign
+        return params
 
+    def _generate_signature(self, params):
+        """
+        Генерирует подпись для аутентификации запроса.
+        """
+        sorted_params = '&'.join([f"{key}={params[key]}" for key in sorted(params)])
+        hash = hmac.new(
+            bytes(self.secret_key, 'utf-8'),
+            bytes(sorted_params, 'utf-8'),
+            hashlib.sha256
+        )
+        return hash.hexdigest()
+
+    def _parse_price(self, response):
+        """
+        Извлекает последнюю цену из ответа на запрос тикера.
+        """
         if response and 'result' in response:
             try:
                 return float(response['result']['list'][0]['lastPrice'])
@@ -38,39 +64,248 @@ class ExchangeAPI:
             self.logger.error("Не удалось получить цену актива.")
             return None
 
-    def _send_request(self, method, endpoint, params=None):
+    def _parse_prices(self, response):
         """
-        Отправляет подписанный запрос к API.
+        Извлекает последние цены всех активов из ответа на запрос тикеров.
         """
-        timestamp = str(int(time.time() * 1000))
-        params = params or {}
-        params['api_key'] = self.api_key
-        params['timestamp'] = timestamp
+        if response and 'result' in response:
+            try:
+                tickers = response['result']['list']
+            except (TypeError, KeyError) as e:
+                self.logger.error(f"Ошибка при парсинге цен: {e}")
+                return None
+            prices = {}
+            for ticker in tickers:
+                try:
+                    prices[ticker['symbol']] = float(ticker['lastPrice'])
+                except (ValueError, TypeError, KeyError):
+                    continue
+            return prices
+        else:
+            self.logger.error("Не удалось получить цены активов.")
+            return None
 
-        # Генерируем подпись
-        sign = self._generate_signature(params)
-        params['sign'] = sign
+    def _kline_params(self, symbol, interval, start=None, end=None, limit=1000):
+        """
+        Формирует параметры запроса свечей.
+        """
+        params = {
+            'category': 'spot',
+            'symbol': symbol,
+            'interval': interval,
+            'limit': limit
+        }
+        if start is not None:
+            params['start'] = int(start)
+        if end is not None:
+            params['end'] = int(end)
+        return params
+
+    def _parse_klines(self, response):
+        """
+        Извлекает свечи (start, open, high, low, close, volume) в порядке возрастания времени.
+        """
+        if response and 'result' in response:
+            try:
+                rows = [
+                    (int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]))
+                    for row in response['result']['list']
+                ]
+            except (ValueError, TypeError, IndexError, KeyError) as e:
+                self.logger.error(f"Ошибка при парсинге свечей: {e}")
+                return None
+            rows.sort()
+            return rows
+        else:
+            self.logger.error("Не удалось получить свечи.")
+            return None
+
+class ExchangeAPI(BaseExchangeAPI):
+    """
+    Синхронный клиент API биржи для скриптов.
+    """
+
+    def __init__(self, api_key, secret_key, base_url="https://api-testnet.bybit.com", timeout=10):
+        super().__init__(api_key, secret_key, base_url)
+        self.timeout = timeout
+        # Сессия переиспользует TCP/TLS-соединения между запросами
+        self.session = requests.Session()
+
+    def get_current_price(self, symbol):
+        """
+        Получает текущую цену указанного актива.
+        """
+        params = {
+            'symbol': symbol,
+            'category': 'spot'
+        }
+        return self._parse_price(self._send_request('GET', self.TICKERS_ENDPOINT, params))
 
+    def get_all_prices(self):
+        """
+        Получает последние цены всех активов одним запросом.
+        """
+        params = {
+            'category': 'spot'
+        }
+        return self._parse_prices(self._send_request('GET', self.TICKERS_ENDPOINT, params))
+
+    def get_klines(self, symbol, interval='1', start=None, end=None, limit=1000):
+        """
+        Получает до limit свечей актива (одна страница ответа).
+        """
+        params = self._kline_params(symbol, interval, start, end, limit)
+        return self._parse_klines(self._send_request('GET', self.KLINE_ENDPOINT, params))
+
+    def close(self):
+        """
+        Закрывает соединения сессии.
+        """
+        self.session.close()
+
+    def _send_request(self, method, endpoint, params=None, timeout=None):
+        """
+        Отправляет подписанный запрос к API.
+        """
+        params = self._prepare_params(params)
         url = self.base_url + endpoint
+        timeout = timeout or self.timeout
+        started = metrics.start()
         try:
             if method == 'GET':
-                response = requests.get(url, params=params, timeout=10)
+                response = self.session.get(url, params=params, timeout=timeout)
             else:
-                response = requests.post(url, data=params, timeout=10)
+                response = self.session.post(url, data=params, timeout=timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Ошибка при выполнении запроса: {e}")
             return None
+        finally:
+            metrics.observe_since('exchange_request_seconds', started, endpoint=endpoint)
 
-    def _generate_signature(self, params):
+class AsyncExchangeAPI(BaseExchangeAPI):
+    """
+    Асинхронный клиент API биржи с ограниченным пулом keep-alive соединений.
+    Запросы проходят через планировщик: лимиты скорости, объединение одинаковых GET и повторы.
+    """
+
+    # Код ответа биржи «слишком много запросов» (приходит с HTTP 200)
+    RATE_LIMIT_RET_CODE = 10006
+
+    def __init__(self, api_key, secret_key, base_url="https://api-testnet.bybit.com",
+                 pool_size=20, timeout=10, keepalive_timeout=30, scheduler=None):
+        super().__init__(api_key, secret_key, base_url)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.scheduler = scheduler or RequestScheduler()
+        self._session = None
+
+    async def get_current_price(self, symbol, timeout=None):
         """
-        Генерирует подпись для аутентификации запроса.
+        Получает текущую цену указанного актива.
         """
-        sorted_params = '&'.join([f"{key}={params[key]}" for key in sorted(params)])
-        hash = hmac.new(
-            bytes(self.secret_key, 'utf-8'),
-            bytes(sorted_params, 'utf-8'),
-            hashlib.sha256
-        )
-        return hash.hexdigest()
+        params = {
+            'symbol': symbol,
+            'category': 'spot'
+        }
+        response = await self._send_request('GET', self.TICKERS_ENDPOINT, params, timeout=timeout)
+        return self._parse_price(response)
+
+    async def get_all_prices(self, timeout=None):
+        """
+        Получает последние цены всех активов одним запросом.
+        """
+        params = {
+            'category': 'spot'
+        }
+        response = await self._send_request('GET', self.TICKERS_ENDPOINT, params, timeout=timeout)
+        return self._parse_prices(response)
+
+    async def get_klines(self, symbol, interval='1', start=None, end=None, limit=1000, timeout=None):
+        """
+        Получает до limit свечей актива (одна страница ответа).
+        """
+        params = self._kline_params(symbol, interval, start, end, limit)
+        response = await self._send_request('GET', self.KLINE_ENDPOINT, params, timeout=timeout)
+        return self._parse_klines(response)
+
+    async def close(self):
+        """
+        Закрывает сессию и все соединения пула.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self):
+        """
+        Возвращает сессию, создавая её в текущем цикле событий при первом обращении.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def _send_request(self, method, endpoint, params=None, timeout=None):
+        """
+        Отправляет подписанный запрос к API через планировщик, не блокируя цикл событий.
+        Одновременные одинаковые GET-запросы выполняются один раз.
+        Время в метрике — от вызова до ответа, включая ожидание лимитов и повторы.
+        """
+        key = None
+        if method == 'GET':
+            key = (endpoint, tuple(sorted((params or {}).items())))
+        started = metrics.start()
+        try:
+            return await self.scheduler.submit(
+                endpoint, lambda: self._request_once(method, endpoint, params, timeout), key=key
+            )
+        finally:
+            metrics.observe_since('exchange_request_seconds', started, endpoint=endpoint)
+
+    async def _request_once(self, method, endpoint, params=None, timeout=None):
+        """
+        Одна попытка запроса. Подпись формируется заново, чтобы метка времени была свежей.
+        Бросает RetryableError, если запрос стоит повторить.
+        """
+        params = self._prepare_params(params)
+        url = self.base_url + endpoint
+        kwargs = {'params': params} if method == 'GET' else {'data': params}
+        if timeout:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        session = self._get_session()
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                self.scheduler.update_limits(endpoint, response.headers)
+                if response.status == 429 or response.status >= 500:
+                    raise RetryableError(
+                        f"HTTP {response.status}", retry_after=self._retry_after(response.headers)
+                    )
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise RetryableError(repr(e))
+        except (aiohttp.ClientError, ValueError) as e:
+            self.logger.error(f"Ошибка при выполнении запроса: {e!r}")
+            return None
+
+        if isinstance(data, dict) and data.get('retCode') == self.RATE_LIMIT_RET_CODE:
+            raise RetryableError(f"retCode {self.RATE_LIMIT_RET_CODE}: {data.get('retMsg')}")
+        return data
+
+    def _retry_after(self, headers):
+        """
+        Время ожидания из заголовка Retry-After в секундах, если он задан числом.
+        """
+        try:
+            return max(0.0, float(headers['Retry-After']))
+        except (KeyError, ValueError):
+            return None
@@ -0,0 +1,232 @@
+# src/bot/indicators.py
+
+import math
+import time
+from array import array
+
+class RingBuffer:
+    """
+    Кольцевой буфер фиксированного размера на array('d').
+    push возвращает вытесненное значение, чтобы скользящие суммы обновлялись за O(1).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = array('d', [0.0] * size)
+        self.count = 0
+        self.position = 0
+
+    def __len__(self):
+        return self.count
+
+    def full(self):
+        return self.count == self.size
+
+    def push(self, value):
+        evicted = self.values[self.position] if self.count == self.size else None
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        return evicted
+
+class EMA:
+    """
+    Экспоненциальное скользящее среднее с периодом period.
+    """
+
+    def __init__(self, period):
+        self.alpha = 2.0 / (period + 1)
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+class RollingStd:
+    """
+    Стандартное отклонение по последним window значениям: сумма и сумма квадратов
+    отклонений от первого значения (сдвиг защищает от потери точности), пересчёт за O(1).
+    """
+
+    def __init__(self, window):
+        self.buffer = RingBuffer(window)
+        self.shift = None
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def update(self, value):
+        if self.shift is None:
+            self.shift = value
+        value -= self.shift
+        evicted = self.buffer.push(value)
+        self.total += value
+        self.total_squares += value * value
+        if evicted is not None:
+            self.total -= evicted
+            self.total_squares -= evicted * evicted
+        return self.value
+
+    @property
+    def value(self):
+        count = len(self.buffer)
+        if count < 2:
+            return None
+        variance = (self.total_squares - self.total * self.total / count) / (count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+class ATR:
+    """
+    Средний истинный диапазон (сглаживание Уайлдера) по барам high/low/close.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.value = None
+        self.previous_close = None
+        self._warmup = []
+
+    def update(self, high, low, close):
+        if self.previous_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        if self.value is None:
+            # Первое значение — простое среднее первых period диапазонов
+            self._warmup.append(true_range)
+            if len(self._warmup) == self.period:
+                self.value = sum(self._warmup) / self.period
+                self._warmup = None
+        else:
+            self.value += (true_range - self.value) / self.period
+        return self.value
+
+class VWAP:
+    """
+    Средневзвешенная по объёму цена последних window тиков. Без объёма (volume=1) — скользящее среднее.
+    """
+
+    def __init__(self, window):
+        self.notional = RingBuffer(window)
+        self.volume = RingBuffer(window)
+        self.total_notional = 0.0
+        self.total_volume = 0.0
+
+    def update(self, price, volume=1.0):
+        notional = price * volume
+        evicted_notional = self.notional.push(notional)
+        evicted_volume = self.volume.push(volume)
+        self.total_notional += notional
+        self.total_volume += volume
+        if evicted_notional is not None:
+            self.total_notional -= evicted_notional
+            self.total_volume -= evicted_volume
+        return self.value
+
+    @property
+    def value(self):
+        if self.total_volume <= 0:
+            return None
+        return self.total_notional / self.total_volume
+
+class SymbolIndicators:
+    """
+    Индикаторы одного актива, общие для всех стратегий на нём.
+
+    EMA, стандартное отклонение доходностей и VWAP обновляются на каждом тике, ATR — по барам
+    длиной bar_seconds (high/low/close тиков внутри бара). Каждое обновление — O(1).
+    """
+
+    def __init__(self, symbol, period=14, window=100, bar_seconds=60, multiplier=1.0, clock=time.time):
+        self.symbol = symbol
+        self.clock = clock
+        self.multiplier = multiplier
+        self.bar_seconds = bar_seconds
+        self.ema = EMA(period)
+        self.atr = ATR(period)
+        # Отклонение доходностей тик к тику, в процентах
+        self.returns_std = RollingStd(window)
+        self.vwap = VWAP(window)
+        self.last_price = None
+        self.ticks = 0
+        self._bar = None
+
+    def update(self, price, volume=1.0, timestamp=None):
+        timestamp = self.clock() if timestamp is None else timestamp
+        self.ticks += 1
+        self.ema.update(price)
+        self.vwap.update(price, volume)
+        if self.last_price:
+            self.returns_std.update((price / self.last_price - 1) * 100)
+        self.last_price = price
+
+        bar_start = timestamp - timestamp % self.bar_seconds
+        bar = self._bar
+        if bar is None or bar_start > bar[0]:
+            if bar is not None:
+                self.atr.update(bar[1], bar[2], bar[3])
+            self._bar = [bar_start, price, price, price]
+        else:
+            if price > bar[1]:
+                bar[1] = price
+            if price < bar[2]:
+                bar[2] = price
+            bar[3] = price
+
+    def volatility_percent(self):
+        """
+        Волатильность в процентах цены: ATR, пока он не накоплен — отклонение доходностей.
+        """
+        if self.atr.value is not None and self.ema.value:
+            return self.atr.value / self.ema.value * 100
+        return self.returns_std.value
+
+    def spacing_percent(self, base_percent):
+        """
+        Шаг адаптивной сетки: multiplier волатильностей, но не меньше по модулю заданного base_percent.
+        Знак base_percent сохраняется: отрицательный процент падения по-прежнему разрешает покупку.
+        До накопления данных используется base_percent.
+        """
+        volatility = self.volatility_percent()
+        if volatility is None:
+            return base_percent
+        spacing = max(abs(base_percent), self.multiplier * volatility)
+        return -spacing if base_percent < 0 else spacing
+
+    def snapshot(self):
+        return {
+            'ema': self.ema.value,
+            'atr': self.atr.value,
+            'returns_std_percent': self.returns_std.value,
+            'vwap': self.vwap.value,
+            'volatility_percent': self.volatility_percent(),
+            'ticks': self.ticks
+        }
+
+class IndicatorRegistry:
+    """
+    Индикаторы по активам: один экземпляр SymbolIndicators на актив для всех чатов.
+    """
+
+    def __init__(self, period=14, window=100, bar_seconds=60, multiplier=1.0, clock=time.time):
+        self.period = period
+        self.window = window
+        self.bar_seconds = bar_seconds
+        self.multiplier = multiplier
+        self.clock = clock
+        self.symbols = {}
+
+    def get(self, symbol):
+        indicators = self.symbols.get(symbol)
+        if indicators is None:
+            indicators = self.symbols[symbol] = SymbolIndicators(
+                symbol, self.period, self.window, self.bar_seconds, self.multiplier, self.clock
+            )
+        return indicators
+
+    def update(self, symbol, price, volume=1.0, timestamp=None):
+        self.get(symbol).update(price, volume, timestamp)
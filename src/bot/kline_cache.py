@@ -0,0 +1,188 @@
+# src/bot/kline_cache.py
+
+import asyncio
+import logging
+import sqlite3
+import time
+import numpy as np
+
+# Длительность свечи в миллисекундах для интервалов биржи
+INTERVAL_MS = {
+    '1': 60000, '3': 180000, '5': 300000, '15': 900000, '30': 1800000,
+    '60': 3600000, '120': 7200000, '240': 14400000, '360': 21600000, '720': 43200000,
+    'D': 86400000, 'W': 604800000
+}
+
+def interval_ms(interval):
+    """
+    Возвращает длительность свечи интервала в миллисекундах.
+    """
+    try:
+        return INTERVAL_MS[str(interval)]
+    except KeyError:
+        raise ValueError(f"Неподдерживаемый интервал свечей: {interval}")
+
+class KlineCache:
+    """
+    Локальный кэш свечей в SQLite с индексом по (symbol, interval, start).
+    Отдельно хранятся уже загруженные диапазоны, чтобы отличать «свечей нет» от «не загружено».
+    """
+
+    def __init__(self, path='kline_cache.sqlite3'):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, interval, start)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                PRIMARY KEY (symbol, interval, start)
+            ) WITHOUT ROWID;
+        ''')
+        self.logger = logging.getLogger(__name__)
+
+    def close(self):
+        self.connection.close()
+
+    def store(self, symbol, interval, start, end, klines):
+        """
+        Сохраняет свечи и отмечает диапазон [start, end) как загруженный.
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(symbol, interval) + tuple(kline) for kline in klines]
+            )
+            self._add_coverage(symbol, interval, start, end)
+
+    def _add_coverage(self, symbol, interval, start, end):
+        """
+        Добавляет диапазон, объединяя его с пересекающимися и смежными.
+        """
+        rows = self.connection.execute(
+            'SELECT start, end FROM coverage WHERE symbol = ? AND interval = ? AND start <= ? AND end >= ?',
+            (symbol, interval, end, start)
+        ).fetchall()
+        for row_start, row_end in rows:
+            start = min(start, row_start)
+            end = max(end, row_end)
+        self.connection.executemany(
+            'DELETE FROM coverage WHERE symbol = ? AND interval = ? AND start = ?',
+            [(symbol, interval, row_start) for row_start, _ in rows]
+        )
+        self.connection.execute(
+            'INSERT INTO coverage VALUES (?, ?, ?, ?)', (symbol, interval, start, end)
+        )
+
+    def missing_ranges(self, symbol, interval, start, end):
+        """
+        Возвращает ещё не загруженные части диапазона [start, end).
+        """
+        rows = self.connection.execute(
+            'SELECT start, end FROM coverage WHERE symbol = ? AND interval = ? AND start < ? AND end > ? '
+            'ORDER BY start',
+            (symbol, interval, end, start)
+        ).fetchall()
+        gaps = []
+        cursor = start
+        for row_start, row_end in rows:
+            if row_start > cursor:
+                gaps.append((cursor, row_start))
+            cursor = max(cursor, row_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def load(self, symbol, interval, start, end):
+        """
+        Возвращает свечи диапазона [start, end) массивом NumPy
+        с колонками start, open, high, low, close, volume.
+        """
+        rows = self.connection.execute(
+            'SELECT start, open, high, low, close, volume FROM klines '
+            'WHERE symbol = ? AND interval = ? AND start >= ? AND start < ? ORDER BY start',
+            (symbol, interval, start, end)
+        ).fetchall()
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+class KlineHistory:
+    """
+    Загрузка истории свечей с биржи через локальный кэш.
+    Недостающие диапазоны разбиваются на страницы, которые запрашиваются параллельно
+    с ограничением числа одновременных запросов.
+    """
+
+    def __init__(self, api, cache, concurrency=4, page_limit=1000):
+        self.api = api
+        self.cache = cache
+        self.concurrency = concurrency
+        self.page_limit = page_limit
+        self.logger = logging.getLogger(__name__)
+
+    async def fetch(self, symbol, interval, start, end, semaphore=None):
+        """
+        Загружает в кэш недостающие свечи диапазона [start, end) и возвращает весь диапазон.
+        Незакрытая текущая свеча в кэш не попадает.
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        step = interval_ms(interval)
+        start = start // step * step
+        # Кэшируются только закрытые свечи
+        end = min(end, int(time.time() * 1000) // step * step)
+        if end <= start:
+            return self.cache.load(symbol, interval, start, end)
+
+        pages = []
+        for gap_start, gap_end in self.cache.missing_ranges(symbol, interval, start, end):
+            page_span = step * self.page_limit
+            for page_start in range(gap_start, gap_end, page_span):
+                pages.append((page_start, min(page_start + page_span, gap_end)))
+
+        if pages:
+            self.logger.info(f"Загрузка свечей {symbol} {interval}: {len(pages)} страниц.")
+            results = await asyncio.gather(*[
+                self._fetch_page(symbol, interval, page_start, page_end, semaphore)
+                for page_start, page_end in pages
+            ])
+            failed = results.count(False)
+            if failed:
+                self.logger.error(f"Не удалось загрузить {failed} страниц свечей {symbol} {interval}.")
+        return self.cache.load(symbol, interval, start, end)
+
+    async def fetch_many(self, requests):
+        """
+        Загружает несколько диапазонов (symbol, interval, start, end) с общим ограничением параллельности.
+        Возвращает словарь (symbol, interval) -> массив свечей.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[
+            self.fetch(symbol, interval, start, end, semaphore)
+            for symbol, interval, start, end in requests
+        ])
+        return {
+            (symbol, interval): klines
+            for (symbol, interval, _, _), klines in zip(requests, results)
+        }
+
+    async def _fetch_page(self, symbol, interval, start, end, semaphore):
+        """
+        Запрашивает одну страницу свечей [start, end) и сохраняет её в кэш.
+        """
+        async with semaphore:
+            # Биржа включает в ответ свечу, начинающуюся ровно в end, поэтому end - 1
+            klines = await self.api.get_klines(
+                symbol, interval=interval, start=start, end=end - 1, limit=self.page_limit
+            )
+        if klines is None:
+            return False
+        klines = [kline for kline in klines if start <= kline[0] < end]
+        self.cache.store(symbol, interval, start, end, klines)
+        return True
@@ -0,0 +1,116 @@
+# src/bot/log_pipeline.py
+
+import atexit
+import itertools
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import time
+
+# Атрибуты LogRecord, которые не относятся к полям события
+RESERVED_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+# Типы аргументов, которые можно передать в фоновый поток без форматирования:
+# их значение не изменится, пока запись ждёт в очереди
+IMMUTABLE_TYPES = (str, int, float, bool, type(None), bytes)
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирует запись как одну строку JSON: время, уровень, логгер, сообщение
+    и дополнительные поля, переданные через extra.
+    """
+
+    def format(self, record):
+        event = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                event[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            event['exception'] = record.exc_text
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает каждую every-ю запись частых событий: записей уровня не выше max_level
+    и записей с extra={'sample': True}. Остальные записи проходят всегда.
+    Счёт ведётся отдельно для каждого шаблона сообщения; в пропущенную запись
+    добавляется поле sampled — сколько записей она представляет.
+    """
+
+    def __init__(self, every=100, max_level=logging.DEBUG):
+        super().__init__()
+        self.every = max(1, int(every))
+        self.max_level = max_level
+        self._counters = {}
+
+    def filter(self, record):
+        if record.levelno > self.max_level and not getattr(record, 'sample', False):
+            return True
+        key = (record.name, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = itertools.count()
+        if next(counter) % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    Ставит запись в очередь фонового потока записи без форматирования сообщения:
+    строка собирается уже в потоке QueueListener. Изменяемые аргументы и трассировка
+    исключения фиксируются сразу, чтобы запись не зависела от последующих изменений.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        if record.args and not all(isinstance(arg, IMMUTABLE_TYPES) for arg in _args(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _args(args):
+    return args.values() if isinstance(args, dict) else args
+
+def configure_logging(config):
+    """
+    Применяет конфигурацию logging.config.dictConfig и переносит обработчики корневого логгера
+    в фоновый поток: в вызывающем потоке запись только фильтруется и ставится в очередь.
+    Фильтры корневого логгера (например, SamplingFilter) применяются до постановки в очередь.
+    Возвращает запущенный QueueListener.
+    """
+    for handler in config.get('handlers', {}).values():
+        filename = handler.get('filename')
+        if filename and os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+    logging.config.dictConfig(config)
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    records = queue.SimpleQueue()
+    queue_handler = BackgroundQueueHandler(records)
+    for log_filter in list(root.filters):
+        queue_handler.addFilter(log_filter)
+        root.removeFilter(log_filter)
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -2,7 +2,11 @@
 
 import os
 import sys
+import time
+import asyncio
 import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update, Bot
 from telegram.ext import (
     ApplicationBuilder,
@@ -11,24 +15,72 @@ from telegram.ext import (
     filters,
     ContextTypes,
     ConversationHandler,
+    TypeHandler,
     CallbackContext  # Добавили этот импорт
 )
 
 # Добавляем путь к корневой директории проекта
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.bot.exchange_api import ExchangeAPI
+from src.bot.exchange_api import AsyncExchangeAPI
+from src.bot.request_scheduler import RequestScheduler
 from src.bot.strategy import GridTradingStrategy
+from src.bot.portfolio import Portfolio, parse_allocations
+from src.bot.price_service import PriceService
+from src.bot.price_stream import PriceStream
+from src.bot.order_book import OrderBooks
+from src.bot.indicators import IndicatorRegistry
+from src.bot.outbox import Outbox
+from src.bot.scheduler import TickScheduler
+from src.bot.optimizer import ParameterSweep, format_results
+from src.bot.data_handler import DataHandler
+from src.bot.kline_cache import KlineCache, KlineHistory
+from src.bot.persistence import StatePersistence, MONITOR_PORTFOLIO
+from src.bot.log_pipeline import configure_logging
+from src.bot.metrics import metrics, format_summary, LoopLagMonitor, MetricsServer
 from src.config.settings import (
     available_assets,
     TELEGRAM_API_TOKEN,
     API_KEY,
     SECRET_KEY,
-    EXCHANGE_URL
+    EXCHANGE_URL,
+    EXCHANGE_POOL_SIZE,
+    EXCHANGE_TIMEOUT,
+    EXCHANGE_RATE_LIMIT,
+    EXCHANGE_MAX_RETRIES,
+    PRICE_POLL_INTERVAL,
+    PRICE_FEED_MODE,
+    EXCHANGE_WS_URL,
+    PRICE_STREAM_TOPIC,
+    ORDER_BOOK_DEPTH,
+    GRID_MODE,
+    GRID_VOLATILITY_MULTIPLIER,
+    INDICATOR_PERIOD,
+    INDICATOR_WINDOW,
+    INDICATOR_BAR_SECONDS,
+    TELEGRAM_RATE_LIMIT,
+    TELEGRAM_CHAT_INTERVAL,
+    TELEGRAM_SEND_CONCURRENCY,
+    OPTIMIZER_WORKERS,
+    OPTIMIZER_HISTORY_LIMIT,
+    OPTIMIZER_RESULTS_TTL,
+    TRADING_HISTORY_PATH,
+    TRADING_HISTORY_FORMAT,
+    TRADING_HISTORY_FSYNC,
+    TRADING_HISTORY_COMPACT_EVERY,
+    KLINE_CACHE_PATH,
+    KLINE_FETCH_CONCURRENCY,
+    STATE_PATH,
+    STATE_FSYNC,
+    STATE_CHECKPOINT_INTERVAL,
+    METRICS_ENABLED,
+    METRICS_HOST,
+    METRICS_PORT,
+    METRICS_LOOP_LAG_INTERVAL,
+    ADMIN_CHAT_IDS,
+    LOGGING
 )
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Инициализация бота
@@ -37,6 +89,77 @@ bot = Bot(token=TELEGRAM_API_TOKEN)
 # Глобальные данные пользователей
 user_data = {}
 
+# Индикаторы активов для адаптивной сетки: один набор на актив для всех чатов
+indicators = IndicatorRegistry(
+    period=INDICATOR_PERIOD,
+    window=INDICATOR_WINDOW,
+    bar_seconds=INDICATOR_BAR_SECONDS,
+    multiplier=GRID_VOLATILITY_MULTIPLIER
+) if GRID_MODE == 'adaptive' else None
+
+# Общий сервис цен для всех чатов
+price_service = PriceService(AsyncExchangeAPI(
+    api_key=API_KEY,
+    secret_key=SECRET_KEY,
+    base_url=EXCHANGE_URL,
+    pool_size=EXCHANGE_POOL_SIZE,
+    timeout=EXCHANGE_TIMEOUT,
+    scheduler=RequestScheduler(
+        ip_limit=(EXCHANGE_RATE_LIMIT, 2 * EXCHANGE_RATE_LIMIT),
+        max_retries=EXCHANGE_MAX_RETRIES
+    )
+), indicators=indicators)
+
+# Очередь исходящих сообщений о ценах и сделках
+outbox = Outbox(
+    global_rate=TELEGRAM_RATE_LIMIT,
+    chat_interval=TELEGRAM_CHAT_INTERVAL,
+    concurrency=TELEGRAM_SEND_CONCURRENCY
+)
+
+# Локальные стаканы из потока биржи: сделки исполняются по глубине с проскальзыванием
+order_books = OrderBooks(ORDER_BOOK_DEPTH) if ORDER_BOOK_DEPTH and PRICE_FEED_MODE == 'stream' else None
+
+# Хранилища на диске открываются в open_storage() при запуске, а не при импорте модуля:
+# история свечей с локальным кэшем, журнал и статистика сделок всех чатов,
+# снимки и журнал состояния чатов для восстановления после перезапуска
+kline_history = None
+data_handler = None
+persistence = None
+
+def open_storage():
+    """
+    Открывает кэш свечей, журнал сделок и состояние чатов по путям из настроек.
+    Повторный вызов ничего не делает.
+    """
+    global kline_history, data_handler, persistence
+    if persistence is not None:
+        return
+    kline_history = KlineHistory(price_service.api, KlineCache(KLINE_CACHE_PATH), concurrency=KLINE_FETCH_CONCURRENCY)
+    data_handler = DataHandler(
+        file_path=TRADING_HISTORY_PATH,
+        file_format=TRADING_HISTORY_FORMAT,
+        fsync_policy=TRADING_HISTORY_FSYNC,
+        compact_every=TRADING_HISTORY_COMPACT_EVERY
+    )
+    persistence = StatePersistence(STATE_PATH, fsync_policy=STATE_FSYNC)
+
+# Метрики производительности; пока они выключены, замеры в горячих путях ничего не стоят
+metrics.enabled = METRICS_ENABLED
+metrics.describe('exchange_request_seconds', "Время запроса к API биржи, включая ожидание лимитов и повторы")
+metrics.describe('strategy_evaluation_seconds', "Время применения цены к стратегии или портфелю чата")
+metrics.describe('price_check_seconds', "Полное время одной проверки цен по расписанию")
+metrics.describe('event_loop_lag_seconds', "Отставание цикла событий")
+metrics.describe('telegram_send_seconds', "Время отправки сообщения в Telegram")
+# Связанные гистограммы самых частых замеров
+strategy_timer = metrics.series('strategy_evaluation_seconds', mode='strategy')
+portfolio_timer = metrics.series('strategy_evaluation_seconds', mode='portfolio')
+metrics.gauge('outbox_pending_chats', lambda: outbox.backlog(), "Чаты с неотправленными сообщениями")
+metrics.gauge('scheduler_backlog', lambda: tick_scheduler.backlog, "Проверки цен, ожидающие выполнения в текущем проходе")
+metrics.gauge('scheduler_shards', lambda: len(tick_scheduler), "Активы и портфели в расписании проверок")
+metrics.gauge('scheduler_lag_seconds', lambda: tick_scheduler.lag_last, "Отставание последней проверки от расписания")
+metrics.gauge('monitored_chats', lambda: len(price_service.chat_symbols) + len(price_service.portfolios), "Чаты с запущенным мониторингом")
+
 # Состояния для ConversationHandler
 PARAMETERS = 1
 
@@ -57,6 +180,7 @@ async def choose_asset(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chosen_asset = update.message.text.upper()
     if chosen_asset in available_assets:
         context.user_data['chosen_asset'] = chosen_asset
+        persistence.log_asset(update.effective_chat.id, context.user_data, chosen_asset)
         await update.message.reply_text(f"Вы выбрали {chosen_asset}.")
         await update.message.reply_text("Введите команду /start_monitoring, чтобы начать мониторинг цен.")
     else:
@@ -89,6 +213,7 @@ async def receive_parameters(update: Update, context: ContextTypes.DEFAULT_TYPE)
             'price_drop_percent': price_drop_percent,
             'price_increase_percent': price_increase_percent
         }
+        persistence.log_params(update.effective_chat.id, context.user_data, context.user_data['strategy_params'])
 
         await update.message.reply_text("Параметры стратегии установлены.")
         return ConversationHandler.END
@@ -103,88 +228,459 @@ async def start_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Сначала выберите актив с помощью команды /trade.")
         return
 
-    strategy_params = context.user_data.get('strategy_params', {
-        'initial_capital': 1000,
-        'grid_step': 100,
-        'price_drop_percent': 0.1,
-        'price_increase_percent': 0.1
-    })
+    begin_monitoring(update.effective_chat.id, context.user_data)
+    await update.message.reply_text(monitoring_started_message())
 
-    context.user_data['strategy'] = GridTradingStrategy(
+# Параметры стратегии по умолчанию
+DEFAULT_STRATEGY_PARAMS = {
+    'initial_capital': 1000,
+    'grid_step': 100,
+    'price_drop_percent': 0.1,
+    'price_increase_percent': 0.1
+}
+
+# Создание стратегии чата и подписка на цены выбранного актива
+def begin_monitoring(chat_id, user_data):
+    strategy_params = user_data.get('strategy_params', DEFAULT_STRATEGY_PARAMS)
+
+    user_data.pop('portfolio', None)
+    user_data['strategy'] = GridTradingStrategy(
         initial_capital=strategy_params['initial_capital'],
         grid_step=strategy_params['grid_step'],
         price_drop_percent=strategy_params['price_drop_percent'],
         price_increase_percent=strategy_params['price_increase_percent']
     )
 
-    context.user_data['api'] = ExchangeAPI(api_key=API_KEY, secret_key=SECRET_KEY, base_url=EXCHANGE_URL)
+    persistence.log_monitor_start(chat_id, user_data, user_data['chosen_asset'], strategy_params)
+    price_service.subscribe(chat_id, user_data['chosen_asset'], user_data)
+    tick_scheduler.add(user_data['chosen_asset'])
 
-    chat_id = update.effective_chat.id
-    job = context.job_queue.run_repeating(
-        periodic_price_check,
-        interval=60,
-        first=0,
-        chat_id=chat_id,
-        name=str(chat_id),
-        data=context.user_data
-    )
-    context.user_data['job'] = job
+# Команда /portfolio: мониторинг нескольких активов с общим капиталом
+async def portfolio(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        allocations = parse_allocations(context.args, available_assets)
+    except ValueError as e:
+        await update.message.reply_text(
+            f"Ошибка: {e}\nУкажите активы и доли, например: /portfolio BTCUSDT=50 ETHUSDT=30 SOLUSDT=20"
+        )
+        return
 
-    await update.message.reply_text("Мониторинг цен запущен. Бот будет автоматически проверять цены каждые 60 секунд.")
+    begin_portfolio(update.effective_chat.id, context.user_data, allocations)
+    await update.message.reply_text(portfolio_started_message(allocations))
 
-# Функция периодической проверки цен
-async def periodic_price_check(context: CallbackContext):
-    job = context.job
-    chat_id = job.chat_id
-    bot = context.bot
-    user_data = job.data
+# Создание портфеля чата и подписка на цены всех его активов
+def begin_portfolio(chat_id, user_data, allocations):
+    strategy_params = user_data.get('strategy_params', DEFAULT_STRATEGY_PARAMS)
 
-    chosen_asset = user_data.get('chosen_asset')
+    user_data.pop('strategy', None)
+    user_data['portfolio'] = Portfolio(
+        initial_capital=strategy_params['initial_capital'],
+        grid_step=strategy_params['grid_step'],
+        price_drop_percent=strategy_params['price_drop_percent'],
+        price_increase_percent=strategy_params['price_increase_percent'],
+        allocations=allocations
+    )
+
+    persistence.log_portfolio_start(chat_id, user_data, strategy_params, allocations)
+    price_service.subscribe_portfolio(chat_id, allocations, user_data)
+    tick_scheduler.add(MONITOR_PORTFOLIO)
+
+def portfolio_started_message(allocations):
+    shares = ', '.join(f"{symbol} {weight * 100:.1f}%" for symbol, weight in allocations.items())
+    return f"Портфель: {shares}.\n{monitoring_started_message()}"
+
+def monitoring_started_message():
+    if PRICE_FEED_MODE == 'stream':
+        return "Мониторинг цен запущен. Бот будет применять стратегию к каждому тику и сообщать о сделках."
+    return f"Мониторинг цен запущен. Бот будет автоматически проверять цены каждые {PRICE_POLL_INTERVAL} секунд."
+
+# Снимок цен текущего интервала опроса: один запрос всех тикеров на интервал,
+# проверки активов и портфелей внутри интервала используют его
+async def refresh_prices():
+    return await price_service.refresh_interval(PRICE_POLL_INTERVAL, tick_scheduler.clock())
+
+# Проверка цены одного актива: цена из общего снимка применяется ко всем чатам, следящим за активом.
+# Возвращает False, когда подписчиков не осталось, и актив снимается с расписания
+async def process_symbol(symbol):
+    if not price_service.has_symbol_subscribers(symbol):
+        return False
+
+    refreshed = await refresh_prices()
+    current_price = price_service.get_price(symbol) if refreshed else None
+    for chat_id, data in price_service.iter_symbol_subscribers(symbol):
+        process_price(chat_id, data, symbol, current_price)
+    return True
+
+# Проверка всех портфелей: каждый портфель оценивается по общему снимку интервала.
+# Возвращает False, когда портфелей не осталось
+async def process_portfolios():
+    if not price_service.portfolios:
+        return False
+
+    refreshed = await refresh_prices()
+    for chat_id, data in price_service.iter_portfolios():
+        if refreshed:
+            process_portfolio(chat_id, data, price_service.snapshot)
+        else:
+            outbox.post(chat_id, "Не удалось получить цены активов.", key='price')
+    return True
+
+async def process_shard(shard):
+    started = metrics.start()
+    try:
+        if shard == MONITOR_PORTFOLIO:
+            return await process_portfolios()
+        return await process_symbol(shard)
+    finally:
+        metrics.observe_since('price_check_seconds', started, shard='portfolio' if shard == MONITOR_PORTFOLIO else shard)
+
+# Расписание проверок цен по активам (в режиме опроса); портфели проверяются отдельной ячейкой.
+# Цены запрашиваются один раз за интервал, по интервалу распределяется только применение к стратегиям
+tick_scheduler = TickScheduler(PRICE_POLL_INTERVAL, process_shard)
+
+# Применение цены к стратегии одного чата. Сообщения ставятся в очередь:
+# обновление цены без сделки заменяет предыдущее неотправленное, сделки отправляются первыми
+def process_price(chat_id, user_data, chosen_asset, current_price, notify_idle=True):
+    # Стратегия чата, восстановленного после перезапуска, собирается при первом тике
+    persistence.restore(chat_id, user_data)
     strategy = user_data.get('strategy')
-    api = user_data.get('api')
 
-    if not all([chosen_asset, strategy, api]):
-        await bot.send_message(chat_id=chat_id, text="Ошибка: Данные стратегии отсутствуют.")
+    if not strategy:
+        outbox.post(chat_id, "Ошибка: Данные стратегии отсутствуют.", priority=Outbox.NOTICE)
+        stop_chat(chat_id)
         return
 
-    current_price = api.get_current_price(chosen_asset)
     if current_price:
-        action = strategy.execute_trade(current_price)
+        book = order_books.get(chosen_asset) if order_books is not None else None
+        started = metrics.start()
+        action = strategy.execute_trade(current_price, book, price_service.get_indicators(chosen_asset))
+        strategy_timer.observe_since(started)
+        if action == "Ожидание." and not notify_idle:
+            return
         message = f'Текущая цена {chosen_asset}: {current_price} USD\nРезультат: {action}'
-        await bot.send_message(chat_id=chat_id, text=message)
 
         if action.startswith("Покупка") or action.startswith("Продажа"):
-            await bot.send_message(chat_id=chat_id, text=f"Совершено действие: {action}")
+            record_trade(chat_id, chosen_asset, strategy.last_trade)
+            # В журнал — цена исполнения (при стакане — средняя по глубине), а не цена тикера:
+            # восстановленный лот должен совпасть с открытым
+            persistence.log_trade(
+                chat_id, strategy.last_trade['operation_type'], strategy.last_trade['price'], strategy.grid_step
+            )
+            outbox.post(chat_id, message, priority=Outbox.TRADE)
+        else:
+            outbox.post(chat_id, message, key='price')
 
         if strategy.remaining_capital < strategy.grid_step:
-            await bot.send_message(chat_id=chat_id, text="Капитал исчерпан. Мониторинг остановлен.")
-            job.schedule_removal()
+            outbox.post(chat_id, "Капитал исчерпан. Мониторинг остановлен.", priority=Outbox.NOTICE)
+            stop_chat(chat_id)
     else:
-        await bot.send_message(chat_id=chat_id, text="Не удалось получить цену актива.")
+        outbox.post(chat_id, "Не удалось получить цену актива.", key='price')
+
+# Применение снимка цен к портфелю чата. Сделки по всем активам уходят одним сообщением
+def process_portfolio(chat_id, user_data, prices, symbols=None, notify_idle=True):
+    persistence.restore(chat_id, user_data)
+    portfolio = user_data.get('portfolio')
+
+    if not portfolio:
+        outbox.post(chat_id, "Ошибка: Данные портфеля отсутствуют.", priority=Outbox.NOTICE)
+        stop_chat(chat_id)
+        return
+
+    lines = []
+    traded = False
+    started = metrics.start()
+    results = portfolio.evaluate(prices, symbols, order_books, indicators)
+    portfolio_timer.observe_since(started)
+    for symbol, price, action in results:
+        strategy = portfolio.strategies[symbol]
+        if action.startswith("Покупка") or action.startswith("Продажа"):
+            traded = True
+            record_trade(chat_id, symbol, strategy.last_trade)
+            persistence.log_portfolio_trade(
+                chat_id, symbol, strategy.last_trade['operation_type'], strategy.last_trade['price'], portfolio.grid_step
+            )
+        elif not notify_idle:
+            continue
+        lines.append(f"{symbol}: {price} USD — {action}")
+
+    if traded:
+        lines.append(f"Свободные средства: {portfolio.cash:.2f}")
+        outbox.post(chat_id, '\n'.join(lines), priority=Outbox.TRADE)
+    elif lines:
+        outbox.post(chat_id, '\n'.join(lines), key='price')
+
+    if portfolio.exhausted():
+        outbox.post(chat_id, "Капитал портфеля исчерпан. Мониторинг остановлен.", priority=Outbox.NOTICE)
+        stop_chat(chat_id)
+
+# Остановка мониторинга чата с записью в журнал состояния
+def stop_chat(chat_id):
+    persistence.log_monitor_stop(chat_id)
+    return price_service.unsubscribe(chat_id)
+
+# Запись сделки в журнал
+def record_trade(chat_id, symbol, trade):
+    record = {'timestamp': time.time(), 'chat_id': chat_id, 'symbol': symbol}
+    record.update(trade)
+    data_handler.save_trading_history(record)
+
+# Запись журналов и снимков на диск в одном потоке: пакеты пишутся по порядку, fsync не блокирует цикл событий
+storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+
+def write_storage():
+    data_handler.write_pending()
+    persistence.write_pending()
+
+# Пакеты и снимок готовятся в цикле событий, где меняется состояние, а записываются в потоке хранилища
+async def run_storage_write():
+    await asyncio.get_running_loop().run_in_executor(storage_executor, write_storage)
+
+# Периодический сброс буфера журнала сделок на диск
+async def flush_trading_history(context: CallbackContext):
+    data_handler.prepare_flush()
+    persistence.prepare_flush()
+    if persistence.should_checkpoint() and not persistence.checkpoint_pending():
+        persistence.prepare_checkpoint()
+    await run_storage_write()
+
+# Периодический снимок состояния чатов; пока предыдущий не записан, новый не начинается
+async def checkpoint_state(context: CallbackContext):
+    if persistence.checkpoint_pending():
+        return
+    persistence.prepare_checkpoint()
+    await run_storage_write()
+
+# Итоговый сброс журналов и снимок состояния при остановке
+async def close_storage():
+    data_handler.prepare_flush()
+    persistence.prepare_checkpoint()
+    await run_storage_write()
+    data_handler.close()
+    persistence.close()
+
+# Перенос сохранённого состояния чата в user_data до обработки любого его обновления
+async def restore_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_chat is not None and context.user_data is not None:
+        persistence.restore(update.effective_chat.id, context.user_data)
+
+# Обработка тика из WebSocket-потока: стратегии получают каждую цену сразу,
+# сообщения отправляются только при сделках (notify_idle=False)
+async def process_tick(symbol, price, notify_idle=False):
+    price_service.update_price(symbol, price)
+    for chat_id, data in price_service.iter_symbol_subscribers(symbol):
+        process_price(chat_id, data, symbol, price, notify_idle=notify_idle)
+    for chat_id, data in price_service.iter_portfolios(symbol):
+        process_portfolio(chat_id, data, price_service.snapshot, (symbol,), notify_idle=notify_idle)
 
 # Команда /stop_monitoring
 async def stop_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if 'job' in context.user_data:
-        context.user_data['job'].schedule_removal()
-        del context.user_data['job']
+    # Неотправленные обновления цен после остановки уже не нужны
+    outbox.discard(update.effective_chat.id)
+    if stop_chat(update.effective_chat.id):
         await update.message.reply_text("Мониторинг цен остановлен.")
     else:
         await update.message.reply_text("Мониторинг не запущен.")
 
+# Перебор параметров выполняется по одному: одновременные /optimize ждут его завершения
+# и используют результаты последнего перебора по всем активам, пока они не устарели
+optimizer_lock = None
+# (момент завершения, начальный капитал, результаты) последнего перебора
+optimizer_results = None
+
+async def run_parameter_sweep(initial_capital):
+    """
+    Перебор параметров по истории всех доступных активов. Возвращает результаты
+    или None, если история не загружена.
+    """
+    global optimizer_results
+    now = time.time()
+    if optimizer_results is not None:
+        finished_at, capital, rows = optimizer_results
+        if capital == initial_capital and now - finished_at < OPTIMIZER_RESULTS_TTL:
+            return rows
+
+    end = int(now * 1000)
+    start = end - OPTIMIZER_HISTORY_LIMIT * 60000
+    klines = await kline_history.fetch_many([(symbol, '1', start, end) for symbol in available_assets])
+    price_history = {
+        symbol: np.ascontiguousarray(symbol_klines[:, 4])
+        for (symbol, _), symbol_klines in klines.items() if len(symbol_klines)
+    }
+    if not price_history:
+        return None
+
+    sweep = ParameterSweep(price_history, initial_capital, workers=OPTIMIZER_WORKERS)
+    rows = await asyncio.get_running_loop().run_in_executor(None, sweep.run)
+    optimizer_results = (time.time(), initial_capital, rows)
+    return rows
+
+# Команда /optimize: подбор параметров стратегии по истории всех активов, лучшие — для выбранного
+async def optimize(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    global optimizer_lock
+    chosen_asset = context.user_data.get('chosen_asset')
+    if not chosen_asset:
+        await update.message.reply_text("Сначала выберите актив с помощью команды /trade.")
+        return
+
+    if optimizer_lock is None:
+        optimizer_lock = asyncio.Lock()
+    if optimizer_lock.locked():
+        await update.message.reply_text("Подбор параметров уже выполняется, результат придёт после его завершения.")
+    else:
+        await update.message.reply_text(
+            f"Подбираю параметры по {OPTIMIZER_HISTORY_LIMIT} минутным свечам {len(available_assets)} активов..."
+        )
+
+    initial_capital = context.user_data.get('strategy_params', {}).get('initial_capital', 1000)
+    async with optimizer_lock:
+        rows = await run_parameter_sweep(initial_capital)
+
+    results = [row for row in rows or () if row['symbol'] == chosen_asset]
+    if not results:
+        await update.message.reply_text("Не удалось получить историю цен актива.")
+        return
+
+    await update.message.reply_text(
+        f"Лучшие параметры для {chosen_asset}:\n{format_results(results)}\n\n"
+        "Установить их можно командой /set_parameters."
+    )
+
 # Команда /status
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    strategy = context.user_data.get('strategy')
-    if strategy:
+    await update.message.reply_text(status_message(update.effective_chat.id, context.user_data))
+
+def status_message(chat_id, user_data):
+    strategy = user_data.get('strategy')
+    portfolio = user_data.get('portfolio')
+    if portfolio:
+        message = portfolio_status_message(portfolio)
+    elif strategy:
         message = (
             f"Текущий баланс: {strategy.remaining_capital}\n"
-            f"Открытые позиции: {strategy.purchase_prices}"
+            f"Открытые позиции: {strategy.purchase_prices}\n"
+            f"Вложено в позиции: {strategy.positions.cost_basis}"
         )
+        current_price = price_service.get_price(user_data.get('chosen_asset'))
+        if current_price and strategy.positions:
+            message += f"\nНереализованный PnL: {strategy.unrealized_pnl(current_price):.2f}"
+        symbol_indicators = price_service.get_indicators(user_data.get('chosen_asset'))
+        if symbol_indicators is not None:
+            drop_percent, increase_percent = strategy.grid_percents(symbol_indicators)
+            message += f"\nШаг сетки: падение {drop_percent:.3f}%, рост {increase_percent:.3f}%"
     else:
-        message = "Стратегия не запущена."
-    await update.message.reply_text(message)
+        return "Стратегия не запущена."
 
-def main():
-    application = ApplicationBuilder().token(TELEGRAM_API_TOKEN).build()
+    stats = data_handler.get_statistics(period='day', chat_id=chat_id)
+    message += (
+        f"\nЗа сутки: покупок {stats['total_buys']}, продаж {stats['total_sells']}, "
+        f"реализованный PnL {stats['realized_pnl']:.2f}"
+    )
+    return message
+
+# Сводка портфеля по последнему снимку цен
+def portfolio_status_message(portfolio):
+    summary = portfolio.summary(price_service.snapshot)
+    lines = [
+        f"Свободные средства: {summary['cash']:.2f}",
+        f"Вложено в позиции: {summary['invested']:.2f}",
+        f"Нереализованный PnL: {summary['unrealized_pnl']:.2f}",
+        f"Стоимость портфеля: {summary['equity']:.2f}"
+    ]
+    for row in summary['assets']:
+        lines.append(
+            f"{row['symbol']} ({row['allocation'] * 100:.1f}%): позиций {row['lots']}, "
+            f"вложено {row['cost_basis']:.2f}, PnL {row['unrealized_pnl']:.2f}"
+        )
+    return '\n'.join(lines)
+
+# Команда /perf: задержки горячих путей (p50/p99) и очереди, только для администраторов
+async def perf(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_chat.id not in ADMIN_CHAT_IDS:
+        await update.message.reply_text("Команда доступна только администраторам.")
+        return
+    if not metrics.enabled:
+        await update.message.reply_text("Метрики выключены. Включите их переменной окружения METRICS_ENABLED=true.")
+        return
+    await update.message.reply_text(format_summary(metrics))
+
+# Запуск метрик: замер отставания цикла событий и эндпоинт /metrics
+async def start_metrics(application):
+    if not metrics.enabled:
+        return
+    if application.job_queue is not None:
+        metrics.gauge('job_queue_jobs', lambda: len(application.job_queue.jobs()), "Задачи в очереди заданий")
+    lag_monitor = LoopLagMonitor(metrics, METRICS_LOOP_LAG_INTERVAL)
+    lag_monitor.start()
+    application.bot_data['lag_monitor'] = lag_monitor
+    if METRICS_PORT is not None:
+        try:
+            application.bot_data['metrics_server'] = await MetricsServer(metrics, METRICS_HOST, METRICS_PORT).start()
+        except OSError as e:
+            logger.error(f"Не удалось запустить эндпоинт метрик: {e}")
+
+async def stop_metrics(application):
+    lag_monitor = application.bot_data.get('lag_monitor')
+    if lag_monitor:
+        await lag_monitor.stop()
+    server = application.bot_data.get('metrics_server')
+    if server:
+        await server.stop()
+
+# Запуск очереди сообщений и источника цен: расписания опроса или WebSocket-потока
+async def start_background(application):
+    # Мониторинг чатов возобновляется сразу, стратегии восстанавливаются лениво
+    persistence.load()
+    for chat_id, symbol in persistence.monitored():
+        price_service.subscribe(chat_id, symbol, application.user_data[chat_id])
+        tick_scheduler.add(symbol)
+    for chat_id, symbols in persistence.monitored_portfolios():
+        price_service.subscribe_portfolio(chat_id, symbols, application.user_data[chat_id])
+        tick_scheduler.add(MONITOR_PORTFOLIO)
+    outbox.start(application.bot)
+    await start_metrics(application)
+    if PRICE_FEED_MODE == 'polling':
+        tick_scheduler.start()
+    else:
+        stream = PriceStream(
+            EXCHANGE_WS_URL, available_assets, process_tick, topic=PRICE_STREAM_TOPIC,
+            book_depth=ORDER_BOOK_DEPTH, on_book=order_books.apply_message if order_books is not None else None
+        )
+        application.bot_data['price_stream'] = stream
+        stream.start()
+
+# Закрытие соединений с биржей и журнала сделок при остановке бота
+async def close_exchange(application):
+    stream = application.bot_data.get('price_stream')
+    if stream:
+        await stream.stop()
+    await tick_scheduler.stop()
+    await stop_metrics(application)
+    await outbox.stop()
+    await price_service.api.close()
+    kline_history.cache.close()
+    await close_storage()
+
+# Сборка приложения Telegram; commands заменяет обработчики отдельных команд, bot — клиент Telegram API
+def build_application(post_init=start_background, post_shutdown=close_exchange, commands=None, bot=None):
+    handlers = {
+        'start': start,
+        'trade': trade,
+        'start_monitoring': start_monitoring,
+        'stop_monitoring': stop_monitoring,
+        'portfolio': portfolio,
+        'status': status,
+        'optimize': optimize,
+        'perf': perf
+    }
+    handlers.update(commands or {})
+    open_storage()
+
+    builder = ApplicationBuilder().bot(bot) if bot is not None else ApplicationBuilder().token(TELEGRAM_API_TOKEN)
+    if post_init:
+        builder = builder.post_init(post_init)
+    if post_shutdown:
+        builder = builder.post_shutdown(post_shutdown)
+    application = builder.build()
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler('set_parameters', set_parameters)],
@@ -193,15 +689,26 @@ def main():
         },
         fallbacks=[],
     )
+    application.add_handler(TypeHandler(Update, restore_session), group=-1)
     application.add_handler(conv_handler)
 
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("trade", trade))
-    application.add_handler(CommandHandler("start_monitoring", start_monitoring))
-    application.add_handler(CommandHandler("stop_monitoring", stop_monitoring))
-    application.add_handler(CommandHandler("status", status))
+    for command, handler in handlers.items():
+        application.add_handler(CommandHandler(command, handler))
 
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, choose_asset))
+    return application
+
+def main():
+    # Журнал пишется фоновым потоком: обработка тиков не ждёт записи на диск
+    configure_logging(LOGGING)
+    application = build_application()
+    application.job_queue.run_repeating(flush_trading_history, interval=1, name='history_flush')
+    application.job_queue.run_repeating(
+        checkpoint_state,
+        interval=STATE_CHECKPOINT_INTERVAL,
+        first=STATE_CHECKPOINT_INTERVAL,
+        name='state_checkpoint'
+    )
 
     application.run_polling()
 
@@ -0,0 +1,294 @@
+# src/bot/metrics.py
+
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from aiohttp import web
+
+def _latency_bounds(lowest=1e-6, highest=60.0, factor=2 ** 0.5):
+    bounds = []
+    bound = lowest
+    while bound < highest:
+        bounds.append(bound)
+        bound *= factor
+    bounds.append(highest)
+    return tuple(bounds)
+
+# Границы корзин гистограмм задержек: от 1 мкс до 60 с с шагом √2
+LATENCY_BOUNDS = _latency_bounds()
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин: запись — один бинарный поиск и
+    инкремент счётчика, квантили оцениваются интерполяцией внутри корзины.
+    """
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.clear()
+
+    def clear(self):
+        # Последняя корзина — значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Оценка квантиля q (0..1) или None для пустой гистограммы.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+class Series:
+    """
+    Гистограмма одного набора меток, связанная заранее: в самых частых замерах
+    не нужно собирать метки и искать гистограмму при каждом вызове.
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def observe_since(self, started):
+        if started is None:
+            return
+        self.histogram.observe(time.perf_counter() - started)
+
+class Metrics:
+    """
+    Реестр метрик процесса: гистограммы задержек с метками и показатели, снимаемые при запросе.
+
+    Пока метрики выключены, start() возвращает None, а observe_since() сразу выходит,
+    поэтому замеры в горячих путях стоят пару вызовов без обращения к часам.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        # (имя, метки) -> Histogram
+        self.histograms = {}
+        # имя -> функция без аргументов, возвращающая текущее значение
+        self.gauges = {}
+        self.descriptions = {}
+
+    def start(self):
+        """
+        Момент начала замера или None, если метрики выключены.
+        """
+        return time.perf_counter() if self.enabled else None
+
+    def observe_since(self, name, started, **labels):
+        """
+        Записывает время, прошедшее с started (результат start()), в гистограмму name.
+        """
+        if started is None:
+            return
+        self.observe(name, time.perf_counter() - started, **labels)
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def series(self, name, **labels):
+        """
+        Связанная гистограмма name с метками labels для горячих путей.
+        """
+        return Series(self.histogram(name, **labels))
+
+    def gauge(self, name, callback, description=None):
+        """
+        Регистрирует показатель, значение которого вычисляется callback() при каждом запросе метрик.
+        """
+        self.gauges[name] = callback
+        if description:
+            self.descriptions[name] = description
+
+    def describe(self, name, description):
+        self.descriptions[name] = description
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+
+    def render(self):
+        """
+        Метрики в текстовом формате Prometheus.
+        """
+        lines = []
+        described = set()
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name not in described:
+                described.add(name)
+                if name in self.descriptions:
+                    lines.append(f"# HELP {name} {self.descriptions[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = f"{label_text}," if label_text else ''
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+            suffix = f"{{{label_text}}}" if label_text else ''
+            lines.append(f"{name}_sum{suffix} {histogram.sum:.9g}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+        for name, callback in sorted(self.gauges.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            if name in self.descriptions:
+                lines.append(f"# HELP {name} {self.descriptions[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        Сводка гистограмм: [{name, labels, count, p50, p99, max}] и текущие значения показателей.
+        """
+        rows = []
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            rows.append({
+                'name': name,
+                'labels': dict(labels),
+                'count': histogram.count,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+                'max': histogram.max
+            })
+        gauges = {}
+        for name, callback in sorted(self.gauges.items()):
+            try:
+                gauges[name] = callback()
+            except Exception:
+                gauges[name] = None
+        return rows, gauges
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_seconds(value):
+    if value is None:
+        return '—'
+    if value < 1e-3:
+        return f"{value * 1e6:.0f} мкс"
+    if value < 1:
+        return f"{value * 1e3:.1f} мс"
+    return f"{value:.2f} с"
+
+def format_summary(metrics):
+    """
+    Текст сводки для команды /perf: p50/p99 по каждой гистограмме и текущие показатели.
+    """
+    rows, gauges = metrics.summary()
+    if not rows and not gauges:
+        return "Замеров пока нет."
+    lines = []
+    for row in rows:
+        labels = ', '.join(f"{key}={value}" for key, value in row['labels'].items())
+        title = f"{row['name']} [{labels}]" if labels else row['name']
+        lines.append(
+            f"{title}: p50 {_format_seconds(row['p50'])}, p99 {_format_seconds(row['p99'])}, "
+            f"макс. {_format_seconds(row['max'])}, n={row['count']}"
+        )
+    for name, value in gauges.items():
+        lines.append(f"{name}: {value}")
+    return '\n'.join(lines)
+
+class LoopLagMonitor:
+    """
+    Измеряет отставание цикла событий: насколько позже заданного просыпается задача,
+    засыпающая на interval секунд.
+    """
+
+    def __init__(self, metrics, interval=0.5, name='event_loop_lag_seconds'):
+        self.metrics = metrics
+        self.interval = interval
+        self.name = name
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.metrics.observe(self.name, max(0.0, loop.time() - started - self.interval))
+
+class MetricsServer:
+    """
+    Локальный HTTP-эндпоинт /metrics в текстовом формате Prometheus.
+    """
+
+    def __init__(self, metrics, host='127.0.0.1', port=9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+        self.logger = logging.getLogger(__name__)
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self.metrics.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        """
+        Запускает сервер; при port=0 порт выбирается автоматически.
+        """
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+        self.logger.info(f"Метрики доступны по адресу http://{self.host}:{self.port}/metrics")
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+# Метрики процесса: включаются настройкой METRICS_ENABLED
+metrics = Metrics()
@@ -0,0 +1,145 @@
+# src/bot/optimizer.py
+
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src.bot.backtest import run_backtest
+
+# Сетка параметров по умолчанию для перебора. Без открытых позиций execute_trade покупает,
+# только если процент падения не больше нуля (опорная цена равна текущей), поэтому при
+# положительных значениях стратегия не открывает ни одного лота и все прогоны дают 0 сделок.
+# 0 — докупка на новых минимумах, отрицательные значения — докупка не выше минимума + |процент|
+DEFAULT_GRID = {
+    'grid_step': [50, 100, 200],
+    'price_drop_percent': [-0.2, -0.1, -0.05, -0.02, 0.0],
+    'price_increase_percent': [0.05, 0.1, 0.2, 0.5, 1.0]
+}
+
+# Массивы цен, подключённые в процессе-воркере: symbol -> np.ndarray
+_worker_prices = {}
+_worker_blocks = []
+
+def parameter_grid(grid):
+    """
+    Возвращает все сочетания параметров из сетки (декартово произведение).
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def sample_parameters(grid, samples, seed=None):
+    """
+    Возвращает случайную выборку сочетаний параметров из сетки без повторов.
+    """
+    combinations = parameter_grid(grid)
+    if samples >= len(combinations):
+        return combinations
+    return random.Random(seed).sample(combinations, samples)
+
+def _attach_prices(specs):
+    """
+    Инициализатор воркера: создаёт представления массивов цен поверх разделяемой памяти без копирования.
+    """
+    for symbol, name, length in specs:
+        # Блоком владеет и удаляет его родительский процесс
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        _worker_prices[symbol] = np.ndarray((length,), dtype=np.float64, buffer=block.buf)
+
+def _run_task(task):
+    """
+    Прогоняет бэктест одного сочетания параметров в воркере.
+    """
+    symbol, initial_capital, params = task
+    result = run_backtest(_worker_prices[symbol], initial_capital=initial_capital, **params)
+    row = {'symbol': symbol, 'initial_capital': initial_capital}
+    row.update(params)
+    row.update(result.summary())
+    return row
+
+class ParameterSweep:
+    """
+    Перебор параметров сеточной стратегии по истории цен нескольких активов на пуле процессов.
+    """
+
+    def __init__(self, price_history, initial_capital, grid=None, samples=None, workers=None, seed=None):
+        # price_history: symbol -> массив цен
+        self.price_history = price_history
+        self.initial_capital = initial_capital
+        self.grid = grid or DEFAULT_GRID
+        self.samples = samples
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.logger = logging.getLogger(__name__)
+
+    def combinations(self):
+        """
+        Сочетания параметров для перебора: вся сетка или случайная выборка.
+        """
+        if self.samples:
+            return sample_parameters(self.grid, self.samples, self.seed)
+        return parameter_grid(self.grid)
+
+    def run(self):
+        """
+        Выполняет перебор и возвращает результаты, отсортированные по доходности и просадке.
+        """
+        combinations = self.combinations()
+        tasks = [
+            (symbol, self.initial_capital, params)
+            for symbol in self.price_history
+            for params in combinations
+        ]
+        if not tasks:
+            return []
+
+        blocks = []
+        try:
+            specs = []
+            for symbol, prices in self.price_history.items():
+                prices = np.ascontiguousarray(prices, dtype=np.float64)
+                block = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(prices.shape, dtype=np.float64, buffer=block.buf)[:] = prices
+                specs.append((symbol, block.name, len(prices)))
+
+            workers = min(self.workers, len(tasks))
+            chunksize = max(1, len(tasks) // (workers * 4))
+            self.logger.info(
+                f"Перебор параметров: {len(tasks)} прогонов, {len(specs)} активов, {workers} процессов."
+            )
+            # spawn, а не fork: перебор запускается из потока работающего бота с циклом событий и потоками
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_attach_prices, initargs=(specs,)
+            ) as pool:
+                rows = list(pool.map(_run_task, tasks, chunksize=chunksize))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        return rank_results(rows)
+
+def rank_results(rows):
+    """
+    Сортирует результаты: выше итоговый капитал (с реализованной прибылью), при равенстве — меньше просадка.
+    """
+    return sorted(rows, key=lambda row: (-row['final_equity'], row['max_drawdown_percent']))
+
+def format_results(rows, limit=5):
+    """
+    Форматирует лучшие результаты перебора в текстовую таблицу.
+    """
+    lines = []
+    for place, row in enumerate(rows[:limit], start=1):
+        lines.append(
+            f"{place}. {row['symbol']}: шаг {row['grid_step']}, падение {row['price_drop_percent']}%, "
+            f"рост {row['price_increase_percent']}% → доходность {row['return_percent']:.2f}%, "
+            f"просадка {row['max_drawdown_percent']:.2f}%, сделок {row['total_buys'] + row['total_sells']}"
+        )
+    return '\n'.join(lines)
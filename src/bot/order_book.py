@@ -0,0 +1,245 @@
+# src/bot/order_book.py
+
+import logging
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+# Результат симуляции исполнения: средняя цена, количество актива, сумма в USD,
+# число затронутых уровней и признак полного исполнения
+Fill = namedtuple('Fill', ['price', 'quantity', 'notional', 'levels', 'complete'])
+
+class BookSide:
+    """
+    Одна сторона стакана: уровни цен в двух массивах array('d'), отсортированных так,
+    что лучший уровень всегда последний. Обновления у лучшей цены (самые частые)
+    сдвигают минимум элементов, лучшая цена берётся за O(1), проход по глубине идёт с конца.
+    """
+
+    def __init__(self, bids):
+        # Ключ цены: у покупок — цена, у продаж — цена со знаком минус, чтобы лучшая была наибольшей
+        self.sign = 1.0 if bids else -1.0
+        self.keys = array('d')
+        self.sizes = array('d')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = array('d')
+        self.sizes = array('d')
+
+    def update(self, price, size):
+        """
+        Устанавливает объём уровня; нулевой объём удаляет уровень.
+        """
+        key = self.sign * price
+        keys = self.keys
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            if size:
+                self.sizes[index] = size
+            else:
+                del keys[index]
+                del self.sizes[index]
+        elif size:
+            keys.insert(index, key)
+            self.sizes.insert(index, size)
+
+    def trim(self, depth):
+        """
+        Оставляет depth лучших уровней.
+        """
+        excess = len(self.keys) - depth
+        if excess > 0:
+            del self.keys[:excess]
+            del self.sizes[:excess]
+
+    def best(self):
+        """
+        Лучший уровень (цена, объём) или None для пустой стороны.
+        """
+        if not self.keys:
+            return None
+        return self.sign * self.keys[-1], self.sizes[-1]
+
+    def levels(self, depth=None):
+        """
+        Уровни от лучшего к худшему: [(цена, объём)].
+        """
+        count = len(self.keys) if depth is None else min(depth, len(self.keys))
+        return [(self.sign * self.keys[-i], self.sizes[-i]) for i in range(1, count + 1)]
+
+    def fill_notional(self, notional):
+        """
+        Проходит уровни от лучшего, пока не будет потрачено notional USD (покупка по стороне продаж).
+        """
+        remaining = notional
+        quantity = 0.0
+        levels = 0
+        keys, sizes, sign = self.keys, self.sizes, self.sign
+        for index in range(len(keys) - 1, -1, -1):
+            if remaining <= 0:
+                break
+            price = sign * keys[index]
+            taken = min(remaining, price * sizes[index])
+            quantity += taken / price
+            remaining -= taken
+            levels += 1
+        spent = notional - remaining
+        return Fill(spent / quantity if quantity else None, quantity, spent, levels, remaining <= 1e-9 * notional)
+
+    def fill_quantity(self, quantity):
+        """
+        Проходит уровни от лучшего, пока не будет исполнено quantity актива (продажа по стороне покупок).
+        """
+        remaining = quantity
+        notional = 0.0
+        levels = 0
+        keys, sizes, sign = self.keys, self.sizes, self.sign
+        for index in range(len(keys) - 1, -1, -1):
+            if remaining <= 0:
+                break
+            taken = min(remaining, sizes[index])
+            notional += taken * sign * keys[index]
+            remaining -= taken
+            levels += 1
+        filled = quantity - remaining
+        return Fill(notional / filled if filled else None, filled, notional, levels, remaining <= 1e-9 * quantity)
+
+class OrderBook:
+    """
+    Локальный стакан L2 одного актива: снимок и последующие изменения уровней.
+
+    Изменения применяются только подряд по номеру обновления; при пропуске стакан
+    помечается рассинхронизированным и не используется до нового снимка.
+    """
+
+    def __init__(self, symbol, depth=None):
+        self.symbol = symbol
+        self.depth = depth
+        self.bids = BookSide(bids=True)
+        self.asks = BookSide(bids=False)
+        self.update_id = None
+        self.synced = False
+        self.updates = 0
+
+    def apply_snapshot(self, bids, asks, update_id=None):
+        self.bids.clear()
+        self.asks.clear()
+        self._apply_levels(bids, asks)
+        self.update_id = update_id
+        self.synced = True
+        self.updates += 1
+
+    def apply_delta(self, bids, asks, update_id=None):
+        """
+        Применяет изменения уровней. Возвращает False при пропуске обновления.
+        Изменения, уже учтённые в снимке (номер не больше номера снимка), пропускаются.
+        """
+        if not self.synced:
+            return False
+        if update_id is not None and self.update_id is not None:
+            if update_id <= self.update_id:
+                return True
+            if update_id != self.update_id + 1:
+                self.synced = False
+                return False
+        self._apply_levels(bids, asks)
+        self.update_id = update_id
+        self.updates += 1
+        return True
+
+    def _apply_levels(self, bids, asks):
+        for price, size in bids:
+            self.bids.update(float(price), float(size))
+        for price, size in asks:
+            self.asks.update(float(price), float(size))
+        if self.depth:
+            self.bids.trim(self.depth)
+            self.asks.trim(self.depth)
+
+    def best_bid(self):
+        best = self.bids.best()
+        return best[0] if best else None
+
+    def best_ask(self):
+        best = self.asks.best()
+        return best[0] if best else None
+
+    def mid(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def spread(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def buy(self, notional):
+        """
+        Симулирует рыночную покупку на notional USD по уровням продаж.
+        """
+        return self.asks.fill_notional(notional)
+
+    def sell(self, quantity):
+        """
+        Симулирует рыночную продажу quantity актива по уровням покупок.
+        """
+        return self.bids.fill_quantity(quantity)
+
+class OrderBooks:
+    """
+    Стаканы всех активов, обновляемые сообщениями топика orderbook.{depth}.{symbol} биржи.
+    """
+
+    def __init__(self, depth=50):
+        self.depth = depth
+        self.books = {}
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, symbol):
+        """
+        Стакан актива, если он синхронизирован и не пуст, иначе None.
+        """
+        book = self.books.get(symbol)
+        if book is None or not book.synced or not book.bids or not book.asks:
+            return None
+        return book
+
+    def apply_message(self, message):
+        """
+        Применяет сообщение биржи (type snapshot или delta). Возвращает False один раз —
+        при обнаружении пропуска, когда нужна повторная подписка. До нового снимка изменения
+        рассинхронизированного стакана отбрасываются молча.
+        """
+        data = message.get('data') or {}
+        symbol = data.get('s')
+        if not symbol:
+            return True
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol, self.depth)
+        update_id = data.get('u')
+        # Номер обновления 1 означает перезапуск сервиса биржи: сообщение заменяет стакан целиком
+        if message.get('type') == 'snapshot' or update_id == 1:
+            book.apply_snapshot(data.get('b', ()), data.get('a', ()), update_id)
+            return True
+        if not book.synced:
+            return True
+        if book.apply_delta(data.get('b', ()), data.get('a', ()), update_id):
+            return True
+        self.logger.warning("Пропуск обновлений стакана %s, нужен новый снимок.", symbol)
+        return False
+
+def replay(messages, books=None, depth=50):
+    """
+    Применяет записанные сообщения стакана по порядку. Возвращает OrderBooks.
+    """
+    books = books if books is not None else OrderBooks(depth)
+    for message in messages:
+        books.apply_message(message)
+    return books
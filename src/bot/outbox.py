@@ -0,0 +1,222 @@
+# src/bot/outbox.py
+
+import asyncio
+import heapq
+import logging
+import time
+from telegram.error import RetryAfter, TelegramError
+from src.bot.request_scheduler import TokenBucket
+from src.bot.metrics import metrics
+
+# Время отправки одного сообщения в Telegram
+send_timer = metrics.series('telegram_send_seconds')
+
+# Максимальная длина сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+class Digest:
+    """
+    Накопленные, но ещё не отправленные сообщения одного чата.
+    Части с одинаковым ключом заменяют друг друга: остаётся последняя.
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.parts = []
+
+    def add(self, text, key=None):
+        if key is not None:
+            self.parts = [part for part in self.parts if part[0] != key]
+        self.parts.append((key, text))
+
+    def chunks(self):
+        """
+        Объединяет части в сообщения, не превышающие лимит длины Telegram.
+        """
+        chunks = []
+        current = ''
+        for _, text in self.parts:
+            text = text[:MESSAGE_LIMIT]
+            if current and len(current) + 2 + len(text) > MESSAGE_LIMIT:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n\n{text}" if current else text
+        if current:
+            chunks.append(current)
+        return chunks
+
+class Outbox:
+    """
+    Очередь исходящих сообщений Telegram.
+
+    Сообщения одного чата объединяются в одно; устаревшие обновления с тем же ключом
+    (например, очередная цена без сделки) отбрасываются. Чаты выбираются по приоритету:
+    сделки раньше служебных уведомлений, уведомления раньше обычных обновлений.
+    Отправка ограничена общим лимитом в секунду, интервалом между сообщениями
+    в один чат и числом одновременных запросов.
+    """
+
+    TRADE = 0
+    NOTICE = 1
+    ROUTINE = 2
+
+    def __init__(self, global_rate=30, chat_interval=1.0, concurrency=8, clock=time.monotonic):
+        self.bot = None
+        self.chat_interval = chat_interval
+        self.clock = clock
+        self.bucket = TokenBucket(global_rate, global_rate, clock=clock)
+        self.concurrency = concurrency
+        self._pending = {}
+        # Очередь готовых к отправке чатов (приоритет, номер, chat_id)
+        self._queue = []
+        # Чаты, ожидающие истечения интервала (момент готовности, приоритет, номер, chat_id)
+        self._delayed = []
+        self._last_sent = {}
+        self._sequence = 0
+        self._semaphore = None
+        self._wakeup = None
+        self._dispatcher = None
+        self._sending = set()
+        self.sent = 0
+        self.dropped = 0
+        self.logger = logging.getLogger(__name__)
+
+    def start(self, bot):
+        """
+        Запускает отправку сообщений в текущем цикле событий.
+        """
+        self.bot = bot
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.ensure_future(self._run())
+
+    async def stop(self, timeout=5.0):
+        """
+        Отправляет накопленные сообщения (не дольше timeout секунд) и останавливает очередь.
+        """
+        if self._dispatcher is None:
+            return
+        await self.drain(timeout)
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+        if self._pending:
+            self.logger.warning(f"Не отправлены сообщения для {len(self._pending)} чатов.")
+
+    async def drain(self, timeout=5.0, poll=0.05):
+        """
+        Ждёт (не дольше timeout секунд), пока не будут отправлены все накопленные сообщения.
+        Возвращает True, если очередь опустела.
+        """
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._sending) and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+        return not (self._pending or self._sending)
+
+    def post(self, chat_id, text, priority=ROUTINE, key=None):
+        """
+        Ставит сообщение в очередь чата. Сообщение с ключом key заменяет
+        ещё не отправленное сообщение этого чата с тем же ключом.
+        """
+        digest = self._pending.get(chat_id)
+        if digest is None:
+            digest = self._pending[chat_id] = Digest(priority)
+            self._push(chat_id, priority)
+        elif priority < digest.priority:
+            # Старая запись очереди с прежним приоритетом будет пропущена
+            digest.priority = priority
+            self._push(chat_id, priority)
+        before = len(digest.parts)
+        digest.add(text, key)
+        self.dropped += before + 1 - len(digest.parts)
+
+    def discard(self, chat_id):
+        """
+        Удаляет неотправленные сообщения чата.
+        """
+        self._pending.pop(chat_id, None)
+
+    def backlog(self):
+        return len(self._pending)
+
+    def _push(self, chat_id, priority):
+        self._sequence += 1
+        heapq.heappush(self._queue, (priority, self._sequence, chat_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _next_chat(self):
+        """
+        Ожидает чат с наивысшим приоритетом, которому уже можно отправить сообщение.
+        """
+        while True:
+            now = self.clock()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, priority, sequence, chat_id = heapq.heappop(self._delayed)
+                heapq.heappush(self._queue, (priority, sequence, chat_id))
+
+            while self._queue:
+                priority, sequence, chat_id = heapq.heappop(self._queue)
+                digest = self._pending.get(chat_id)
+                if digest is None or digest.priority != priority:
+                    continue
+                ready_at = self._last_sent.get(chat_id, float('-inf')) + self.chat_interval
+                if ready_at > now:
+                    heapq.heappush(self._delayed, (ready_at, priority, sequence, chat_id))
+                    continue
+                return chat_id
+
+            timeout = self._delayed[0][0] - now if self._delayed else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self):
+        while True:
+            chat_id = await self._next_chat()
+            await self.bucket.acquire()
+            await self._semaphore.acquire()
+            # Сообщение собирается в момент отправки, чтобы включить всё накопленное за время ожидания
+            digest = self._pending.pop(chat_id, None)
+            if digest is None:
+                self._semaphore.release()
+                continue
+            self._last_sent[chat_id] = self.clock()
+            task = asyncio.ensure_future(self._deliver(chat_id, digest))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _deliver(self, chat_id, digest):
+        try:
+            for i, text in enumerate(digest.chunks()):
+                if i:
+                    await self.bucket.acquire()
+                started = metrics.start()
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                send_timer.observe_since(started)
+                self.sent += 1
+        except RetryAfter as e:
+            self.logger.warning(f"Превышен лимит Telegram, пауза {e.retry_after} с.")
+            self.bucket.block_until(self.clock() + e.retry_after)
+            self._requeue(chat_id, digest)
+        except TelegramError as e:
+            self.logger.error(f"Не удалось отправить сообщение в чат {chat_id}: {e}")
+        finally:
+            self._semaphore.release()
+
+    def _requeue(self, chat_id, digest):
+        """
+        Возвращает неотправленный дайджест в очередь перед сообщениями, пришедшими позже.
+        """
+        newer = self._pending.pop(chat_id, None)
+        if newer is not None:
+            for key, text in newer.parts:
+                digest.add(text, key)
+            digest.priority = min(digest.priority, newer.priority)
+        self._pending[chat_id] = digest
+        self._push(chat_id, digest.priority)
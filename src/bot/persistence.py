@@ -0,0 +1,610 @@
+# src/bot/persistence.py
+
+import os
+import struct
+import threading
+import time
+import zlib
+import logging
+from collections import deque
+from src.bot.strategy import GridTradingStrategy
+from src.bot.portfolio import Portfolio
+
+# Типы записей журнала
+RECORD_ASSET = 1
+RECORD_PARAMS = 2
+RECORD_MONITOR_START = 3
+RECORD_MONITOR_STOP = 4
+RECORD_BUY = 5
+RECORD_SELL = 6
+RECORD_PORTFOLIO_START = 7
+RECORD_PORTFOLIO_BUY = 8
+RECORD_PORTFOLIO_SELL = 9
+
+# Актив мониторинга для чатов с портфелем
+MONITOR_PORTFOLIO = '*'
+
+# Флаги сессии в снимке
+FLAG_MONITORING = 1
+FLAG_PARAMS = 2
+FLAG_STRATEGY = 4
+FLAG_PORTFOLIO = 8
+
+PARAM_NAMES = ('initial_capital', 'grid_step', 'price_drop_percent', 'price_increase_percent')
+
+SNAPSHOT_HEADER = struct.Struct('<8sQI')
+WAL_HEADER = struct.Struct('<8sQ')
+# Заголовок записи журнала: длина и crc32 содержимого
+FRAME = struct.Struct('<II')
+RECORD = struct.Struct('<Bq')
+SESSION = struct.Struct('<qBB')
+PARAMS = struct.Struct('<4d')
+STRATEGY = struct.Struct('<5dI')
+LOT = struct.Struct('<2d')
+PRICE_AMOUNT = struct.Struct('<2d')
+# Портфель: параметры, свободные средства, число активов; актив: доля и число лотов
+PORTFOLIO = struct.Struct('<4ddH')
+PORTFOLIO_ASSET = struct.Struct('<dI')
+
+def _params_tuple(params):
+    return tuple(float(params[name]) for name in PARAM_NAMES)
+
+def _params_dict(values):
+    return dict(zip(PARAM_NAMES, values))
+
+def _pack_lots(lots):
+    return struct.pack(f'<{2 * len(lots)}d', *[value for lot in lots for value in lot])
+
+def _pack_symbol(symbol):
+    encoded = symbol.encode('utf-8')
+    return bytes([len(encoded)]) + encoded
+
+def _unpack_symbol(data, offset):
+    length = data[offset]
+    return data[offset + 1:offset + 1 + length].decode('utf-8'), offset + 1 + length
+
+def _encode_portfolio(portfolio):
+    params = (
+        portfolio.initial_capital, portfolio.grid_step,
+        portfolio.price_drop_percent, portfolio.price_increase_percent
+    )
+    parts = [PORTFOLIO.pack(*params, portfolio.cash, len(portfolio.strategies))]
+    for symbol, strategy in portfolio.strategies.items():
+        lots = strategy.positions.lots()
+        parts.append(_pack_symbol(symbol))
+        parts.append(PORTFOLIO_ASSET.pack(portfolio.allocations[symbol], len(lots)))
+        parts.append(_pack_lots(lots))
+    return b''.join(parts)
+
+def _apply_trade(strategy, record_type, price, amount):
+    """
+    Повторяет сделку из журнала на стратегии так же, как её выполнил execute_trade.
+    """
+    if record_type == RECORD_BUY:
+        strategy.positions.add(price, amount)
+        strategy.remaining_capital -= amount
+    elif strategy.positions:
+        strategy.positions.pop_oldest()
+        strategy.remaining_capital += amount
+
+class SessionState:
+    """
+    Сохранённое состояние чата, ещё не перенесённое в user_data.
+    Стратегия хранится в исходном виде (параметры, капитал, упакованные лоты и сделки
+    из журнала после снимка) и собирается только при первом обращении к чату.
+    """
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        self.symbol = None
+        self.monitor_symbol = None
+        self.params = None
+        # (initial_capital, grid_step, price_drop_percent, price_increase_percent, remaining_capital)
+        self.strategy = None
+        self.lots = b''
+        self.trades = []
+        # Портфель: (параметры, свободные средства, [(актив, доля, упакованные лоты)]) и сделки после снимка
+        self.portfolio = None
+        self.portfolio_trades = []
+        # user_data чата после восстановления; тогда состояние берётся из него
+        self.user_data = None
+
+    def start_strategy(self, params):
+        self.strategy = params + (params[0],)
+        self.lots = b''
+        self.trades = []
+        self.portfolio = None
+        self.portfolio_trades = []
+
+    def start_portfolio(self, params, allocations):
+        self.portfolio = (params, params[0], [(symbol, weight, b'') for symbol, weight in allocations])
+        self.portfolio_trades = []
+        self.strategy = None
+        self.lots = b''
+        self.trades = []
+
+    def build_portfolio(self):
+        params, cash, assets = self.portfolio
+        portfolio = Portfolio(*params, allocations={symbol: weight for symbol, weight, _ in assets})
+        portfolio.cash = cash
+        for symbol, _, lots in assets:
+            positions = portfolio.strategies[symbol].positions
+            for price, amount in LOT.iter_unpack(lots):
+                positions.add(price, amount)
+        for symbol, operation_type, price, amount in self.portfolio_trades:
+            portfolio.replay_trade(symbol, operation_type, price, amount)
+        return portfolio
+
+    def build_strategy(self):
+        initial_capital, grid_step, drop, increase, remaining = self.strategy
+        strategy = GridTradingStrategy(initial_capital, grid_step, drop, increase)
+        strategy.remaining_capital = remaining
+        for price, amount in LOT.iter_unpack(self.lots):
+            strategy.positions.add(price, amount)
+        for record_type, price, amount in self.trades:
+            _apply_trade(strategy, record_type, price, amount)
+        return strategy
+
+    def encode(self):
+        """
+        Упаковывает состояние в запись снимка.
+        """
+        if self.user_data is not None:
+            symbol = self.user_data.get('chosen_asset')
+            params = self.user_data.get('strategy_params')
+            params = _params_tuple(params) if params else None
+            strategy = self.user_data.get('strategy')
+            if strategy is not None:
+                strategy_values = (
+                    strategy.initial_capital, strategy.grid_step, strategy.price_drop_percent,
+                    strategy.price_increase_percent, strategy.remaining_capital
+                )
+                packed_lots = _pack_lots(strategy.positions.lots())
+            else:
+                strategy_values = None
+            portfolio = self.user_data.get('portfolio')
+        else:
+            symbol = self.symbol
+            params = self.params
+            strategy_values = self.strategy
+            if strategy_values is not None:
+                if self.trades:
+                    strategy = self.build_strategy()
+                    strategy_values = strategy_values[:4] + (strategy.remaining_capital,)
+                    packed_lots = _pack_lots(strategy.positions.lots())
+                else:
+                    packed_lots = self.lots
+            portfolio = self.build_portfolio() if self.portfolio is not None else None
+
+        flags = 0
+        if self.monitor_symbol:
+            flags |= FLAG_MONITORING
+        if params:
+            flags |= FLAG_PARAMS
+        if strategy_values is not None:
+            flags |= FLAG_STRATEGY
+        if portfolio is not None:
+            flags |= FLAG_PORTFOLIO
+        encoded_symbol = (symbol or '').encode('utf-8')
+        parts = [SESSION.pack(self.chat_id, flags, len(encoded_symbol)), encoded_symbol]
+        if flags & FLAG_MONITORING:
+            parts.append(_pack_symbol(self.monitor_symbol))
+        if flags & FLAG_PARAMS:
+            parts.append(PARAMS.pack(*params))
+        if flags & FLAG_STRATEGY:
+            parts.append(STRATEGY.pack(*strategy_values, len(packed_lots) // LOT.size))
+            parts.append(packed_lots)
+        if flags & FLAG_PORTFOLIO:
+            parts.append(_encode_portfolio(portfolio))
+        return b''.join(parts)
+
+class StatePersistence:
+    """
+    Сохранение состояния чатов: выбранный актив, параметры, стратегия и мониторинг.
+
+    Полное состояние периодически записывается двоичным снимком (snapshot.bin),
+    а каждое изменение между снимками дописывается в журнал упреждающей записи
+    (wal.bin): запись с длиной и crc32, недописанный хвост отбрасывается при загрузке.
+    Снимок и журнал помечены номером эпохи: журнал предыдущей эпохи уже учтён в снимке.
+
+    При загрузке разбираются только заголовки сессий; стратегии собираются
+    при первом обращении к чату (restore).
+
+    Запись на диск разделена на две части: prepare_flush() и prepare_checkpoint() в потоке
+    цикла событий забирают накопленные записи и кодируют снимок, а write_pending() выполняет
+    запись и fsync в любом потоке, по порядку подготовки.
+    """
+
+    SNAPSHOT_MAGIC = b'GRIDSNP1'
+    WAL_MAGIC = b'GRIDWAL1'
+    FSYNC_POLICIES = ('always', 'batch', 'never')
+
+    def __init__(self, directory='state', fsync_policy='batch', checkpoint_every=10000):
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"Неподдерживаемая политика fsync: {fsync_policy}")
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, 'snapshot.bin')
+        self.wal_path = os.path.join(directory, 'wal.bin')
+        self.fsync_policy = fsync_policy
+        # Снимок после указанного числа записей журнала
+        self.checkpoint_every = checkpoint_every
+        self.sessions = {}
+        self.epoch = 0
+        self._pending = set()
+        self._buffer = []
+        self._wal_records = 0
+        self._file = None
+        # Эпоха открытого файла журнала
+        self._file_epoch = None
+        # Подготовленные, но ещё не записанные операции: ('wal', эпоха, данные) и ('snapshot', эпоха, данные)
+        self._batches = deque()
+        self._checkpoints_pending = 0
+        self._io_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self):
+        """
+        Читает снимок и журнал. Возвращает число сессий.
+        """
+        started = time.perf_counter()
+        self.sessions = {}
+        self.epoch = 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                self._load_snapshot()
+            except ValueError as e:
+                self.logger.error(f"Снимок состояния повреждён и не загружен: {e}")
+                self.sessions = {}
+        replayed = self._replay_wal()
+        self._pending = set(self.sessions)
+        self.logger.info(
+            f"Состояние загружено: {len(self.sessions)} сессий, {replayed} записей журнала "
+            f"за {time.perf_counter() - started:.3f} с."
+        )
+        return len(self.sessions)
+
+    def _load_snapshot(self):
+        with open(self.snapshot_path, 'rb') as file:
+            data = file.read()
+        if len(data) < SNAPSHOT_HEADER.size + 4:
+            raise ValueError("файл слишком короткий")
+        magic, epoch, count = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != self.SNAPSHOT_MAGIC:
+            raise ValueError("неизвестный формат")
+        if zlib.crc32(data[:-4]) != struct.unpack_from('<I', data, len(data) - 4)[0]:
+            raise ValueError("контрольная сумма не совпадает")
+
+        offset = SNAPSHOT_HEADER.size
+        for _ in range(count):
+            chat_id, flags, symbol_length = SESSION.unpack_from(data, offset)
+            offset += SESSION.size
+            state = SessionState(chat_id)
+            state.symbol = data[offset:offset + symbol_length].decode('utf-8') or None
+            offset += symbol_length
+            if flags & FLAG_MONITORING:
+                state.monitor_symbol, offset = _unpack_symbol(data, offset)
+            if flags & FLAG_PARAMS:
+                state.params = PARAMS.unpack_from(data, offset)
+                offset += PARAMS.size
+            if flags & FLAG_STRATEGY:
+                values = STRATEGY.unpack_from(data, offset)
+                offset += STRATEGY.size
+                state.strategy = values[:5]
+                state.lots = data[offset:offset + values[5] * LOT.size]
+                offset += values[5] * LOT.size
+            if flags & FLAG_PORTFOLIO:
+                values = PORTFOLIO.unpack_from(data, offset)
+                offset += PORTFOLIO.size
+                assets = []
+                for _ in range(values[5]):
+                    symbol, offset = _unpack_symbol(data, offset)
+                    weight, lot_count = PORTFOLIO_ASSET.unpack_from(data, offset)
+                    offset += PORTFOLIO_ASSET.size
+                    assets.append((symbol, weight, data[offset:offset + lot_count * LOT.size]))
+                    offset += lot_count * LOT.size
+                state.portfolio = (values[:4], values[4], assets)
+            self.sessions[chat_id] = state
+        self.epoch = epoch
+
+    def _replay_wal(self):
+        """
+        Применяет записи журнала текущей эпохи. Недописанный или повреждённый хвост обрезается.
+        """
+        if not os.path.exists(self.wal_path):
+            return 0
+        with open(self.wal_path, 'rb') as file:
+            data = file.read()
+        if len(data) < WAL_HEADER.size:
+            return 0
+        magic, epoch = WAL_HEADER.unpack_from(data)
+        if magic != self.WAL_MAGIC or epoch < self.epoch:
+            # Журнал до последнего снимка: его записи уже учтены
+            return 0
+        self.epoch = epoch
+
+        offset = WAL_HEADER.size
+        replayed = 0
+        while offset + FRAME.size <= len(data):
+            length, checksum = FRAME.unpack_from(data, offset)
+            payload = data[offset + FRAME.size:offset + FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            self._apply(payload)
+            offset += FRAME.size + length
+            replayed += 1
+
+        if offset < len(data):
+            self.logger.warning(f"Отброшен повреждённый хвост журнала состояния: {len(data) - offset} байт.")
+            with open(self.wal_path, 'r+b') as file:
+                file.truncate(offset)
+                file.flush()
+                os.fsync(file.fileno())
+        self._wal_records = replayed
+        return replayed
+
+    def _apply(self, payload):
+        record_type, chat_id = RECORD.unpack_from(payload)
+        body = payload[RECORD.size:]
+        state = self.sessions.get(chat_id)
+        if state is None:
+            state = self.sessions[chat_id] = SessionState(chat_id)
+        if record_type == RECORD_ASSET:
+            state.symbol = body.decode('utf-8')
+        elif record_type == RECORD_PARAMS:
+            state.params = PARAMS.unpack(body)
+        elif record_type == RECORD_MONITOR_START:
+            state.monitor_symbol = body[PARAMS.size:].decode('utf-8')
+            state.start_strategy(PARAMS.unpack_from(body))
+        elif record_type == RECORD_MONITOR_STOP:
+            state.monitor_symbol = None
+        elif record_type in (RECORD_BUY, RECORD_SELL) and state.strategy is not None:
+            state.trades.append((record_type,) + PRICE_AMOUNT.unpack(body))
+        elif record_type == RECORD_PORTFOLIO_START:
+            allocations = []
+            offset = PARAMS.size
+            while offset < len(body):
+                symbol, offset = _unpack_symbol(body, offset)
+                allocations.append((symbol, struct.unpack_from('<d', body, offset)[0]))
+                offset += 8
+            state.monitor_symbol = MONITOR_PORTFOLIO
+            state.start_portfolio(PARAMS.unpack_from(body), allocations)
+        elif record_type in (RECORD_PORTFOLIO_BUY, RECORD_PORTFOLIO_SELL) and state.portfolio is not None:
+            price, amount = PRICE_AMOUNT.unpack_from(body)
+            operation_type = 'buy' if record_type == RECORD_PORTFOLIO_BUY else 'sell'
+            state.portfolio_trades.append((body[PRICE_AMOUNT.size:].decode('utf-8'), operation_type, price, amount))
+
+    def monitored(self):
+        """
+        Перебирает (chat_id, symbol) чатов, у которых был запущен мониторинг.
+        """
+        for chat_id, state in self.sessions.items():
+            if state.monitor_symbol and state.monitor_symbol != MONITOR_PORTFOLIO:
+                yield chat_id, state.monitor_symbol
+
+    def monitored_portfolios(self):
+        """
+        Перебирает (chat_id, активы) чатов, у которых был запущен мониторинг портфеля.
+        """
+        for chat_id, state in self.sessions.items():
+            if state.monitor_symbol != MONITOR_PORTFOLIO:
+                continue
+            if state.user_data is not None:
+                portfolio = state.user_data.get('portfolio')
+                symbols = portfolio.symbols if portfolio is not None else ()
+            else:
+                symbols = tuple(symbol for symbol, _, _ in state.portfolio[2]) if state.portfolio else ()
+            if symbols:
+                yield chat_id, symbols
+
+    def restore(self, chat_id, user_data):
+        """
+        Переносит сохранённое состояние чата в user_data при первом обращении.
+        Возвращает True, если состояние было восстановлено сейчас.
+        """
+        if chat_id not in self._pending:
+            return False
+        self._pending.discard(chat_id)
+        state = self.sessions[chat_id]
+        if state.symbol and 'chosen_asset' not in user_data:
+            user_data['chosen_asset'] = state.symbol
+        if state.params and 'strategy_params' not in user_data:
+            user_data['strategy_params'] = _params_dict(state.params)
+        if state.strategy is not None and 'strategy' not in user_data:
+            user_data['strategy'] = state.build_strategy()
+        if state.portfolio is not None and 'portfolio' not in user_data:
+            user_data['portfolio'] = state.build_portfolio()
+        self._bind(state, user_data)
+        return True
+
+    def _bind(self, state, user_data):
+        """
+        Дальше состояние чата берётся из user_data.
+        """
+        state.user_data = user_data
+        state.lots = b''
+        state.trades = []
+        state.portfolio = None
+        state.portfolio_trades = []
+
+    def _session(self, chat_id, user_data):
+        state = self.sessions.get(chat_id)
+        if state is None:
+            state = self.sessions[chat_id] = SessionState(chat_id)
+        if chat_id in self._pending:
+            self.restore(chat_id, user_data)
+        elif state.user_data is None:
+            self._bind(state, user_data)
+        return state
+
+    def log_asset(self, chat_id, user_data, symbol):
+        self._session(chat_id, user_data)
+        self._write(RECORD_ASSET, chat_id, symbol.encode('utf-8'))
+
+    def log_params(self, chat_id, user_data, params):
+        self._session(chat_id, user_data)
+        self._write(RECORD_PARAMS, chat_id, PARAMS.pack(*_params_tuple(params)))
+
+    def log_monitor_start(self, chat_id, user_data, symbol, params):
+        state = self._session(chat_id, user_data)
+        state.monitor_symbol = symbol
+        self._write(RECORD_MONITOR_START, chat_id, PARAMS.pack(*_params_tuple(params)) + symbol.encode('utf-8'))
+
+    def log_portfolio_start(self, chat_id, user_data, params, allocations):
+        state = self._session(chat_id, user_data)
+        state.monitor_symbol = MONITOR_PORTFOLIO
+        body = [PARAMS.pack(*_params_tuple(params))]
+        for symbol, weight in allocations.items():
+            body.append(_pack_symbol(symbol) + struct.pack('<d', weight))
+        self._write(RECORD_PORTFOLIO_START, chat_id, b''.join(body))
+
+    def log_portfolio_trade(self, chat_id, symbol, operation_type, price, amount):
+        """
+        Записывает сделку портфеля чата по активу symbol.
+        """
+        record_type = RECORD_PORTFOLIO_BUY if operation_type == 'buy' else RECORD_PORTFOLIO_SELL
+        self._write(record_type, chat_id, PRICE_AMOUNT.pack(price, amount) + symbol.encode('utf-8'))
+
+    def log_monitor_stop(self, chat_id):
+        state = self.sessions.get(chat_id)
+        if state is None or not state.monitor_symbol:
+            return
+        state.monitor_symbol = None
+        self._write(RECORD_MONITOR_STOP, chat_id, b'')
+
+    def log_trade(self, chat_id, operation_type, price, amount):
+        """
+        Записывает сделку стратегии чата: тип, цену исполнения и сумму сделки (шаг сетки).
+        Лот восстанавливается как (цена, сумма), количество актива — сумма / цена исполнения.
+        """
+        record_type = RECORD_BUY if operation_type == 'buy' else RECORD_SELL
+        self._write(record_type, chat_id, PRICE_AMOUNT.pack(price, amount))
+
+    def _write(self, record_type, chat_id, body):
+        payload = RECORD.pack(record_type, chat_id) + body
+        self._buffer.append(FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._wal_records += 1
+        if self.fsync_policy == 'always':
+            self.flush()
+
+    def should_checkpoint(self):
+        return self._wal_records >= self.checkpoint_every
+
+    def flush(self):
+        """
+        Дописывает накопленные записи в журнал одним вызовом write.
+        """
+        self.prepare_flush()
+        self.write_pending()
+
+    def prepare_flush(self):
+        """
+        Забирает накопленные записи журнала для write_pending(). Вызывается в потоке цикла событий.
+        """
+        if self._buffer:
+            self._batches.append(('wal', self.epoch, b''.join(self._buffer)))
+            self._buffer = []
+
+    def checkpoint(self):
+        """
+        Записывает снимок всех сессий и начинает новый журнал.
+        """
+        self.prepare_checkpoint()
+        self.write_pending()
+
+    def prepare_checkpoint(self):
+        """
+        Кодирует снимок всех сессий и переходит к новой эпохе журнала; запись — в write_pending().
+        Вызывается в потоке цикла событий: снимок должен совпасть с границей журнала.
+        """
+        self.prepare_flush()
+        epoch = self.epoch + 1
+        body = b''.join([SNAPSHOT_HEADER.pack(self.SNAPSHOT_MAGIC, epoch, len(self.sessions))] + [
+            state.encode() for state in self.sessions.values()
+        ])
+        self._checkpoints_pending += 1
+        self._batches.append(('snapshot', epoch, body + struct.pack('<I', zlib.crc32(body))))
+        # Записи после снимка относятся к новой эпохе
+        self.epoch = epoch
+        self._wal_records = 0
+
+    def checkpoint_pending(self):
+        """
+        Есть ли подготовленный, но ещё не записанный снимок.
+        """
+        return self._checkpoints_pending > 0
+
+    def write_pending(self):
+        """
+        Записывает подготовленные пакеты журнала и снимки в порядке подготовки. Можно вызывать из другого потока.
+        """
+        with self._io_lock:
+            while self._batches:
+                kind, epoch, data = self._batches.popleft()
+                if kind == 'wal':
+                    self._append_wal(epoch, data)
+                else:
+                    self._write_snapshot(epoch, data)
+                    self._checkpoints_pending -= 1
+
+    def _append_wal(self, epoch, data):
+        if self._file is None or self._file_epoch != epoch:
+            self._close_wal()
+            self._file = self._open_wal(epoch)
+            self._file_epoch = epoch
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync_policy != 'never':
+            os.fsync(self._file.fileno())
+
+    def _write_snapshot(self, epoch, data):
+        started = time.perf_counter()
+        self._write_file(self.snapshot_path, data)
+        # После замены снимка старый журнал не нужен: его эпоха меньше эпохи снимка
+        self._close_wal()
+        self._write_file(self.wal_path, WAL_HEADER.pack(self.WAL_MAGIC, epoch))
+        self.logger.info(f"Снимок состояния записан за {time.perf_counter() - started:.3f} с.")
+
+    def _close_wal(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_epoch = None
+
+    def _open_wal(self, epoch):
+        """
+        Открывает журнал на дозапись, создавая его с заголовком эпохи epoch.
+        """
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, 'rb') as file:
+                header = file.read(WAL_HEADER.size)
+            if len(header) == WAL_HEADER.size and WAL_HEADER.unpack(header) == (self.WAL_MAGIC, epoch):
+                return open(self.wal_path, 'ab')
+        self._write_file(self.wal_path, WAL_HEADER.pack(self.WAL_MAGIC, epoch))
+        return open(self.wal_path, 'ab')
+
+    def _write_file(self, path, data):
+        """
+        Атомарно заменяет файл: запись во временный файл, fsync и переименование.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.flush()
+        with self._io_lock:
+            self._close_wal()
@@ -0,0 +1,125 @@
+# src/bot/portfolio.py
+
+import logging
+from src.bot.strategy import GridTradingStrategy
+
+def parse_allocations(args, available):
+    """
+    Разбирает доли портфеля из аргументов вида 'BTCUSDT=50' или 'BTCUSDT' (равные доли).
+    Возвращает словарь symbol -> доля (сумма долей равна 1).
+    """
+    allocations = {}
+    for arg in args:
+        symbol, _, weight = arg.upper().partition('=')
+        if symbol not in available:
+            raise ValueError(f"Неизвестный актив: {symbol}")
+        weight = float(weight) if weight else 1.0
+        if weight <= 0:
+            raise ValueError(f"Доля актива {symbol} должна быть положительной.")
+        allocations[symbol] = allocations.get(symbol, 0.0) + weight
+    if not allocations:
+        raise ValueError("Укажите хотя бы один актив.")
+    total = sum(allocations.values())
+    return {symbol: weight / total for symbol, weight in allocations.items()}
+
+class Portfolio:
+    """
+    Портфель сеточных стратегий чата по нескольким активам с общим капиталом.
+
+    Свободные средства общие, но вложения в каждый актив ограничены его долей
+    от начального капитала. Все стратегии портфеля проверяются за один проход
+    по одному снимку цен.
+    """
+
+    def __init__(self, initial_capital, grid_step, price_drop_percent, price_increase_percent, allocations):
+        self.initial_capital = initial_capital
+        self.grid_step = grid_step
+        self.price_drop_percent = price_drop_percent
+        self.price_increase_percent = price_increase_percent
+        self.allocations = dict(allocations)
+        self.cash = initial_capital
+        self.strategies = {
+            symbol: GridTradingStrategy(
+                initial_capital * weight, grid_step, price_drop_percent, price_increase_percent
+            )
+            for symbol, weight in self.allocations.items()
+        }
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def symbols(self):
+        return tuple(self.strategies)
+
+    def limit(self, symbol):
+        """
+        Предельная сумма вложений в актив.
+        """
+        return self.initial_capital * self.allocations[symbol]
+
+    def evaluate(self, prices, symbols=None, books=None, indicators=None):
+        """
+        Применяет стратегии к ценам снимка prices (symbol -> цена).
+        books (OrderBooks) задаёт стаканы для исполнения сделок по глубине,
+        indicators (IndicatorRegistry) — индикаторы активов для адаптивного шага сетки.
+        Возвращает список (symbol, цена, результат) по активам, для которых есть цена.
+        """
+        results = []
+        for symbol in symbols or self.strategies:
+            strategy = self.strategies.get(symbol)
+            price = prices.get(symbol)
+            if strategy is None or not price:
+                continue
+            # Стратегии доступен остаток общего капитала в пределах доли актива
+            available = max(0.0, min(self.cash, self.limit(symbol) - strategy.positions.cost_basis))
+            strategy.remaining_capital = available
+            action = strategy.execute_trade(
+                price,
+                books.get(symbol) if books is not None else None,
+                indicators.get(symbol) if indicators is not None else None
+            )
+            self.cash += strategy.remaining_capital - available
+            results.append((symbol, price, action))
+        return results
+
+    def replay_trade(self, symbol, operation_type, price, amount):
+        """
+        Повторяет сохранённую сделку при восстановлении портфеля.
+        """
+        strategy = self.strategies[symbol]
+        if operation_type == 'buy':
+            strategy.positions.add(price, amount)
+            self.cash -= amount
+        elif strategy.positions:
+            strategy.positions.pop_oldest()
+            self.cash += amount
+
+    def exhausted(self):
+        return self.cash < self.grid_step
+
+    def summary(self, prices):
+        """
+        Сводка портфеля по ценам prices: общие суммы и строки по активам.
+        """
+        rows = []
+        invested = 0.0
+        unrealized = 0.0
+        for symbol, strategy in self.strategies.items():
+            positions = strategy.positions
+            price = prices.get(symbol)
+            pnl = positions.unrealized_pnl(price) if price and positions else 0.0
+            invested += positions.cost_basis
+            unrealized += pnl
+            rows.append({
+                'symbol': symbol,
+                'allocation': self.allocations[symbol],
+                'lots': len(positions),
+                'cost_basis': positions.cost_basis,
+                'unrealized_pnl': pnl
+            })
+        return {
+            'cash': self.cash,
+            'invested': invested,
+            'unrealized_pnl': unrealized,
+            'equity': self.cash + invested + unrealized,
+            'assets': rows
+        }
@@ -0,0 +1,138 @@
+# src/bot/position_book.py
+
+import heapq
+from collections import deque
+
+class PositionBook:
+    """
+    Книга открытых лотов стратегии.
+
+    Лоты закрываются в порядке FIFO, минимальная и максимальная цена покупки
+    находятся за O(log n) через кучи с ленивым удалением, а агрегаты
+    (стоимость, количество) поддерживаются инкрементально.
+    """
+
+    def __init__(self):
+        # (lot_id, price, amount) в порядке открытия
+        self._lots = deque()
+        self._min_heap = []
+        self._max_heap = []
+        self._next_id = 0
+        self.cost_basis = 0.0
+        self.quantity = 0.0
+
+    def __len__(self):
+        return len(self._lots)
+
+    def __bool__(self):
+        return bool(self._lots)
+
+    def __iter__(self):
+        """
+        Перебирает цены открытых лотов от самого старого к самому новому.
+        """
+        for _, price, _ in self._lots:
+            yield price
+
+    def add(self, price, amount):
+        """
+        Открывает лот: покупка на сумму amount по цене price.
+        """
+        lot_id = self._next_id
+        self._next_id += 1
+        self._lots.append((lot_id, price, amount))
+        heapq.heappush(self._min_heap, (price, lot_id))
+        heapq.heappush(self._max_heap, (-price, lot_id))
+        self.cost_basis += amount
+        self.quantity += amount / price
+
+    def pop_oldest(self):
+        """
+        Закрывает самый старый лот и возвращает (цена, сумма).
+        """
+        _, price, amount = self._lots.popleft()
+        if self._lots:
+            self.cost_basis -= amount
+            self.quantity -= amount / price
+            if len(self._min_heap) > 2 * len(self._lots) + 32:
+                self._rebuild_heaps()
+        else:
+            # Сбрасываем накопленную погрешность округления
+            self.cost_basis = 0.0
+            self.quantity = 0.0
+            self._min_heap.clear()
+            self._max_heap.clear()
+        return price, amount
+
+    def oldest(self):
+        """
+        Возвращает цену самого старого открытого лота.
+        """
+        return self._lots[0][1] if self._lots else None
+
+    def min_price(self):
+        """
+        Возвращает минимальную цену среди открытых лотов.
+        """
+        if not self._lots:
+            return None
+        self._discard_closed(self._min_heap)
+        return self._min_heap[0][0]
+
+    def max_price(self):
+        """
+        Возвращает максимальную цену среди открытых лотов.
+        """
+        if not self._lots:
+            return None
+        self._discard_closed(self._max_heap)
+        return -self._max_heap[0][0]
+
+    def average_price(self):
+        """
+        Средневзвешенная цена открытых лотов.
+        """
+        return self.cost_basis / self.quantity if self.quantity else None
+
+    def market_value(self, price):
+        """
+        Рыночная стоимость открытых лотов по цене price.
+        """
+        return self.quantity * price
+
+    def unrealized_pnl(self, price):
+        """
+        Нереализованная прибыль или убыток по цене price.
+        """
+        return self.quantity * price - self.cost_basis
+
+    def prices(self):
+        """
+        Возвращает список цен открытых лотов в порядке FIFO.
+        """
+        return list(self)
+
+    def lots(self):
+        """
+        Возвращает открытые лоты (цена, сумма) в порядке FIFO.
+        """
+        return [(price, amount) for _, price, amount in self._lots]
+
+    def _rebuild_heaps(self):
+        """
+        Перестраивает кучи без закрытых лотов, чтобы они не росли бесконечно.
+        Амортизированная стоимость на одно закрытие — O(1).
+        """
+        self._min_heap = [(price, lot_id) for lot_id, price, _ in self._lots]
+        self._max_heap = [(-price, lot_id) for lot_id, price, _ in self._lots]
+        heapq.heapify(self._min_heap)
+        heapq.heapify(self._max_heap)
+
+    def _discard_closed(self, heap):
+        """
+        Удаляет с вершины кучи лоты, уже закрытые через pop_oldest.
+        Лоты закрываются строго по порядку, поэтому закрыт любой лот старше самого старого открытого.
+        """
+        first_open_id = self._lots[0][0]
+        while heap[0][1] < first_open_id:
+            heapq.heappop(heap)
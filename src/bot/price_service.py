@@ -0,0 +1,165 @@
+# src/bot/price_service.py
+
+import logging
+import time
+
+class PriceService:
+    """
+    Общий сервис цен: один запрос тикеров за интервал для всех подписчиков.
+    """
+
+    def __init__(self, api, indicators=None, clock=time.time):
+        self.api = api
+        # Индикаторы активов (IndicatorRegistry): обновляются один раз на каждую новую цену
+        # актива с подписчиками, общие для всех стратегий на нём
+        self.indicators = indicators
+        # Время цен и баров индикаторов; при воспроизведении подменяется виртуальным
+        self.clock = clock
+        self.snapshot = {}
+        self.updated_at = None
+        # Номер интервала опроса последнего снимка и результат его запроса
+        self._interval_index = None
+        self._interval_refreshed = False
+        # symbol -> {chat_id: data}
+        self.subscriptions = {}
+        # chat_id -> symbol
+        self.chat_symbols = {}
+        # Портфели: chat_id -> (активы, data) и symbol -> {chat_id: data}
+        self.portfolios = {}
+        self.portfolio_index = {}
+        self.logger = logging.getLogger(__name__)
+
+    def subscribe(self, chat_id, symbol, data):
+        """
+        Подписывает чат на обновления цены актива.
+        """
+        self.unsubscribe(chat_id)
+        self.subscriptions.setdefault(symbol, {})[chat_id] = data
+        self.chat_symbols[chat_id] = symbol
+        self.logger.info(f"Чат {chat_id} подписан на {symbol}.")
+
+    def subscribe_portfolio(self, chat_id, symbols, data):
+        """
+        Подписывает чат с портфелем на обновления цен всех его активов.
+        """
+        self.unsubscribe(chat_id)
+        self.portfolios[chat_id] = (tuple(symbols), data)
+        for symbol in symbols:
+            self.portfolio_index.setdefault(symbol, {})[chat_id] = data
+        self.logger.info(f"Чат {chat_id} подписан на портфель: {', '.join(symbols)}.")
+
+    def unsubscribe(self, chat_id):
+        """
+        Отписывает чат от обновлений цены. Возвращает False, если подписки не было.
+        """
+        portfolio = self.portfolios.pop(chat_id, None)
+        if portfolio is not None:
+            for symbol in portfolio[0]:
+                subscribers = self.portfolio_index.get(symbol)
+                if subscribers is not None:
+                    subscribers.pop(chat_id, None)
+                    if not subscribers:
+                        del self.portfolio_index[symbol]
+            self.logger.info(f"Чат {chat_id} отписан от портфеля.")
+            return True
+
+        symbol = self.chat_symbols.pop(chat_id, None)
+        if symbol is None:
+            return False
+
+        subscribers = self.subscriptions.get(symbol)
+        if subscribers is not None:
+            subscribers.pop(chat_id, None)
+            if not subscribers:
+                del self.subscriptions[symbol]
+        self.logger.info(f"Чат {chat_id} отписан от {symbol}.")
+        return True
+
+    def is_subscribed(self, chat_id):
+        """
+        Проверяет, подписан ли чат на обновления цены.
+        """
+        return chat_id in self.chat_symbols or chat_id in self.portfolios
+
+    async def refresh(self):
+        """
+        Обновляет снимок цен всех активов одним запросом к бирже.
+        """
+        prices = await self.api.get_all_prices()
+        if prices is None:
+            return False
+
+        self.snapshot = prices
+        self.updated_at = self.clock()
+        self._update_indicators(prices.items())
+        self.logger.debug("Снимок цен обновлён: %d активов.", len(prices))
+        return True
+
+    async def refresh_interval(self, interval, now):
+        """
+        Снимок цен интервала опроса, в который попадает момент now: запрос к бирже выполняет
+        только первая проверка интервала, остальные используют её снимок.
+        Возвращает результат этого запроса.
+        """
+        index = int(now // interval)
+        if index != self._interval_index:
+            self._interval_index = index
+            self._interval_refreshed = await self.refresh()
+        return self._interval_refreshed
+
+    def has_symbol_subscribers(self, symbol):
+        """
+        Проверяет, есть ли подписчики у актива.
+        """
+        return symbol in self.subscriptions
+
+    def update_price(self, symbol, price):
+        """
+        Обновляет цену одного актива в снимке, например по тику из потока.
+        """
+        self.snapshot[symbol] = price
+        self.updated_at = self.clock()
+        self._update_indicators(((symbol, price),))
+
+    def _update_indicators(self, prices):
+        """
+        Передаёт индикаторам новые цены (пары актив, цена) активов с подписчиками.
+        Единственное место обновления индикаторов: каждая полученная цена учитывается один раз.
+        """
+        if self.indicators is None:
+            return
+        for symbol, price in prices:
+            if price and (symbol in self.subscriptions or symbol in self.portfolio_index):
+                self.indicators.update(symbol, price, timestamp=self.updated_at)
+
+    def get_indicators(self, symbol):
+        """
+        Индикаторы актива (SymbolIndicators) или None, если они не ведутся.
+        """
+        if self.indicators is None:
+            return None
+        return self.indicators.get(symbol)
+
+    def get_price(self, symbol):
+        """
+        Возвращает цену актива из последнего снимка.
+        """
+        return self.snapshot.get(symbol)
+
+    def iter_symbol_subscribers(self, symbol):
+        """
+        Перебирает подписчиков одного актива.
+        """
+        for chat_id, data in list(self.subscriptions.get(symbol, {}).items()):
+            yield chat_id, data
+
+    def iter_portfolios(self, symbol=None):
+        """
+        Перебирает чаты с портфелями (при указании symbol — только портфели с этим активом).
+        """
+        if symbol is None:
+            subscribers = {chat_id: data for chat_id, (_, data) in self.portfolios.items()}
+        else:
+            subscribers = self.portfolio_index.get(symbol, {})
+        for chat_id, data in list(subscribers.items()):
+            yield chat_id, data
@@ -0,0 +1,160 @@
+# src/bot/price_stream.py
+
+import asyncio
+import json
+import logging
+import websockets
+
+class PriceStream:
+    """
+    Поток цен через публичный WebSocket биржи с переподключением и повторной подпиской.
+    """
+
+    # Биржа принимает не более 10 топиков в одном запросе подписки
+    MAX_ARGS_PER_REQUEST = 10
+
+    def __init__(self, url, symbols, on_tick, topic='tickers', ping_interval=20,
+                 reconnect_delay=1, max_reconnect_delay=30, book_depth=0, on_book=None):
+        self.url = url
+        self.symbols = list(symbols)
+        self.on_tick = on_tick
+        self.topic = topic
+        # Стаканы orderbook.{book_depth}.{symbol}: сообщения передаются в on_book(message),
+        # который возвращает False, если стакан рассинхронизирован и нужна повторная подписка
+        self.book_depth = book_depth
+        self.on_book = on_book
+        self._resync = set()
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = False
+        self._task = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """
+        Запускает получение цен в фоновой задаче текущего цикла событий.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        """
+        Останавливает фоновую задачу потока.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        """
+        Держит соединение открытым, переподключаясь с экспоненциальной задержкой.
+        """
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    await self._subscribe(ws)
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    self.logger.info(f"Поток цен подключён: {self.url}")
+                    await self._receive(ws)
+            except asyncio.CancelledError:
+                raise
+            except (websockets.exceptions.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                self.logger.error(f"Соединение с потоком цен потеряно: {e!r}")
+            finally:
+                self.connected = False
+
+            self.logger.info(f"Переподключение к потоку цен через {delay} с.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _subscribe(self, ws):
+        """
+        Подписывается на топики всех активов.
+        """
+        args = [f"{self.topic}.{symbol}" for symbol in self.symbols]
+        if self.book_depth and self.on_book:
+            args += [self.book_topic(symbol) for symbol in self.symbols]
+        self._resync.clear()
+        await self._send_op(ws, 'subscribe', args)
+
+    async def _send_op(self, ws, op, args):
+        for i in range(0, len(args), self.MAX_ARGS_PER_REQUEST):
+            chunk = args[i:i + self.MAX_ARGS_PER_REQUEST]
+            await ws.send(json.dumps({'op': op, 'args': chunk}))
+
+    def book_topic(self, symbol):
+        return f"orderbook.{self.book_depth}.{symbol}"
+
+    async def _resubscribe_books(self, ws):
+        """
+        Переподписывается на стаканы с пропущенными обновлениями: биржа пришлёт новый снимок.
+        """
+        args = [self.book_topic(symbol) for symbol in self._resync]
+        self._resync.clear()
+        await self._send_op(ws, 'unsubscribe', args)
+        await self._send_op(ws, 'subscribe', args)
+
+    async def _receive(self, ws):
+        """
+        Принимает сообщения и передаёт тики обработчику по мере поступления.
+        """
+        pinger = asyncio.ensure_future(self._ping(ws))
+        try:
+            async for raw in ws:
+                for symbol, price in self.parse_message(raw):
+                    try:
+                        await self.on_tick(symbol, price)
+                    except Exception as e:
+                        self.logger.error(f"Ошибка при обработке тика {symbol}: {e!r}")
+                if self._resync:
+                    await self._resubscribe_books(ws)
+        finally:
+            pinger.cancel()
+
+    async def _ping(self, ws):
+        """
+        Периодически отправляет ping, чтобы биржа не закрыла соединение.
+        """
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({'op': 'ping'}))
+
+    def parse_message(self, raw):
+        """
+        Извлекает пары (актив, цена) из сообщения топика tickers или publicTrade.
+        Сообщения стаканов передаются в on_book.
+        """
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            self.logger.error("Некорректное сообщение потока цен.")
+            return []
+
+        topic = message.get('topic')
+        if not topic:
+            if message.get('op') == 'subscribe' and not message.get('success', True):
+                self.logger.error(f"Ошибка подписки на поток цен: {message.get('ret_msg')}")
+            return []
+
+        data = message.get('data')
+        ticks = []
+        try:
+            if topic.startswith('orderbook.'):
+                if self.on_book is not None and not self.on_book(message):
+                    self._resync.add(data['s'])
+            elif topic.startswith('tickers.'):
+                ticks.append((data['symbol'], float(data['lastPrice'])))
+            elif topic.startswith('publicTrade.'):
+                for trade in data:
+                    ticks.append((trade['s'], float(trade['p'])))
+        except (ValueError, TypeError, KeyError) as e:
+            self.logger.error(f"Ошибка при парсинге тика: {e}")
+        return ticks
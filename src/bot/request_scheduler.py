@@ -0,0 +1,160 @@
+# src/bot/request_scheduler.py
+
+import asyncio
+import logging
+import random
+import time
+
+class RetryableError(Exception):
+    """
+    Ошибка запроса, после которой имеет смысл повторить попытку (429, 5xx, сетевой сбой).
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Ограничитель скорости «корзина токенов»: rate запросов в секунду, всплеск до capacity.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated_at = clock()
+        # До этого момента запросы не отправляются (лимит исчерпан по данным биржи)
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def block_until(self, moment):
+        """
+        Запрещает запросы до момента moment (по часам clock).
+        """
+        self.blocked_until = max(self.blocked_until, moment)
+
+    async def acquire(self):
+        """
+        Ожидает, пока появится свободный токен, и забирает его.
+        """
+        while True:
+            now = self.clock()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class RequestScheduler:
+    """
+    Планировщик запросов к бирже.
+
+    Перед отправкой запрос получает токены из общей корзины (лимит на IP) и из корзины
+    своего класса эндпоинтов. Одинаковые одновременные GET-запросы объединяются в один
+    (single-flight). Запросы, завершившиеся RetryableError, повторяются с экспоненциальной
+    задержкой со случайным разбросом либо через время, указанное биржей.
+    """
+
+    # Префикс пути -> класс эндпоинтов
+    ENDPOINT_CLASSES = (
+        ('/v5/market/', 'market'),
+        ('/v5/order/', 'trade'),
+        ('/v5/position/', 'trade'),
+        ('/v5/account/', 'account')
+    )
+
+    def __init__(self, ip_limit=(100, 200), class_limits=None, max_retries=3,
+                 base_delay=0.5, max_delay=10.0, clock=time.monotonic):
+        self.clock = clock
+        self.ip_bucket = TokenBucket(*ip_limit, clock=clock)
+        self.class_limits = class_limits or {'market': (50, 100), 'default': (10, 20)}
+        self.buckets = {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._inflight = {}
+        self.logger = logging.getLogger(__name__)
+
+    def endpoint_class(self, endpoint):
+        for prefix, name in self.ENDPOINT_CLASSES:
+            if endpoint.startswith(prefix):
+                return name
+        return 'default'
+
+    def bucket(self, endpoint_class):
+        """
+        Возвращает корзину класса эндпоинтов, создавая её при первом обращении.
+        """
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is None:
+            rate, capacity = self.class_limits.get(endpoint_class, self.class_limits['default'])
+            bucket = self.buckets[endpoint_class] = TokenBucket(rate, capacity, clock=self.clock)
+        return bucket
+
+    def update_limits(self, endpoint, headers):
+        """
+        Учитывает заголовки лимитов из ответа биржи: при исчерпанном лимите
+        запросы класса приостанавливаются до момента сброса.
+        """
+        remaining = headers.get('X-Bapi-Limit-Status')
+        reset = headers.get('X-Bapi-Limit-Reset-Timestamp')
+        if remaining is None or reset is None:
+            return
+        try:
+            if int(remaining) > 0:
+                return
+            wait = int(reset) / 1000 - time.time()
+        except ValueError:
+            return
+        if wait > 0:
+            self.logger.warning(f"Лимит запросов {endpoint} исчерпан, пауза {wait:.2f} с.")
+            self.bucket(self.endpoint_class(endpoint)).block_until(self.clock() + wait)
+
+    async def submit(self, endpoint, send, key=None):
+        """
+        Выполняет запрос send() с учётом лимитов и повторов.
+        Запросы с одинаковым key, пришедшие пока первый не завершён, получают его результат.
+        """
+        if key is None:
+            return await self._run(endpoint, send)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(endpoint, send))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # shield: отмена одного из ожидающих не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _run(self, endpoint, send):
+        bucket = self.bucket(self.endpoint_class(endpoint))
+        for attempt in range(self.max_retries + 1):
+            await self.ip_bucket.acquire()
+            await bucket.acquire()
+            try:
+                return await send()
+            except RetryableError as e:
+                if attempt == self.max_retries:
+                    self.logger.error(f"Запрос {endpoint} не выполнен после {attempt + 1} попыток: {e}")
+                    return None
+                delay = e.retry_after if e.retry_after is not None else self.backoff(attempt)
+                self.logger.warning(f"Повтор запроса {endpoint} через {delay:.2f} с: {e}")
+                await asyncio.sleep(delay)
+
+    def backoff(self, attempt):
+        """
+        Экспоненциальная задержка с полным случайным разбросом.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -0,0 +1,179 @@
+# src/bot/scheduler.py
+
+import asyncio
+import heapq
+import logging
+import time
+
+# Доля интервала между сдвигами соседних активов (золотое сечение):
+# сдвиги распределяются по интервалу равномерно при любом числе активов
+STAGGER_RATIO = 0.6180339887498949
+
+class TickScheduler:
+    """
+    Центральный планировщик проверок цен, разбитый по активам.
+
+    Каждый актив проверяется раз в interval секунд; при проверке callback(symbol)
+    обрабатывает все стратегии этого актива за один проход. Моменты проверки активов
+    сдвинуты друг относительно друга, чтобы нагрузка распределялась по интервалу.
+    Если callback возвращает False, актив снимается с расписания.
+
+    Время берётся из clock, поэтому run_due можно вызывать с виртуальным временем.
+    """
+
+    def __init__(self, interval, callback, clock=time.monotonic, lag_warning=None):
+        self.interval = interval
+        self.callback = callback
+        self.clock = clock
+        # Задержка, начиная с которой отставание попадает в лог
+        self.lag_warning = lag_warning if lag_warning is not None else interval / 2
+        # symbol -> момент следующей проверки
+        self._due = {}
+        self._offsets = {}
+        self._heap = []
+        self._shard_count = 0
+        self._wakeup = None
+        self._task = None
+        self.runs = 0
+        self.skipped = 0
+        self.backlog = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_avg = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def offset(self, symbol):
+        """
+        Сдвиг проверок актива внутри интервала, постоянный для актива.
+        """
+        offset = self._offsets.get(symbol)
+        if offset is None:
+            offset = self._offsets[symbol] = (self._shard_count * STAGGER_RATIO) % 1.0 * self.interval
+            self._shard_count += 1
+        return offset
+
+    def add(self, symbol, now=None):
+        """
+        Ставит актив в расписание, если его там ещё нет.
+        """
+        if symbol in self._due:
+            return
+        now = self.clock() if now is None else now
+        offset = self.offset(symbol)
+        due = now + (offset - now) % self.interval
+        self._schedule(symbol, due)
+
+    def remove(self, symbol):
+        """
+        Снимает актив с расписания; запись в очереди пропускается при извлечении.
+        """
+        self._due.pop(symbol, None)
+
+    def __contains__(self, symbol):
+        return symbol in self._due
+
+    def __len__(self):
+        return len(self._due)
+
+    def _schedule(self, symbol, due):
+        self._due[symbol] = due
+        heapq.heappush(self._heap, (due, symbol))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def next_due(self):
+        """
+        Момент ближайшей проверки или None, если расписание пусто.
+        """
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    async def run_due(self, now=None):
+        """
+        Выполняет все проверки, срок которых наступил к моменту now. Возвращает их число.
+        """
+        now = self.clock() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, symbol = heapq.heappop(self._heap)
+            if self._due.get(symbol) == when:
+                due.append((when, symbol))
+
+        self.backlog = len(due)
+        for when, symbol in due:
+            self._record_lag(max(now, self.clock()) - when, symbol)
+            try:
+                active = await self.callback(symbol)
+            except Exception:
+                self.logger.exception(f"Ошибка при проверке цены {symbol}.")
+                active = True
+            self.backlog -= 1
+            self.runs += 1
+            if self._due.get(symbol) != when:
+                continue
+            if active is False:
+                del self._due[symbol]
+                continue
+
+            # Пропущенные из-за отставания проверки не выполняются повторно
+            next_due = when + self.interval
+            if next_due <= now:
+                missed = int((now - next_due) // self.interval) + 1
+                self.skipped += missed
+                next_due += missed * self.interval
+            self._schedule(symbol, next_due)
+        return len(due)
+
+    def _record_lag(self, lag, symbol):
+        self.lag_last = lag
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_avg += (lag - self.lag_avg) * 0.1
+        if lag > self.lag_warning:
+            self.logger.warning(
+                "Проверка %s отстаёт на %.2f с, в очереди %d.", symbol, lag, self.backlog, extra={'sample': True}
+            )
+
+    def stats(self):
+        """
+        Состояние планировщика: число активов, очередь, отставание проверок.
+        """
+        return {
+            'symbols': len(self._due),
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'backlog': self.backlog,
+            'lag_last': self.lag_last,
+            'lag_avg': self.lag_avg,
+            'lag_max': self.lag_max
+        }
+
+    def start(self):
+        """
+        Запускает выполнение проверок по расписанию в текущем цикле событий.
+        """
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            next_due = self.next_due()
+            timeout = None if next_due is None else max(0.0, next_due - self.clock())
+            self._wakeup.clear()
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            await self.run_due()
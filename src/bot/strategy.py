@@ -1,6 +1,7 @@
 # src/bot/strategy.py
 
 import logging
+from src.bot.position_book import PositionBook
 
 class GridTradingStrategy:
     """
@@ -12,57 +13,126 @@ class GridTradingStrategy:
         self.grid_step = grid_step
         self.price_drop_percent = price_drop_percent
         self.price_increase_percent = price_increase_percent
-        self.purchase_prices = []
+        self.positions = PositionBook()
         self.remaining_capital = initial_capital
+        # Последняя совершённая сделка: тип, цена, количество и PnL продажи
+        self.last_trade = None
         self.logger = logging.getLogger(__name__)
 
-    def execute_trade(self, current_price):
+    @property
+    def purchase_prices(self):
+        """
+        Цены открытых покупок в порядке FIFO.
+        """
+        return self.positions.prices()
+
+    def execute_trade(self, current_price, book=None, indicators=None):
         """
         Выполняет торговую операцию на основе текущей цены.
+        Если передан стакан актива (OrderBook), сделка исполняется по его уровням
+        со средней ценой прохода по глубине, а не по current_price.
+        Если переданы индикаторы актива (SymbolIndicators), шаг сетки масштабируется
+        по текущей волатильности; заданные проценты служат нижней границей.
         """
-        self.logger.info(f"Текущая цена: {current_price}")
-        self.logger.info(f"Цены покупок: {self.purchase_prices}")
-        self.logger.info(f"Оставшийся капитал: {self.remaining_capital}")
+        # Тик пишется в журнал только при включённом DEBUG, без форматирования в вызывающем потоке
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Тик: цена %s, открытых позиций %d, мин. цена %s, макс. цена %s, капитал %s",
+                current_price, len(self.positions), self.positions.min_price(),
+                self.positions.max_price(), self.remaining_capital
+            )
 
-        if self.should_buy(current_price):
+        drop_percent, increase_percent = self.grid_percents(indicators)
+
+        if self.should_buy(current_price, drop_percent):
             if self.remaining_capital >= self.grid_step:
-                self.purchase_prices.append(current_price)
+                fill_price = current_price
+                if book is not None:
+                    fill = book.buy(self.grid_step)
+                    if not fill.complete:
+                        self.logger.debug("Недостаточно ликвидности для покупки.")
+                        return "Недостаточно ликвидности для покупки."
+                    fill_price = fill.price
+                self.positions.add(fill_price, self.grid_step)
                 self.remaining_capital -= self.grid_step
-                self.logger.info(f"Покупка по цене: {current_price}")
-                return f"Покупка по цене: {current_price}"
+                self.last_trade = {
+                    'operation_type': 'buy',
+                    'price': fill_price,
+                    'quantity': self.grid_step / fill_price
+                }
+                self.logger.info("Покупка по цене: %s", fill_price)
+                return f"Покупка по цене: {fill_price}"
             else:
-                self.logger.info("Недостаточно капитала для покупки.")
+                self.logger.debug("Недостаточно капитала для покупки.")
                 return "Недостаточно капитала для покупки."
 
-        if self.should_sell(current_price):
-            if self.purchase_prices:
-                purchase_price = self.purchase_prices.pop(0)
+        if self.should_sell(current_price, increase_percent):
+            if self.positions:
+                fill_price = current_price
+                if book is not None:
+                    purchase_price = self.positions.oldest()
+                    fill = book.sell(self.grid_step / purchase_price)
+                    if not fill.complete:
+                        self.logger.debug("Недостаточно ликвидности для продажи.")
+                        return "Недостаточно ликвидности для продажи."
+                    fill_price = fill.price
+                purchase_price, _ = self.positions.pop_oldest()
                 self.remaining_capital += self.grid_step
-                self.logger.info(f"Продажа по цене: {current_price}")
-                return f"Продажа по цене: {current_price}"
+                quantity = self.grid_step / purchase_price
+                self.last_trade = {
+                    'operation_type': 'sell',
+                    'price': fill_price,
+                    'quantity': quantity,
+                    'pnl': (fill_price - purchase_price) * quantity
+                }
+                self.logger.info("Продажа по цене: %s", fill_price)
+                return f"Продажа по цене: {fill_price}"
             else:
-                self.logger.info("Нет позиций для продажи.")
+                self.logger.debug("Нет позиций для продажи.")
                 return "Нет позиций для продажи."
 
         return "Ожидание."
 
-    def should_buy(self, current_price):
+    def grid_percents(self, indicators=None):
+        """
+        Проценты падения и роста цены для сделки: заданные или адаптивные по индикаторам.
+        Без открытых позиций покупка сравнивается с текущей ценой, поэтому процент падения
+        остаётся заданным: масштабированный по волатильности, он не дал бы открыть первый лот.
+        """
+        if indicators is None:
+            return self.price_drop_percent, self.price_increase_percent
+        drop_percent = self.price_drop_percent
+        if self.positions:
+            drop_percent = indicators.spacing_percent(drop_percent)
+        return drop_percent, indicators.spacing_percent(self.price_increase_percent)
+
+    def should_buy(self, current_price, drop_percent=None):
         """
         Определяет, следует ли совершить покупку.
         """
-        if not self.purchase_prices:
+        if drop_percent is None:
+            drop_percent = self.price_drop_percent
+        if not self.positions:
             reference_price = current_price
         else:
-            reference_price = min(self.purchase_prices)
+            reference_price = self.positions.min_price()
 
-        return current_price <= reference_price * (1 - self.price_drop_percent / 100)
+        return current_price <= reference_price * (1 - drop_percent / 100)
 
-    def should_sell(self, current_price):
+    def should_sell(self, current_price, increase_percent=None):
         """
         Определяет, следует ли совершить продажу.
         """
-        if not self.purchase_prices:
+        if not self.positions:
             return False
 
-        reference_price = max(self.purchase_prices)
-        return current_price >= reference_price * (1 + self.price_increase_percent / 100)
+        if increase_percent is None:
+            increase_percent = self.price_increase_percent
+        reference_price = self.positions.max_price()
+        return current_price >= reference_price * (1 + increase_percent / 100)
+
+    def unrealized_pnl(self, current_price):
+        """
+        Нереализованная прибыль или убыток открытых позиций по текущей цене.
+        """
+        return self.positions.unrealized_pnl(current_price)
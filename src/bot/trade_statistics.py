@@ -0,0 +1,255 @@
+# src/bot/trade_statistics.py
+
+import time
+import numpy as np
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+
+# Именованные периоды статистики в секундах
+PERIODS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400
+}
+
+# Порядок полей агрегата
+FIELDS = (
+    'total_buys', 'total_sells',
+    'buy_price_sum', 'sell_price_sum',
+    'buy_quantity', 'sell_quantity',
+    'buy_notional', 'sell_notional',
+    'realized_pnl'
+)
+
+def parse_timestamp(value):
+    """
+    Приводит метку времени сделки к секундам Unix. Неизвестное время считается нулём.
+    """
+    if value is None or value == '':
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+class TimeIndex:
+    """
+    Индекс агрегатов по временным корзинам с префиксными суммами.
+    Сумма за любой период «последние N секунд» находится бинарным поиском за O(log n).
+    """
+
+    def __init__(self, bucket_seconds):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = []
+        # cumulative[i] — сумма агрегатов всех корзин до i включительно
+        self.cumulative = []
+
+    def add(self, timestamp, values):
+        bucket = int(timestamp // self.bucket_seconds)
+        if self.buckets and bucket == self.buckets[-1]:
+            self.cumulative[-1] = [a + b for a, b in zip(self.cumulative[-1], values)]
+            return
+
+        if not self.buckets or bucket > self.buckets[-1]:
+            previous = self.cumulative[-1] if self.cumulative else [0.0] * len(values)
+            self.buckets.append(bucket)
+            self.cumulative.append([a + b for a, b in zip(previous, values)])
+            return
+
+        # Сделка из прошлого: обновляем префиксы от её корзины до конца
+        index = bisect_left(self.buckets, bucket)
+        if self.buckets[index] != bucket:
+            previous = self.cumulative[index - 1] if index else [0.0] * len(values)
+            self.buckets.insert(index, bucket)
+            self.cumulative.insert(index, list(previous))
+        for i in range(index, len(self.cumulative)):
+            self.cumulative[i] = [a + b for a, b in zip(self.cumulative[i], values)]
+
+    def total(self):
+        return self.cumulative[-1] if self.cumulative else None
+
+    def since(self, timestamp):
+        """
+        Сумма агрегатов по корзинам, начиная с корзины, содержащей timestamp.
+        """
+        if not self.cumulative:
+            return None
+        index = bisect_left(self.buckets, int(timestamp // self.bucket_seconds))
+        if index == 0:
+            return self.cumulative[-1]
+        return [a - b for a, b in zip(self.cumulative[-1], self.cumulative[index - 1])]
+
+class TradeStatistics:
+    """
+    Инкрементальная статистика по сделкам: общие агрегаты и разрезы по активу и чату
+    с индексом по времени. Каждая сделка учитывается один раз при сохранении.
+    """
+
+    DIMENSIONS = ('symbol', 'chat_id')
+
+    def __init__(self, bucket_seconds=60):
+        self.bucket_seconds = bucket_seconds
+        self.indexes = {}
+        # Открытые покупки для расчёта реализованного PnL по FIFO: (chat_id, symbol) -> deque([цена, количество])
+        self._open_lots = {}
+
+    def add(self, trade):
+        """
+        Учитывает сделку во всех агрегатах.
+        """
+        operation_type = trade.get('operation_type')
+        if operation_type not in ('buy', 'sell'):
+            return
+        price = float(trade['price'])
+        quantity = float(trade.get('quantity', 1.0))
+        timestamp = parse_timestamp(trade.get('timestamp'))
+        pnl = self._realize(trade, operation_type, price, quantity)
+
+        values = [0.0] * len(FIELDS)
+        if operation_type == 'buy':
+            values[0] = 1
+            values[2] = price
+            values[4] = quantity
+            values[6] = price * quantity
+        else:
+            values[1] = 1
+            values[3] = price
+            values[5] = quantity
+            values[7] = price * quantity
+            values[8] = pnl
+
+        for key in self._keys(trade):
+            index = self.indexes.get(key)
+            if index is None:
+                index = self.indexes[key] = TimeIndex(self.bucket_seconds)
+            index.add(timestamp, values)
+
+    def add_columns(self, timestamps, sides, prices, quantities, pnls, groups):
+        """
+        Строит агрегаты сразу по массивам колонок (например, из колоночного хранилища).
+        sides: 1 — покупка, -1 — продажа; pnls: реализованный PnL продаж (NaN — неизвестен);
+        groups: dimension -> (массив идентификаторов, функция идентификатор -> значение,
+        идентификатор «нет значения» или None).
+        Реализованный PnL берётся из записей, без сопоставления покупок и продаж.
+        """
+        is_buy = sides == 1
+        is_sell = sides == -1
+        values = np.zeros((len(timestamps), len(FIELDS)), dtype=np.float64)
+        values[:, 0] = is_buy
+        values[:, 1] = is_sell
+        values[:, 2] = np.where(is_buy, prices, 0.0)
+        values[:, 3] = np.where(is_sell, prices, 0.0)
+        values[:, 4] = np.where(is_buy, quantities, 0.0)
+        values[:, 5] = np.where(is_sell, quantities, 0.0)
+        values[:, 6] = values[:, 2] * quantities
+        values[:, 7] = values[:, 3] * quantities
+        values[:, 8] = np.where(is_sell, np.nan_to_num(pnls), 0.0)
+        buckets = np.floor_divide(timestamps, self.bucket_seconds).astype(np.int64)
+
+        self._add_grouped(np.zeros(len(timestamps), dtype=np.int64), buckets, values, lambda _: None)
+        for dimension, (ids, resolve, missing) in groups.items():
+            mask = slice(None) if missing is None else ids != missing
+            self._add_grouped(
+                np.asarray(ids[mask], dtype=np.int64), buckets[mask], values[mask],
+                lambda group_id, dimension=dimension, resolve=resolve: (dimension, resolve(group_id))
+            )
+
+    def _add_grouped(self, groups, buckets, values, make_key):
+        """
+        Суммирует значения по парам (группа, корзина) и записывает префиксные суммы в индексы групп.
+        """
+        if not len(groups):
+            return
+        order = np.lexsort((buckets, groups))
+        groups = groups[order]
+        buckets = buckets[order]
+        values = values[order]
+
+        change = np.ones(len(groups), dtype=bool)
+        change[1:] = (groups[1:] != groups[:-1]) | (buckets[1:] != buckets[:-1])
+        starts = np.flatnonzero(change)
+        sums = np.add.reduceat(values, starts, axis=0)
+        unique_groups = groups[starts]
+        unique_buckets = buckets[starts]
+
+        group_starts = np.flatnonzero(np.r_[True, unique_groups[1:] != unique_groups[:-1]])
+        bounds = np.r_[group_starts, len(unique_groups)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            index = TimeIndex(self.bucket_seconds)
+            index.buckets = unique_buckets[start:end].tolist()
+            index.cumulative = np.cumsum(sums[start:end], axis=0).tolist()
+            self.indexes[make_key(int(unique_groups[start]))] = index
+
+    def _keys(self, trade):
+        yield None
+        for dimension in self.DIMENSIONS:
+            value = trade.get(dimension)
+            if value is not None:
+                yield (dimension, value)
+
+    def _realize(self, trade, operation_type, price, quantity):
+        """
+        Сопоставляет продажу с самыми старыми покупками и возвращает реализованный PnL.
+        Если в записи сделки уже указан pnl, используется он.
+        """
+        lots = self._open_lots.setdefault((trade.get('chat_id'), trade.get('symbol')), deque())
+        if operation_type == 'buy':
+            lots.append([price, quantity])
+            return 0.0
+
+        pnl = 0.0
+        remaining = quantity
+        while remaining > 0 and lots:
+            lot = lots[0]
+            matched = min(remaining, lot[1])
+            pnl += (price - lot[0]) * matched
+            lot[1] -= matched
+            remaining -= matched
+            if lot[1] <= 1e-12:
+                lots.popleft()
+        if 'pnl' in trade:
+            return float(trade['pnl'])
+        return pnl
+
+    def get(self, period=None, symbol=None, chat_id=None, now=None):
+        """
+        Возвращает статистику за период ('hour', 'day', 'week' или число секунд)
+        по всем сделкам либо по одному активу или чату.
+        """
+        if symbol is not None:
+            key = ('symbol', symbol)
+        elif chat_id is not None:
+            key = ('chat_id', chat_id)
+        else:
+            key = None
+
+        index = self.indexes.get(key)
+        if index is None:
+            values = None
+        elif period is None:
+            values = index.total()
+        else:
+            seconds = PERIODS[period] if isinstance(period, str) else period
+            values = index.since((now if now is not None else time.time()) - seconds)
+        return self._to_dict(values or [0.0] * len(FIELDS))
+
+    def _to_dict(self, values):
+        data = dict(zip(FIELDS, values))
+        total_buys = int(data['total_buys'])
+        total_sells = int(data['total_sells'])
+        return {
+            'total_buys': total_buys,
+            'total_sells': total_sells,
+            'average_buy_price': data['buy_price_sum'] / total_buys if total_buys > 0 else 0,
+            'average_sell_price': data['sell_price_sum'] / total_sells if total_sells > 0 else 0,
+            'vwap_buy_price': data['buy_notional'] / data['buy_quantity'] if data['buy_quantity'] else 0,
+            'vwap_sell_price': data['sell_notional'] / data['sell_quantity'] if data['sell_quantity'] else 0,
+            'buy_volume': data['buy_notional'],
+            'sell_volume': data['sell_notional'],
+            'realized_pnl': data['realized_pnl']
+        }
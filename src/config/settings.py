@@ -28,8 +28,115 @@ available_assets = [
 INITIAL_CAPITAL = int(os.getenv('INITIAL_CAPITAL', 100000))
 GRID_STEP = int(os.getenv('GRID_STEP', 10))
 
+# Настройки HTTP-клиента биржи: размер пула соединений и таймаут запроса (в секундах)
+EXCHANGE_POOL_SIZE = int(os.getenv('EXCHANGE_POOL_SIZE', 20))
+EXCHANGE_TIMEOUT = float(os.getenv('EXCHANGE_TIMEOUT', 10))
+# Ограничение скорости запросов к бирже (запросов в секунду на IP) и число повторов при 429/5xx
+EXCHANGE_RATE_LIMIT = float(os.getenv('EXCHANGE_RATE_LIMIT', 100))
+EXCHANGE_MAX_RETRIES = int(os.getenv('EXCHANGE_MAX_RETRIES', 3))
+
+# Интервал общего опроса цен (в секундах)
+PRICE_POLL_INTERVAL = int(os.getenv('PRICE_POLL_INTERVAL', 60))
+
+# Источник цен: 'polling' — периодический опрос REST, 'stream' — WebSocket-поток тиков
+PRICE_FEED_MODE = os.getenv('PRICE_FEED_MODE', 'polling').lower()
+EXCHANGE_WS_URL = os.getenv('EXCHANGE_WS_URL', 'wss://stream-testnet.bybit.com/v5/public/spot')
+# Топик потока: 'tickers' или 'publicTrade'
+PRICE_STREAM_TOPIC = os.getenv('PRICE_STREAM_TOPIC', 'tickers')
+# Глубина стакана для исполнения сделок по уровням в режиме stream (1, 50 или 200; 0 — по последней цене)
+ORDER_BOOK_DEPTH = int(os.getenv('ORDER_BOOK_DEPTH', 0))
+
+# Режим сетки: fixed — фиксированные проценты падения/роста, adaptive — шаг по волатильности актива
+GRID_MODE = os.getenv('GRID_MODE', 'fixed').lower()
+# Множитель волатильности (ATR в процентах цены) для шага адаптивной сетки
+GRID_VOLATILITY_MULTIPLIER = float(os.getenv('GRID_VOLATILITY_MULTIPLIER', 1.0))
+# Период EMA/ATR, окно отклонения доходностей и VWAP (в тиках) и длина бара ATR в секундах
+INDICATOR_PERIOD = int(os.getenv('INDICATOR_PERIOD', 14))
+INDICATOR_WINDOW = int(os.getenv('INDICATOR_WINDOW', 100))
+INDICATOR_BAR_SECONDS = int(os.getenv('INDICATOR_BAR_SECONDS', 60))
+
+if PRICE_FEED_MODE not in ('polling', 'stream'):
+    raise ValueError("PRICE_FEED_MODE должен быть 'polling' или 'stream'.")
+
+# Исходящие сообщения Telegram: общий лимит в секунду, интервал между сообщениями в один чат
+# (в секундах) и число одновременных запросов отправки
+TELEGRAM_RATE_LIMIT = float(os.getenv('TELEGRAM_RATE_LIMIT', 30))
+TELEGRAM_CHAT_INTERVAL = float(os.getenv('TELEGRAM_CHAT_INTERVAL', 1.0))
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv('TELEGRAM_SEND_CONCURRENCY', 8))
+
+# Журнал истории сделок
+TRADING_HISTORY_PATH = os.getenv('TRADING_HISTORY_PATH', 'trading_history.jsonl')
+# Формат хранения: 'jsonl' — журнал, 'columnar' — колоночное хранилище (TRADING_HISTORY_PATH — каталог)
+TRADING_HISTORY_FORMAT = os.getenv('TRADING_HISTORY_FORMAT', 'jsonl')
+TRADING_HISTORY_FSYNC = os.getenv('TRADING_HISTORY_FSYNC', 'batch')
+# Сжатие журнала после указанного числа новых сделок (0 — не сжимать)
+TRADING_HISTORY_COMPACT_EVERY = int(os.getenv('TRADING_HISTORY_COMPACT_EVERY', 100000)) or None
+
+# Состояние чатов (стратегии, параметры, мониторинг): каталог снимков и журнала,
+# политика fsync журнала и интервал снимков в секундах
+STATE_PATH = os.getenv('STATE_PATH', 'state')
+STATE_FSYNC = os.getenv('STATE_FSYNC', 'batch')
+STATE_CHECKPOINT_INTERVAL = int(os.getenv('STATE_CHECKPOINT_INTERVAL', 300))
+
+# Локальный кэш свечей и число одновременных запросов при его заполнении
+KLINE_CACHE_PATH = os.getenv('KLINE_CACHE_PATH', 'kline_cache.sqlite3')
+KLINE_FETCH_CONCURRENCY = int(os.getenv('KLINE_FETCH_CONCURRENCY', 4))
+
+# Перебор параметров стратегии: число процессов (по умолчанию — все ядра), глубина истории
+# в минутных свечах (по умолчанию 90 дней) и время (в секундах), в течение которого
+# результаты перебора по всем активам используются повторно
+OPTIMIZER_WORKERS = int(os.getenv('OPTIMIZER_WORKERS', 0)) or None
+OPTIMIZER_HISTORY_LIMIT = int(os.getenv('OPTIMIZER_HISTORY_LIMIT', 90 * 24 * 60))
+OPTIMIZER_RESULTS_TTL = int(os.getenv('OPTIMIZER_RESULTS_TTL', 3600))
+
+# Многопроцессный режим (src/bot/cluster.py): число воркеров (по умолчанию — все ядра)
+# и ёмкость кольцевого буфера тиков в разделяемой памяти
+CLUSTER_WORKERS = int(os.getenv('CLUSTER_WORKERS', 0)) or None
+CLUSTER_RING_SIZE = int(os.getenv('CLUSTER_RING_SIZE', 65536))
+
+# Метрики производительности: гистограммы задержек, эндпоинт Prometheus и команда /perf
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+# Порт эндпоинта /metrics: пустое значение — без эндпоинта (только /perf), 0 — любой свободный порт
+METRICS_PORT = os.getenv('METRICS_PORT', '9100').strip()
+METRICS_PORT = int(METRICS_PORT) if METRICS_PORT else None
+# Период замера отставания цикла событий, с
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv('METRICS_LOOP_LAG_INTERVAL', 0.5))
+# Чаты администраторов через запятую: им доступна команда /perf
+ADMIN_CHAT_IDS = frozenset(int(chat_id) for chat_id in os.getenv('ADMIN_CHAT_IDS', '').split(',') if chat_id.strip())
+
 # Настройки логирования
 LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', 'logs/trading_bot.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Формат файла журнала: json (одно событие на строку) или text
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+# Ротация: size — по размеру (LOG_MAX_BYTES, LOG_BACKUP_COUNT), time — по времени (LOG_ROTATE_WHEN)
+LOG_ROTATION = os.getenv('LOG_ROTATION', 'size').lower()
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+# В журнал попадает каждая N-я запись частых событий (тики стратегии на уровне DEBUG)
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 100))
+
+if LOG_ROTATION == 'time':
+    _log_file_handler = {
+        'class': 'logging.handlers.TimedRotatingFileHandler',
+        'when': LOG_ROTATE_WHEN,
+        'backupCount': LOG_BACKUP_COUNT
+    }
+else:
+    _log_file_handler = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'maxBytes': LOG_MAX_BYTES,
+        'backupCount': LOG_BACKUP_COUNT
+    }
+_log_file_handler.update({
+    'level': LOG_LEVEL,
+    'filename': LOG_FILE_PATH,
+    'encoding': 'utf-8',
+    'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose'
+})
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -37,19 +144,29 @@ LOGGING = {
         'verbose': {
             'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
         },
+        'json': {
+            '()': 'src.bot.log_pipeline.JsonFormatter'
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'src.bot.log_pipeline.SamplingFilter',
+            'every': LOG_SAMPLE_EVERY
+        },
     },
     'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': LOG_FILE_PATH,
+        'console': {
+            'level': LOG_LEVEL,
+            'class': 'logging.StreamHandler',
             'formatter': 'verbose'
         },
+        'file': _log_file_handler,
     },
     'loggers': {
         '': {
-            'handlers': ['file'],
-            'level': 'INFO',
+            'handlers': ['console', 'file'],
+            'filters': ['sampling'],
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
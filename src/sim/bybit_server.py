@@ -0,0 +1,158 @@
+# src/sim/bybit_server.py
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import sys
+import zlib
+from collections import Counter
+from aiohttp import web
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.bot.kline_cache import INTERVAL_MS
+
+class BybitStub:
+    """
+    Локальная замена REST API биржи: /v5/market/tickers и /v5/market/kline.
+    Цены тикеров задаются через set_prices, свечи генерируются детерминированно
+    по времени начала свечи, поэтому повторные запросы возвращают те же данные.
+    """
+
+    def __init__(self, prices=None, host='127.0.0.1', port=0):
+        self.prices = dict(prices or {})
+        self.host = host
+        self.port = port
+        # Число запросов по каждому пути, для проверок в тестах
+        self.requests = Counter()
+        # Очередь ответов-ошибок (HTTP-статус, заголовки, retCode), возвращаемых вместо следующих запросов
+        self.failures = []
+        self._runner = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def set_prices(self, prices):
+        """
+        Обновляет последние цены, которые возвращает /v5/market/tickers.
+        """
+        self.prices.update(prices)
+
+    def fail_next(self, count=1, status=429, headers=None, ret_code=None):
+        """
+        Следующие count запросов завершатся ошибкой status (например, 429 или 503).
+        ret_code задаёт retCode ответа, например 10006 с HTTP 200, как при лимите биржи.
+        """
+        self.failures.extend([(status, dict(headers or {}), ret_code or status)] * count)
+
+    @web.middleware
+    async def inject_failures(self, request, handler):
+        if self.failures:
+            self.requests[request.path] += 1
+            status, headers, ret_code = self.failures.pop(0)
+            return web.json_response({'retCode': ret_code, 'retMsg': 'injected'}, status=status, headers=headers)
+        return await handler(request)
+
+    def build_app(self):
+        app = web.Application(middlewares=[self.inject_failures])
+        app.router.add_get('/v5/market/tickers', self.handle_tickers)
+        app.router.add_get('/v5/market/kline', self.handle_kline)
+        return app
+
+    async def start(self):
+        """
+        Запускает сервер; при port=0 порт выбирается автоматически.
+        """
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self.logger.info(f"Заглушка API биржи запущена: {self.url}")
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _response(self, result):
+        return web.json_response({'retCode': 0, 'retMsg': 'OK', 'result': result, 'time': 0})
+
+    def _error(self, message):
+        return web.json_response({'retCode': 10001, 'retMsg': message, 'result': {}, 'time': 0})
+
+    async def handle_tickers(self, request):
+        self.requests[request.path] += 1
+        symbol = request.query.get('symbol')
+        if symbol:
+            symbols = [symbol] if symbol in self.prices else []
+        else:
+            symbols = list(self.prices)
+        return self._response({
+            'category': request.query.get('category', 'spot'),
+            'list': [{'symbol': s, 'lastPrice': str(self.prices[s])} for s in symbols]
+        })
+
+    async def handle_kline(self, request):
+        self.requests[request.path] += 1
+        query = request.query
+        symbol = query.get('symbol')
+        interval = query.get('interval')
+        if not symbol or interval not in INTERVAL_MS:
+            return self._error("Некорректные параметры запроса свечей.")
+
+        step = INTERVAL_MS[interval]
+        limit = min(int(query.get('limit', 200)), 1000)
+        end = int(query['end']) if 'end' in query else 1700000000000
+        start = int(query['start']) if 'start' in query else end - (limit - 1) * step
+
+        # Как и биржа: свечи с началом в [start, end], от новых к старым, не более limit
+        last = end // step * step
+        first = max(-(-start // step) * step, last - (limit - 1) * step)
+        rows = []
+        for candle_start in range(last, first - 1, -step):
+            rows.append(self.kline(symbol, candle_start, step))
+        return self._response({'symbol': symbol, 'category': query.get('category', 'spot'), 'list': rows})
+
+    def kline(self, symbol, candle_start, step):
+        """
+        Детерминированная свеча актива: цена — синусоида с псевдослучайным шумом.
+        """
+        base = 10 + zlib.crc32(symbol.encode()) % 1000
+        def price(t):
+            noise = (zlib.crc32(f"{symbol}:{t}".encode()) % 1000) / 1000 - 0.5
+            return base * (1 + 0.02 * math.sin(t / 3.6e6) + 0.002 * noise)
+        open_price = price(candle_start)
+        close_price = price(candle_start + step)
+        high = max(open_price, close_price) * 1.0005
+        low = min(open_price, close_price) * 0.9995
+        volume = 1 + zlib.crc32(f"v:{symbol}:{candle_start}".encode()) % 100
+        return [str(candle_start), str(open_price), str(high), str(low), str(close_price), str(volume),
+                str(volume * close_price)]
+
+async def serve(host, port, prices):
+    stub = await BybitStub(prices=prices, host=host, port=port).start()
+    print(f"Заглушка API биржи: {stub.url}")
+    try:
+        await asyncio.Future()
+    finally:
+        await stub.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Локальная заглушка REST API биржи.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--price', action='append', default=[], metavar='SYMBOL=PRICE',
+                        help="Цена тикера, например BTCUSDT=30000")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    prices = {}
+    for item in args.price:
+        symbol, value = item.split('=', 1)
+        prices[symbol] = float(value)
+    asyncio.run(serve(args.host, args.port, prices))
@@ -0,0 +1,50 @@
+# src/sim/record_ticks.py
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.bot.price_stream import PriceStream
+
+async def record(url, symbols, path, topic, duration, book_depth=0):
+    """
+    Записывает тики из потока биржи в файл JSON Lines для последующего воспроизведения.
+    При book_depth записываются и сообщения стаканов: {"ts", "symbol", "book": {"type", "data"}}.
+    """
+    with open(path, 'a') as file:
+        async def on_tick(symbol, price):
+            file.write(json.dumps({'ts': int(time.time() * 1000), 'symbol': symbol, 'price': price}) + '\n')
+
+        def on_book(message):
+            data = message.get('data') or {}
+            file.write(json.dumps({
+                'ts': message.get('ts', int(time.time() * 1000)),
+                'symbol': data.get('s'),
+                'book': {'type': message.get('type'), 'data': data}
+            }) + '\n')
+            return True
+
+        stream = PriceStream(url, symbols, on_tick, topic=topic, book_depth=book_depth, on_book=on_book)
+        stream.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            await stream.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Запись тиков из публичного WebSocket биржи.")
+    parser.add_argument('output', help="Файл для записи тиков (JSON Lines)")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--url', default='wss://stream.bybit.com/v5/public/spot')
+    parser.add_argument('--topic', default='tickers', choices=['tickers', 'publicTrade'])
+    parser.add_argument('--duration', type=float, default=60, help="Длительность записи в секундах")
+    parser.add_argument('--orderbook', type=int, default=0, help="Глубина стакана для записи (0 — без стакана)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(record(args.url, args.symbols, args.output, args.topic, args.duration, args.orderbook))
@@ -0,0 +1,411 @@
+# src/sim/replay.py
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from telegram import Bot, Chat, Message, MessageEntity, Update, User
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.sim.bybit_server import BybitStub
+from src.sim.ws_server import load_ticks
+
+# Наборы параметров, из которых сценарий выбирает параметры чата
+# (отрицательный процент падения включает покупку без открытых позиций)
+PARAMETER_PRESETS = (
+    '1000 100 0.1 0.1',
+    '1000 100 -0.05 0.1',
+    '5000 250 -0.02 0.3',
+    '2000 100 0.5 0.5'
+)
+
+class FakeTelegram:
+    """
+    Заглушка Telegram: принимает сообщения бота и ответы на команды, считает их по чатам.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = Counter()
+        self.replies = Counter()
+        self.trade_messages = Counter()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent[chat_id] += 1
+        if "Покупка" in text or "Продажа" in text:
+            self.trade_messages[chat_id] += 1
+
+    async def reply(self, chat_id, text):
+        self.replies[chat_id] += 1
+
+class ReplayBot(Bot):
+    """
+    Клиент Telegram API приложения без сети: ответы обработчиков на команды передаются в FakeTelegram.
+    """
+
+    def __init__(self, telegram, token):
+        super().__init__(token)
+        # Объекты telegram после создания неизменяемы
+        with self._unfrozen():
+            self.telegram = telegram
+
+    async def get_me(self, *args, **kwargs):
+        self._bot_user = User(id=1, first_name='replay', is_bot=True, username='replay_bot')
+        return self._bot_user
+
+    async def send_message(self, chat_id, text, *args, **kwargs):
+        await self.telegram.reply(chat_id, text)
+
+class ScriptedChat:
+    """
+    Чат сценария: команды с моментами отправки в виртуальном времени.
+    """
+
+    def __init__(self, chat_id, commands):
+        self.chat_id = chat_id
+        # [(виртуальное время, текст)], по возрастанию времени
+        self.commands = commands
+
+def load_price_ticks(path):
+    """
+    Тики цен из файла src/sim/record_ticks.py (сообщения стаканов пропускаются).
+    """
+    return [tick for tick in load_ticks(path) if 'price' in tick]
+
+def generate_ticks(symbols, duration, step=1.0, volatility=0.001, start=1700000000.0, seed=0):
+    """
+    Синтетические тики: случайное блуждание цены каждого актива с шагом step секунд.
+    """
+    rng = random.Random(seed)
+    prices = {symbol: 100.0 * (i + 1) for i, symbol in enumerate(symbols)}
+    ticks = []
+    for i in range(int(duration / step) + 1):
+        ts = int((start + i * step) * 1000)
+        for symbol in symbols:
+            prices[symbol] *= 1 + rng.gauss(0, volatility)
+            ticks.append({'ts': ts, 'symbol': symbol, 'price': prices[symbol]})
+    return ticks
+
+def build_script(chats, symbols, start, ramp, seed=0):
+    """
+    Сценарий чатов: /start, /trade, выбор актива, /set_parameters, параметры и /start_monitoring
+    в случайный момент первых ramp секунд, /status в конце.
+    """
+    rng = random.Random(seed)
+    script = []
+    for chat_id in range(1, chats + 1):
+        at = start + rng.uniform(0, ramp)
+        texts = ['/start', '/trade', rng.choice(symbols), '/set_parameters', rng.choice(PARAMETER_PRESETS),
+                 '/start_monitoring']
+        script.append(ScriptedChat(chat_id, [(at + i, text) for i, text in enumerate(texts)]))
+    return script
+
+class PriceTape:
+    """
+    Цены активов по записанным тикам на момент виртуального времени.
+    """
+
+    def __init__(self, ticks):
+        self.ticks = sorted(ticks, key=lambda tick: tick['ts'])
+        self.times = [tick['ts'] / 1000 for tick in self.ticks]
+        self.position = 0
+        self.prices = {}
+
+    @property
+    def start(self):
+        return self.times[0]
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    def advance(self, now):
+        """
+        Применяет тики до момента now включительно. Возвращает текущие цены.
+        """
+        end = bisect.bisect_right(self.times, now, self.position)
+        for tick in self.ticks[self.position:end]:
+            self.prices[tick['symbol']] = float(tick['price'])
+        self.position = end
+        return self.prices
+
+def import_bot(directory, exchange_url, environment=None):
+    """
+    Импортирует модуль бота с настройками прогона: заглушка биржи, временные файлы
+    состояния и журнала, снятые лимиты скорости.
+    """
+    os.environ.update({
+        'API_KEY': os.environ.get('API_KEY', 'replay'),
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'replay'),
+        'TELEGRAM_API_TOKEN': os.environ.get('TELEGRAM_API_TOKEN', '0:replay'),
+        'EXCHANGE_URL': exchange_url,
+        'PRICE_FEED_MODE': 'polling',
+        'EXCHANGE_RATE_LIMIT': '1000000',
+        'TELEGRAM_RATE_LIMIT': '1000000',
+        'TELEGRAM_CHAT_INTERVAL': '0',
+        'TRADING_HISTORY_PATH': os.path.join(directory, 'trading_history.jsonl'),
+        'STATE_PATH': os.path.join(directory, 'state'),
+        'KLINE_CACHE_PATH': os.path.join(directory, 'kline_cache.sqlite3')
+    })
+    os.environ.update(environment or {})
+    from src.bot import main as bot
+    return bot
+
+class ReplayHarness:
+    """
+    Детерминированный прогон бота целиком без сети: заглушка REST API биржи с ценами
+    из записанных тиков, заглушка Telegram и сценарий чатов. Время виртуальное:
+    планировщик проверок выполняется сразу в момент следующей проверки или команды,
+    поэтому часы рынка проигрываются за секунды.
+    """
+
+    def __init__(self, ticks, script, telegram_latency=0.0, environment=None):
+        self.tape = PriceTape(ticks)
+        self.script = script
+        self.telegram = FakeTelegram(telegram_latency)
+        self.environment = environment
+        self.now = self.tape.start
+        self.evaluations = 0
+        self.commands = 0
+        self.application = None
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self):
+        stub = await BybitStub(prices=self.tape.advance(self.now)).start()
+        directory = tempfile.mkdtemp(prefix='replay_')
+        try:
+            bot = self.bot = import_bot(directory, stub.url, self.environment)
+            report = await self._run(bot, stub)
+        finally:
+            await stub.stop()
+            shutil.rmtree(directory, ignore_errors=True)
+        return report
+
+    async def _run(self, bot, stub):
+        from src.bot.outbox import Outbox
+        from src.bot.scheduler import TickScheduler
+
+        bot.tick_scheduler = TickScheduler(bot.PRICE_POLL_INTERVAL, bot.process_shard, clock=lambda: self.now)
+        # Бары индикаторов строятся по виртуальному времени, как и расписание проверок
+        bot.price_service.clock = lambda: self.now
+        bot.outbox = Outbox(global_rate=1e6, chat_interval=0, concurrency=64)
+        bot.outbox.start(self.telegram)
+        # Команды проходят через приложение Telegram бота: те же обработчики, диалог и восстановление сессий
+        self.application = bot.build_application(
+            post_init=None, post_shutdown=None, bot=ReplayBot(self.telegram, bot.TELEGRAM_API_TOKEN)
+        )
+        await self.application.initialize()
+        bot.persistence.load()
+        process_price = bot.process_price
+
+        # Подсчёт применений цены к стратегиям чатов
+        def counted_process_price(*args, **kwargs):
+            self.evaluations += 1
+            return process_price(*args, **kwargs)
+        bot.process_price = counted_process_price
+
+        commands = [(at, chat.chat_id, index, chat) for chat in self.script for index, (at, _) in enumerate(chat.commands)]
+        commands.sort(key=lambda item: item[:3])
+        position = 0
+
+        started = time.perf_counter()
+        while True:
+            next_command = commands[position][0] if position < len(commands) else None
+            next_check = bot.tick_scheduler.next_due()
+            candidates = [t for t in (next_command, next_check) if t is not None]
+            if not candidates or min(candidates) > self.tape.end:
+                break
+            self.now = min(candidates)
+            stub.set_prices(self.tape.advance(self.now))
+
+            while position < len(commands) and commands[position][0] <= self.now:
+                _, _, index, chat = commands[position]
+                await self.send(bot, chat, chat.commands[index][1])
+                position += 1
+            await bot.tick_scheduler.run_due(self.now)
+            await bot.flush_trading_history(None)
+            # Очередь сообщений разбирается на каждом шаге: объединение сообщений не зависит от скорости машины
+            await bot.outbox.drain(timeout=60, poll=0)
+        elapsed = time.perf_counter() - started
+
+        for chat in self.script:
+            await self.send(bot, chat, '/status')
+        await bot.outbox.stop(timeout=60)
+
+        report = self.report(bot, stub, elapsed)
+        await self.application.shutdown()
+        await bot.price_service.api.close()
+        bot.kline_history.cache.close()
+        bot.data_handler.close()
+        bot.persistence.close()
+        return report
+
+    async def send(self, bot, chat, text):
+        """
+        Передаёт сообщение чата приложению Telegram бота как обновление от пользователя.
+        """
+        self.commands += 1
+        entities = []
+        if text.startswith('/'):
+            entities.append(MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text.split()[0])))
+        message = Message(
+            message_id=self.commands,
+            date=datetime.fromtimestamp(self.now, timezone.utc),
+            chat=Chat(chat.chat_id, Chat.PRIVATE),
+            from_user=User(chat.chat_id, f'chat{chat.chat_id}', False),
+            text=text,
+            entities=entities
+        )
+        message.set_bot(self.application.bot)
+        update = Update(self.commands, message=message)
+        update.set_bot(self.application.bot)
+        await self.application.process_update(update)
+
+    def report(self, bot, stub, elapsed):
+        """
+        Итоги прогона: производительность (зависит от машины) и результаты чатов (детерминированы).
+        """
+        prices = self.tape.prices
+        chats = {}
+        for chat in self.script:
+            stats = bot.data_handler.get_statistics(chat_id=chat.chat_id)
+            user_data = self.application.user_data[chat.chat_id]
+            strategy = user_data.get('strategy')
+            symbol = user_data.get('chosen_asset')
+            outcome = {
+                'symbol': symbol,
+                'params': user_data.get('strategy_params'),
+                'buys': stats['total_buys'],
+                'sells': stats['total_sells'],
+                'realized_pnl': round(stats['realized_pnl'], 8),
+                'messages': self.telegram.sent[chat.chat_id],
+                'trade_messages': self.telegram.trade_messages[chat.chat_id]
+            }
+            if strategy is not None:
+                price = prices.get(symbol)
+                outcome.update({
+                    'remaining_capital': round(strategy.remaining_capital, 8),
+                    'open_lots': len(strategy.positions),
+                    'unrealized_pnl': round(strategy.unrealized_pnl(price), 8) if price and strategy.positions else 0.0,
+                    'monitoring': bot.price_service.is_subscribed(chat.chat_id)
+                })
+            chats[str(chat.chat_id)] = outcome
+
+        virtual_seconds = self.now - self.tape.start
+        totals = defaultdict(float)
+        for outcome in chats.values():
+            for key in ('buys', 'sells', 'realized_pnl', 'messages', 'trade_messages'):
+                totals[key] += outcome[key]
+        digest = hashlib.sha256(json.dumps(chats, sort_keys=True).encode()).hexdigest()
+        return {
+            'throughput': {
+                'wall_seconds': elapsed,
+                'virtual_seconds': virtual_seconds,
+                'speedup': virtual_seconds / elapsed if elapsed else None,
+                'chat_evaluations': self.evaluations,
+                'chat_evaluations_per_sec': self.evaluations / elapsed if elapsed else None,
+                'scheduler_runs': bot.tick_scheduler.runs,
+                'exchange_requests': sum(stub.requests.values())
+            },
+            'messages': {
+                'sent': sum(self.telegram.sent.values()),
+                'trade_messages': sum(self.telegram.trade_messages.values()),
+                'command_replies': sum(self.telegram.replies.values()),
+                'commands': self.commands,
+                'coalesced': bot.outbox.dropped
+            },
+            'totals': dict(totals, chats=len(chats)),
+            'digest': digest,
+            'chats': chats
+        }
+
+def print_report(report):
+    throughput = report['throughput']
+    messages = report['messages']
+    totals = report['totals']
+    print(
+        f"Виртуальное время: {throughput['virtual_seconds']:.0f} с за {throughput['wall_seconds']:.2f} с "
+        f"(ускорение ×{throughput['speedup']:.0f})"
+    )
+    print(
+        f"Применений цены к чатам: {throughput['chat_evaluations']} "
+        f"({throughput['chat_evaluations_per_sec']:,.0f}/с), проверок по расписанию: {throughput['scheduler_runs']}, "
+        f"запросов к бирже: {throughput['exchange_requests']}"
+    )
+    print(
+        f"Сообщений: {messages['sent']} (о сделках {messages['trade_messages']}, объединено {messages['coalesced']}), "
+        f"ответов на команды: {messages['command_replies']} на {messages['commands']} команд"
+    )
+    print(
+        f"Чатов: {totals['chats']}, покупок: {totals['buys']:.0f}, продаж: {totals['sells']:.0f}, "
+        f"реализованный PnL: {totals['realized_pnl']:.2f}"
+    )
+    print(f"Контрольная сумма результатов чатов: {report['digest']}")
+
+def compare_outcomes(expected, report):
+    """
+    Сравнивает результаты чатов с сохранённым отчётом. Возвращает список расхождений.
+    """
+    differences = []
+    for chat_id in sorted(set(expected['chats']) | set(report['chats']), key=int):
+        before = expected['chats'].get(chat_id)
+        after = report['chats'].get(chat_id)
+        if before != after:
+            differences.append(f"Чат {chat_id}: было {before}, стало {after}")
+    return differences
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Детерминированный прогон бота на записанных тиках с заглушками биржи и Telegram."
+    )
+    parser.add_argument('ticks', nargs='?', help="файл тиков src/sim/record_ticks.py; без него — синтетические тики")
+    parser.add_argument('--chats', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=6 * 3600, help="длительность синтетических тиков, с")
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT'])
+    parser.add_argument('--ramp', type=float, default=600, help="за сколько секунд чаты запускают мониторинг")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--output', help="файл для отчёта JSON")
+    parser.add_argument('--compare', help="отчёт предыдущего прогона: результаты чатов должны совпасть")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if args.ticks:
+        ticks = load_price_ticks(args.ticks)
+        symbols = sorted({tick['symbol'] for tick in ticks})
+    else:
+        symbols = args.symbols
+        ticks = generate_ticks(symbols, args.duration, seed=args.seed)
+    start = ticks[0]['ts'] / 1000
+    script = build_script(args.chats, symbols, start, args.ramp, seed=args.seed)
+    report = asyncio.run(ReplayHarness(ticks, script, telegram_latency=args.telegram_latency).run())
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            differences = compare_outcomes(json.load(file), report)
+        for line in differences[:20]:
+            print(line)
+        if differences:
+            print(f"Результаты расходятся в {len(differences)} чатах.")
+            sys.exit(1)
+        print("Результаты чатов совпадают с отчётом.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# src/sim/ws_server.py
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import websockets
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.bot.order_book import OrderBooks
+
+def load_ticks(path):
+    """
+    Загружает записанные тики из файла JSON Lines: {"ts": ..., "symbol": ..., "price": ...}
+    и сообщения стаканов {"ts": ..., "symbol": ..., "book": {"type": ..., "data": ...}}.
+    """
+    ticks = []
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                ticks.append(json.loads(line))
+    ticks.sort(key=lambda tick: tick['ts'])
+    return ticks
+
+class ReplayServer:
+    """
+    Локальная замена публичного WebSocket биржи, воспроизводящая записанные тики.
+    """
+
+    def __init__(self, ticks, host='127.0.0.1', port=0, speed=1.0, disconnect_after=None):
+        self.ticks = ticks
+        self.host = host
+        self.port = port
+        # speed=0 отправляет тики без пауз
+        self.speed = speed
+        # Закрывает соединение после указанного числа тиков, чтобы проверить переподключение
+        self.disconnect_after = disconnect_after
+        # Позиция воспроизведения общая для всех соединений: после переподключения тики продолжаются
+        self.position = 0
+        # Стаканы по воспроизведённым сообщениям: снимок отправляется при подписке на стакан
+        self.books = OrderBooks(depth=None)
+        # Число следующих изменений стаканов, которые не будут отправлены (имитация пропуска)
+        self.drop_book_updates = 0
+        # Число запросов подписки и отписки по топикам, для проверок
+        self.subscribe_requests = 0
+        self.unsubscribe_requests = 0
+        self._server = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        """
+        Запускает сервер; при port=0 порт выбирается автоматически.
+        """
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = list(self._server.sockets)[0].getsockname()[1]
+        self.logger.info(f"Сервер воспроизведения тиков запущен: {self.url}")
+        return self
+
+    async def stop(self):
+        """
+        Останавливает сервер.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, ws):
+        """
+        Обслуживает одно соединение: подписки, ping и воспроизведение тиков.
+        """
+        topics = set()
+        subscribed = asyncio.Event()
+        replay = asyncio.ensure_future(self._replay(ws, topics, subscribed))
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                op = message.get('op')
+                if op == 'subscribe':
+                    args = message.get('args', [])
+                    self.subscribe_requests += 1
+                    topics.update(args)
+                    subscribed.set()
+                    await ws.send(json.dumps({'success': True, 'ret_msg': '', 'op': 'subscribe'}))
+                    for snapshot in self._book_snapshots(args):
+                        await ws.send(json.dumps(snapshot))
+                elif op == 'unsubscribe':
+                    self.unsubscribe_requests += 1
+                    topics.difference_update(message.get('args', []))
+                    await ws.send(json.dumps({'success': True, 'ret_msg': '', 'op': 'unsubscribe'}))
+                elif op == 'ping':
+                    await ws.send(json.dumps({'success': True, 'ret_msg': 'pong', 'op': 'ping'}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            replay.cancel()
+
+    async def _replay(self, ws, topics, subscribed):
+        """
+        Отправляет тики подписанных топиков с исходными интервалами, делёнными на speed.
+        """
+        await subscribed.wait()
+        previous_ts = None
+        sent = 0
+        while self.position < len(self.ticks):
+            tick = self.ticks[self.position]
+            if self.speed and previous_ts is not None:
+                await asyncio.sleep(max(tick['ts'] - previous_ts, 0) / 1000 / self.speed)
+            previous_ts = tick['ts']
+            self.position += 1
+
+            for message in self._messages(tick, topics):
+                await ws.send(json.dumps(message))
+                sent += 1
+            if self.disconnect_after and sent >= self.disconnect_after:
+                await ws.close()
+                return
+
+    def drop_next_book_updates(self, count=1):
+        """
+        Следующие count изменений стаканов не будут отправлены клиентам: у них образуется пропуск.
+        """
+        self.drop_book_updates += count
+
+    def _book_snapshots(self, topics):
+        """
+        Снимки текущих стаканов для топиков orderbook.{глубина}.{актив}, как биржа при подписке.
+        """
+        snapshots = []
+        for topic in topics:
+            if not topic.startswith('orderbook.'):
+                continue
+            symbol = topic.rsplit('.', 1)[-1]
+            book = self.books.get(symbol)
+            if book is None:
+                continue
+            snapshots.append({'topic': topic, 'ts': 0, 'type': 'snapshot', 'data': {
+                's': symbol,
+                'u': book.update_id,
+                'b': [[str(price), str(size)] for price, size in book.bids.levels()],
+                'a': [[str(price), str(size)] for price, size in book.asks.levels()]
+            }})
+        return snapshots
+
+    def _messages(self, tick, topics):
+        """
+        Формирует сообщения в формате биржи для подписанных топиков.
+        """
+        symbol = tick['symbol']
+        if 'book' in tick:
+            self.books.apply_message(tick['book'])
+            if tick['book']['type'] == 'delta' and self.drop_book_updates:
+                self.drop_book_updates -= 1
+                return []
+            return [
+                {'topic': topic, 'ts': tick['ts'], 'type': tick['book']['type'], 'data': tick['book']['data']}
+                for topic in topics if topic.startswith('orderbook.') and topic.endswith(f'.{symbol}')
+            ]
+        price = str(tick['price'])
+        messages = []
+        if f"tickers.{symbol}" in topics:
+            messages.append({
+                'topic': f"tickers.{symbol}",
+                'ts': tick['ts'],
+                'type': 'snapshot',
+                'data': {'symbol': symbol, 'lastPrice': price}
+            })
+        if f"publicTrade.{symbol}" in topics:
+            messages.append({
+                'topic': f"publicTrade.{symbol}",
+                'ts': tick['ts'],
+                'type': 'snapshot',
+                'data': [{'T': tick['ts'], 's': symbol, 'p': price, 'v': str(tick.get('qty', 0))}]
+            })
+        return messages
+
+async def serve(path, host, port, speed):
+    server = await ReplayServer(load_ticks(path), host=host, port=port, speed=speed).start()
+    print(f"Сервер воспроизведения тиков: {server.url}")
+    try:
+        await asyncio.Future()
+    finally:
+        await server.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Локальный WebSocket-сервер, воспроизводящий записанные тики.")
+    parser.add_argument('ticks', help="Файл тиков в формате JSON Lines")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0, help="Ускорение воспроизведения, 0 — без пауз")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.ticks, args.host, args.port, args.speed))